@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark of `Handler.run` and `Handler.auto_save`
+
+Runs against `mock_server.MockServer` so no request reaches y2mate.com.
+Prints (or writes with --output) a json report of items/s, MB/s and
+p50/p95/p99 stage latencies that can be diffed between versions :
+
+    python benchmarks/bench_handler.py --threads 0 2 4 --limits 5 20 -o before.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockServer, MockConfig
+
+
+def run_scenario(y2mate_api, mode: str, thread: int, limit: int, args) -> dict:
+    download_dir = tempfile.mkdtemp(prefix="y2mate-bench-")
+    query = f"bench {mode} {thread} {limit}"
+    handler = y2mate_api.Handler(query, thread=thread, timeout=args.timeout)
+    run_args = dict(
+        format="mp4",
+        quality=args.quality,
+        limit=limit,
+        batch=args.batch_convert,
+        interval=args.poll_interval,
+    )
+    y2mate_api.metrics.reset()
+    started_at = perf_counter()
+    saved_bytes = 0
+    try:
+        if mode == "run":
+            items = sum(1 for entry in handler.run(**run_args) if entry)
+        else:
+            summary = handler.auto_save(
+                dir=download_dir,
+                progress_bar=False,
+                quiet=True,
+                segments=args.segments,
+                **run_args,
+            )
+            items = len(summary["saved"])
+            saved_bytes = summary["bytes"]
+    finally:
+        seconds = perf_counter() - started_at
+        shutil.rmtree(download_dir, ignore_errors=True)
+    return {
+        "mode": mode,
+        "thread": thread,
+        "limit": limit,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_s": round(items / seconds, 3) if seconds else 0,
+        "mb_per_s": round(saved_bytes / 1000000 / seconds, 3) if seconds else 0,
+        "metrics": y2mate_api.metrics.summary(),
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="y2mate end-to-end load benchmark")
+    parser.add_argument("--modes", nargs="+", default=["run", "auto_save"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[0, 4])
+    parser.add_argument("--limits", nargs="+", type=int, default=[5, 20])
+    parser.add_argument("--quality", default="720p")
+    parser.add_argument("--segments", type=int, default=1)
+    parser.add_argument("--batch-convert", action="store_true")
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--converting-rounds", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--media-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--no-ranges", action="store_true")
+    parser.add_argument("--throttle", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--truncate-rate", type=float, default=0)
+    parser.add_argument("-o", "--output", help="Write the json report to this path")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    config = MockConfig(
+        latency=args.latency,
+        converting_rounds=args.converting_rounds,
+        media_size=args.media_size,
+        ranges=not args.no_ranges,
+        throttle=args.throttle,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+    )
+    cache_home = tempfile.mkdtemp(prefix="y2mate-bench-cache-")
+    with MockServer(config) as server:
+        # Both must be set before y2mate_api is imported
+        os.environ["Y2MATE_BASE_URL"] = server.url
+        os.environ["XDG_CACHE_HOME"] = cache_home
+        import y2mate_api
+        from y2mate_api import main as api
+
+        api.cache.enabled = False
+        y2mate_api.metrics.enabled = True
+
+        report = {
+            "version": y2mate_api.__version__,
+            "config": vars(args),
+            "scenarios": [
+                run_scenario(y2mate_api, mode, thread, limit, args)
+                for mode in args.modes
+                for thread in args.threads
+                for limit in args.limits
+            ],
+        }
+    shutil.rmtree(cache_home, ignore_errors=True)
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
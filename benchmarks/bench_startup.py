@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark of the `y2mate` console entry point
+
+Times fresh interpreters running `y2mate --version` and `y2mate --history`
+against an empty cache directory and checks that none of the heavy network
+or progress modules got imported along the way. Exits non-zero when either
+guard trips so it can run in CI :
+
+    python benchmarks/bench_startup.py --runs 20 --max-ms 250 -o startup.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavy_modules = ["curl_cffi", "requests", "click", "colorama", "rich"]
+
+# Runs the entry point like `python -m y2mate_api` then reports what it imported
+probe = """
+import json, runpy, sys
+sys.argv = ["y2mate"] + sys.argv[1:]
+try:
+    runpy.run_module("y2mate_api", run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write("\\nLOADED " + json.dumps(sorted(sys.modules)) + "\\n")
+"""
+
+
+def run_once(command: list, env: dict) -> float:
+    started_at = perf_counter()
+    subprocess.run(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+    )
+    return (perf_counter() - started_at) * 1000
+
+
+def loaded_modules(args: list, env: dict) -> list:
+    resp = subprocess.run(
+        [sys.executable, "-c", probe] + args,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    modules = json.loads(resp.stderr.rpartition("LOADED ")[2])
+    return [
+        name
+        for name in heavy_modules
+        if any(module == name or module.startswith(name + ".") for module in modules)
+    ]
+
+
+def summarise(durations: list) -> dict:
+    durations = sorted(durations)
+    return {
+        "runs": len(durations),
+        "min_ms": round(durations[0], 1),
+        "median_ms": round(statistics.median(durations), 1),
+        "p95_ms": round(durations[min(len(durations) - 1, int(0.95 * len(durations)))], 1),
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="y2mate cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=0,
+        help="Fail when a command's median exceeds this, 0 disables the guard",
+    )
+    parser.add_argument("-o", "--output", help="Write the json report to this path")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    cache_home = tempfile.mkdtemp(prefix="y2mate-startup-")
+    env = dict(
+        os.environ,
+        XDG_CACHE_HOME=cache_home,
+        PYTHONPATH=os.pathsep.join(filter(None, [repo_dir, os.getenv("PYTHONPATH")])),
+    )
+    baseline = [run_once([sys.executable, "-c", "pass"], env) for _ in range(args.runs)]
+    report = {"interpreter": summarise(baseline)}
+    failures = []
+    try:
+        for flag in ["--version", "--history"]:
+            command = [sys.executable, "-m", "y2mate_api", flag]
+            # First run creates the history store, later ones find it in place
+            run_once(command, env)
+            entry = summarise([run_once(command, env) for _ in range(args.runs)])
+            entry["heavy_modules"] = loaded_modules([flag], env)
+            report[flag] = entry
+            if entry["heavy_modules"]:
+                failures.append(f"{flag} imported {', '.join(entry['heavy_modules'])}")
+            if args.max_ms and entry["median_ms"] > args.max_ms:
+                failures.append(f"{flag} median {entry['median_ms']}ms > {args.max_ms}ms")
+    finally:
+        shutil.rmtree(cache_home, ignore_errors=True)
+    report["failures"] = failures
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output)
+    else:
+        print(output)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
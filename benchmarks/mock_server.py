@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for y2mate.com used by the benchmarks
+
+Serves `analyzeV2/ajax`, `convertV2/index` and a byte-serving download host
+with configurable latency, `CONVERTING` rounds, range support, per-connection
+throttling and fault injection.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency: float = 0.02,
+        converting_rounds: int = 0,
+        media_size: int = 2 * 1024 * 1024,
+        ranges: bool = True,
+        throttle: int = 0,
+        error_rate: float = 0,
+        truncate_rate: float = 0,
+        stall_rate: float = 0,
+        stall: float = 60,
+        search_results: int = 20,
+        related: int = 10,
+    ):
+        r"""Initializes this `class`
+        :param latency: (Optional) Seconds added to every API response
+        :param converting_rounds: (Optional) `CONVERTING` replies before a conversion completes
+        :param media_size: (Optional) Bytes served per media file
+        :param ranges: (Optional) Honour `Range` requests
+        :param throttle: (Optional) Bytes per second per download connection, 0 for unlimited
+        :param error_rate: (Optional) Probability of a 500 reply on API calls
+        :param truncate_rate: (Optional) Probability of cutting a download short
+        :param stall_rate: (Optional) Probability of a download going silent halfway
+        :param stall: (Optional) Seconds a stalled download stays silent
+        :param search_results: (Optional) Items returned by a search
+        :param related: (Optional) Related items returned per video
+        """
+        self.latency = latency
+        self.converting_rounds = converting_rounds
+        self.media_size = media_size
+        self.ranges = ranges
+        self.throttle = throttle
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.search_results = search_results
+        self.related = related
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = MockConfig()
+    conversions = {}
+    lock = threading.Lock()
+    block = bytes(range(256)) * 256
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data: dict, status: int = 200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def fail(self) -> bool:
+        if random.random() < self.config.error_rate:
+            body = b"Internal Server Error"
+            self.send_response(500)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        return False
+
+    def do_POST(self):
+        form = dict(
+            parse_qsl(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        )
+        time.sleep(self.config.latency)
+        if self.fail():
+            return
+        if self.path.startswith("/mates/analyzeV2/ajax"):
+            return self.analyze(form)
+        if self.path.startswith("/mates/convertV2/index"):
+            return self.convert(form)
+        self.send_json({"status": "error"}, 404)
+
+    def analyze(self, form: dict):
+        query = form.get("k_query", "")
+        if "watch?v=" in query:
+            vid = query.rpartition("=")[2]
+            size = f"{round(self.config.media_size / 1000000, 1)} MB"
+            return self.send_json(
+                {
+                    "status": "ok",
+                    "mess": "",
+                    "page": "detail",
+                    "vid": vid,
+                    "extractor": "youtube",
+                    "title": f"Mock video {vid}",
+                    "t": 62,
+                    "a": "mock",
+                    "links": {
+                        "mp4": {
+                            "137": {"size": size, "f": "mp4", "q": "1080p", "k": f"{vid}:1080p"},
+                            "136": {"size": size, "f": "mp4", "q": "720p", "k": f"{vid}:720p"},
+                            "18": {"size": size, "f": "mp4", "q": "360p", "k": f"{vid}:360p"},
+                            "auto": {"size": "", "f": "mp4", "q": "auto", "k": f"{vid}:auto"},
+                        },
+                        "mp3": {
+                            "mp3128": {"size": size, "f": "mp3", "q": "128kbps", "k": f"{vid}:128kbps"},
+                        },
+                    },
+                    "related": [
+                        {
+                            "title": "Related Videos",
+                            "contents": [
+                                {"v": f"{vid}r{x}", "t": f"Related {x} of {vid}"}
+                                for x in range(self.config.related)
+                            ],
+                        }
+                    ],
+                }
+            )
+        seed = zlib.crc32(query.encode()) % 100000
+        self.send_json(
+            {
+                "status": "ok",
+                "page": "search",
+                "keyword": query,
+                "vitems": [
+                    {"v": f"s{seed}x{x}", "t": f"{query} {x}"}
+                    for x in range(self.config.search_results)
+                ],
+            }
+        )
+
+    def convert(self, form: dict):
+        vid, _, quality = form.get("k", "").partition(":")
+        key = form.get("k")
+        with self.lock:
+            remaining = self.conversions.setdefault(key, self.config.converting_rounds)
+            if remaining:
+                self.conversions[key] = remaining - 1
+        if remaining:
+            return self.send_json({"status": "ok", "mess": "", "c_status": "CONVERTING"})
+        host = self.headers.get("Host")
+        self.send_json(
+            {
+                "status": "ok",
+                "mess": "",
+                "c_status": "CONVERTED",
+                "vid": vid,
+                "title": f"Mock video {vid}",
+                "ftype": "mp3" if quality.endswith("kbps") else "mp4",
+                "fquality": quality,
+                "dlink": f"http://{host}/download/{vid}-{quality}",
+            }
+        )
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        if not self.path.startswith("/download/"):
+            return self.send_json({"status": "error"}, 404)
+        size = self.config.media_size
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match and self.config.ranges:
+            start = int(match[1])
+            end = min(int(match[2]), size - 1) if match[2] else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", f'"{self.path}"')
+        if self.config.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if head:
+            return
+        remaining = end - start + 1
+        if random.random() < self.config.truncate_rate:
+            remaining = remaining // 2
+            self.close_connection = True
+        stall_at = remaining // 2 if random.random() < self.config.stall_rate else None
+        started_at = time.monotonic()
+        sent = 0
+        while remaining > 0:
+            if stall_at is not None and sent >= stall_at:
+                stall_at = None
+                time.sleep(self.config.stall)
+            # Byte at offset n is always n % 256, so ranges stitch back together
+            offset = (start + sent) % 256
+            block = self.block[offset : offset + min(remaining, len(self.block) - 256)]
+            try:
+                self.wfile.write(block)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            remaining -= len(block)
+            sent += len(block)
+            if self.config.throttle:
+                ahead = sent / self.config.throttle - (time.monotonic() - started_at)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+class MockServer:
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        r"""Initializes this `class`
+        :param config: (Optional) Behaviour of the mock
+        :param host: (Optional) Interface to listen on
+        :param port: (Optional) Port to listen on, 0 picks a free one
+        """
+        handler = type("ConfiguredMockHandler", (MockHandler,), {})
+        handler.config = config or MockConfig()
+        handler.conversions = {}
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in y2mate server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--converting-rounds", type=int, default=0)
+    parser.add_argument("--media-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--no-ranges", action="store_true")
+    parser.add_argument("--throttle", type=int, default=0, help="Bytes/s per connection")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--truncate-rate", type=float, default=0)
+    parser.add_argument("--stall-rate", type=float, default=0)
+    parser.add_argument("--stall", type=float, default=60, help="Seconds a stall lasts")
+    args = parser.parse_args()
+    config = MockConfig(
+        latency=args.latency,
+        converting_rounds=args.converting_rounds,
+        media_size=args.media_size,
+        ranges=not args.no_ranges,
+        throttle=args.throttle,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+        stall_rate=args.stall_rate,
+        stall=args.stall,
+    )
+    server = MockServer(config, args.host, args.port)
+    print(f"Mock y2mate listening on {server.url} - export Y2MATE_BASE_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,11 @@ import argparse
 import sys
 import os
 from rich.console import Console
-from rich.table import Table
 from rich.prompt import Prompt, Confirm
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.panel import Panel
 from rich.text import Text
 from rich import box
-from y2mate_api import Handler, session
+import y2mate_api
 import logging
 
 # Configure logging
@@ -65,11 +63,11 @@ def get_cf_clearance():
 def search_videos(query, cf_clearance):
     """Search for videos based on query"""
     # Update session with CF clearance cookie
-    session.cookies.update({"cf_clearance": cf_clearance})
+    y2mate_api.session.cookies.update({"cf_clearance": cf_clearance})
     
     with console.status("[bold green]Searching for videos...", spinner="earth") as status:
         try:
-            handler = Handler(query)
+            handler = y2mate_api.Handler(query)
             handler._Handler__make_first_query()
             
             if handler.query_one.is_link:
@@ -99,6 +97,8 @@ def search_videos(query, cf_clearance):
 
 def display_videos(videos):
     """Display videos in a beautiful table"""
+    from rich.table import Table
+
     if not videos:
         console.print("[bold yellow]No videos found.[/bold yellow]")
         return None
@@ -134,7 +134,7 @@ def get_available_formats(vid, cf_clearance):
     with console.status("[bold green]Fetching available formats...", spinner="clock") as status:
         try:
             # Update session with CF clearance cookie
-            session.cookies.update({"cf_clearance": cf_clearance})
+            y2mate_api.session.cookies.update({"cf_clearance": cf_clearance})
             
             # Create the query objects
             query_one = first_query("https://www.youtube.com/watch?v={}".format(vid))
@@ -176,6 +176,8 @@ def get_available_formats(vid, cf_clearance):
 
 def display_formats(formats, title):
     """Display available formats in a beautiful table"""
+    from rich.table import Table
+
     if not formats:
         console.print("[bold yellow]No formats available.[/bold yellow]")
         return None, None
@@ -238,49 +240,35 @@ def display_formats(formats, title):
 
 def download_video(vid, format_type, quality, cf_clearance, download_path):
     """Download the selected video/audio"""
+    from y2mate_api.progress import Dashboard
+
     try:
         # Update session with CF clearance cookie
-        session.cookies.update({"cf_clearance": cf_clearance})
+        y2mate_api.session.cookies.update({"cf_clearance": cf_clearance})
         
-        handler = Handler("https://www.youtube.com/watch?v={}".format(vid))
+        handler = y2mate_api.Handler("https://www.youtube.com/watch?v={}".format(vid))
         
         # Ensure download directory exists
         if not os.path.exists(download_path):
             os.makedirs(download_path)
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            console=console
-        ) as progress:
-            task = progress.add_task("Downloading...", total=100)
-            
-            # Run the handler to get the download link
-            for entry in handler.run(format=format_type, quality=quality):
-                if entry and entry.get('dlink'):
-                    # Update progress to show we're starting download
-                    progress.update(task, description="Starting download...", completed=20)
-                    
-                    # Download the file
-                    filename = handler.generate_filename(entry)
-                    save_path = os.path.join(download_path, filename)
-                    
-                    # Save the file with progress
-                    saved_path = handler.save(
-                        entry, 
-                        dir=download_path,
-                        progress_bar=False,
-                        quiet=True
-                    )
-                    
-                    progress.update(task, description="Download complete!", completed=100)
-                    
-                    console.print("\n[bold green][SUCCESS] Download completed successfully![/bold green]")
-                    console.print("[bold blue]Saved to:[/bold blue] {}".format(saved_path))
-                    return True
-                break
+        # Run the handler to get the download link
+        with console.status("[bold green]Fetching download link...[/bold green]"):
+            entry = next(iter(handler.run(format=format_type, quality=quality)), None)
+
+        if entry and entry.get('dlink'):
+            # Progress reflects bytes actually written
+            with Dashboard(console=console) as dashboard:
+                saved_path = handler.save(
+                    entry,
+                    dir=download_path,
+                    quiet=True,
+                    dashboard=dashboard
+                )
+
+            console.print("\n[bold green][SUCCESS] Download completed successfully![/bold green]")
+            console.print("[bold blue]Saved to:[/bold blue] {}".format(saved_path))
+            return True
         
         console.print("[bold red][ERROR] Failed to get download link.[/bold red]")
         return False
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Read once on import of y2mate_api - keep the suite away from the real cache
+os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="y2mate-tests-")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks"))
+
+from mock_server import MockServer, MockConfig  # noqa: E402
+
+# Stands in for y2mate.com, whose url is read on import as well
+api = MockServer(MockConfig(latency=0, media_size=100000)).start()
+os.environ["Y2MATE_BASE_URL"] = api.url
+
+
+@pytest.fixture
+def api_config():
+    r"""Behaviour of the API stand-in, restored after the test"""
+    handler = api.httpd.RequestHandlerClass
+    saved = dict(vars(handler.config))
+    handler.conversions.clear()
+    yield handler.config
+    vars(handler.config).update(saved)
+    handler.conversions.clear()
+
+
+@pytest.fixture
+def fresh_cache():
+    r"""Empties the response cache shared by every query"""
+    from y2mate_api.main import cache
+
+    cache.purge()
+    yield cache
+    cache.purge()
+
+
+@pytest.fixture
+def mock():
+    r"""Starts a download host serving `media_size` bytes where byte n is n % 256"""
+    servers = []
+
+    def start(**kwargs) -> MockServer:
+        kwargs.setdefault("latency", 0)
+        kwargs.setdefault("media_size", 100000)
+        server = MockServer(MockConfig(**kwargs)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from y2mate_api.async_handler import AsyncHandler
+from y2mate_api.main import metrics
+
+
+def run(handler: AsyncHandler, **kwargs) -> list:
+    async def collect():
+        try:
+            return [third_dict async for third_dict in handler.run(**kwargs)]
+        finally:
+            await handler.__aexit__()
+
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+    yield metrics.counters
+    metrics.reset()
+
+
+def test_warm_dlink_cache_serves_a_fresh_handler(fresh_cache, recorded):
+    warm = run(AsyncHandler("query", timeout=5), limit=1, depth=0)
+    assert warm[0]["dlink"]
+    recorded.clear()
+    # Every response comes from the cache, nothing posts before the dlink probe
+    handler = AsyncHandler("query", timeout=5)
+    assert handler.session is None
+    cached = run(handler, limit=1, depth=0)
+    assert cached[0]["dlink"] == warm[0]["dlink"]
+    assert recorded.get("dlink_cache_hits") == 1
+    assert not recorded.get("dlink_cache_stale")
+
+
+def test_conversion_gives_up_after_rounds(fresh_cache, api_config):
+    api_config.converting_rounds = 2
+    assert run(AsyncHandler("query", timeout=5), limit=1, depth=0, rounds=1, interval=0) == []
+
+
+def test_conversion_waits_the_rounds_asked_for(fresh_cache, api_config):
+    api_config.converting_rounds = 2
+    converted = run(
+        AsyncHandler("query", timeout=5), limit=1, depth=0, rounds=2, interval=0
+    )
+    assert converted and converted[0]["dlink"]
+
+
+def test_save_goes_through_part_file(fresh_cache, tmp_path):
+    async def save():
+        async with AsyncHandler("query", timeout=5) as handler:
+            return await handler.auto_save(str(tmp_path), None, limit=1, depth=0)
+
+    saved = asyncio.run(save())
+    assert len(saved) == 1
+    assert open(saved[0], "rb").read() == (bytes(range(256)) * 391)[:100000]
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith((".part", ".json"))] == []
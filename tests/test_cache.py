@@ -0,0 +1,115 @@
+import pytest
+
+from y2mate_api import cache as cache_module
+from y2mate_api.cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.db"))
+
+
+def test_round_trip_through_disk(store, tmp_path):
+    store.set("formats", "abc", {"links": {"mp4": {}}})
+    assert store.get("formats", "abc") == {"links": {"mp4": {}}}
+    reopened = ResponseCache(str(tmp_path / "responses.db"))
+    assert reopened.get("formats", "abc") == {"links": {"mp4": {}}}
+
+
+def test_entries_expire_after_their_ttl(store, clock):
+    store.set("search", "query", {"vitems": []}, ttl=60)
+    clock.now += 59
+    assert store.get("search", "query") == {"vitems": []}
+    clock.now += 2
+    assert store.get("search", "query") is None
+    store.memory.clear()
+    assert store.get("search", "query") is None
+
+
+def test_kind_ttls_apply_by_default(store, clock):
+    store.set("dlink", "abc:mp4:720p", {"dlink": "http://host/file"})
+    clock.now += cache_module.ttls["dlink"] + 1
+    assert store.get("dlink", "abc:mp4:720p") is None
+
+
+def test_negative_entries(store, clock):
+    assert not store.failed("abc")
+    store.add_failure("abc")
+    assert store.failed("abc")
+    assert not store.failed("xyz")
+    clock.now += cache_module.ttls["failure"] + 1
+    assert not store.failed("abc")
+
+
+def test_hits_are_private_copies(store):
+    store.set("formats", "abc", {"links": {"mp4": {"136": {"q": "720p"}}}})
+    first = store.get("formats", "abc")
+    first["links"]["mp4"]["136"]["dlink"] = "http://host/file"
+    first["saved_to"] = "/tmp/file"
+    second = store.get("formats", "abc")
+    assert second == {"links": {"mp4": {"136": {"q": "720p"}}}}
+    assert second is not first
+
+
+def test_disk_hits_are_private_copies(store):
+    store.set("formats", "abc", {"links": {}})
+    store.memory.clear()
+    first = store.get("formats", "abc")
+    first["links"]["mp4"] = {}
+    assert store.get("formats", "abc") == {"links": {}}
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    store = ResponseCache(str(tmp_path / "responses.db"), memory_size=2)
+    for key in ("a", "b", "c"):
+        store.set("search", key, key)
+    assert list(store.memory) == [("search", "b"), ("search", "c")]
+    assert store.get("search", "a") == "a"
+
+
+def test_discard_and_disable(store):
+    store.set("search", "query", [1])
+    store.discard("search", "query")
+    assert store.get("search", "query") is None
+    store.enabled = False
+    store.set("search", "query", [1])
+    assert store.get("search", "query") is None
+
+
+def test_parsed_formats_do_not_alias_the_response():
+    from y2mate_api.main import first_query, second_query, third_query
+
+    query_one = first_query("query").parse(
+        {"status": "ok", "page": "search", "vitems": [{"v": "abc", "t": "title"}]}
+    )
+    response = {
+        "status": "ok",
+        "page": "detail",
+        "vid": "abc",
+        "title": "title",
+        "a": "author",
+        "links": {
+            "mp4": {"136": {"size": "5 MB", "f": "mp4", "q": "720p", "k": "abc:720p"}},
+            "mp3": {},
+        },
+        "related": [{"title": "Related Videos", "contents": []}],
+    }
+    query_two = second_query(query_one).parse(response)
+    hunted = third_query(query_two).hunt("mp4", "720p")
+    hunted[0]["dlink"] = "http://host/file"
+    assert "dlink" not in response["links"]["mp4"]["136"]
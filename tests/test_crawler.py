@@ -0,0 +1,83 @@
+import pytest
+
+from y2mate_api.crawler import BloomFilter, Crawler
+
+
+def videos(prefix: str, amount: int) -> list:
+    return [{"v": f"{prefix}{x}", "t": f"{prefix} {x}"} for x in range(amount)]
+
+
+def test_visits_breadth_first():
+    crawler = Crawler()
+    crawler.push(videos("s", 2))
+    visited = []
+    for depth, entry in crawler:
+        visited.append((depth, entry["v"]))
+        if depth == 0:
+            crawler.push(videos(entry["v"] + "r", 2), depth + 1)
+    assert visited == [
+        (0, "s0"),
+        (0, "s1"),
+        (1, "s0r0"),
+        (1, "s0r1"),
+        (1, "s1r0"),
+        (1, "s1r1"),
+    ]
+
+
+def test_depth_limit_prunes_deeper_hops():
+    crawler = Crawler(max_depth=1)
+    assert crawler.push(videos("s", 2)) == 2
+    assert crawler.push(videos("r", 3), 1) == 3
+    assert crawler.push(videos("rr", 4), 2) == 0
+    assert crawler.stats["pruned"] == 4
+    assert Crawler(max_depth=0).push(videos("r", 3), 1) == 0
+
+
+def test_breadth_limit_applies_to_related_only():
+    crawler = Crawler(max_breadth=2)
+    assert crawler.push(videos("s", 5)) == 5
+    assert crawler.push(videos("r", 5), 1) == 2
+
+
+def test_duplicates_are_visited_once():
+    crawler = Crawler()
+    crawler.push(videos("s", 3))
+    assert crawler.push(videos("s", 4), 1) == 1
+    assert crawler.push([{"t": "no id"}], 1) == 0
+    assert crawler.stats["duplicates"] == 4
+    assert "s0" in crawler and "x" not in crawler
+
+
+def test_frontier_overflow_is_dropped():
+    crawler = Crawler(frontier_size=3)
+    assert crawler.push(videos("s", 5)) == 3
+    assert crawler.stats["overflow"] == 2
+    crawler.pop()
+    assert crawler.push(videos("r", 2), 1) == 1
+    assert len(crawler) == 3
+    # Dropped ids were never marked seen and may be queued later
+    assert "s4" not in crawler
+
+
+def test_score_orders_the_frontier():
+    crawler = Crawler(score=lambda entry: int(entry["v"][1:]))
+    crawler.push(videos("s", 4))
+    assert [entry["v"] for _, entry in crawler] == ["s3", "s2", "s1", "s0"]
+
+
+@pytest.mark.parametrize("bloom", [False, True])
+def test_bloom_tracks_seen_ids(bloom):
+    crawler = Crawler(bloom=bloom, bloom_capacity=1000)
+    assert crawler.push(videos("s", 100)) == 100
+    assert crawler.push(videos("s", 100), 1) == 0
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for x in range(1000):
+        bloom.add(str(x))
+    assert all(str(x) in bloom for x in range(1000))
+    false_positives = sum(str(x) in bloom for x in range(1000, 11000))
+    assert false_positives < 300
+    assert len(bloom) == 1000
@@ -0,0 +1,140 @@
+import os
+from itertools import count
+from time import time
+
+import pytest
+
+from y2mate_api.credentials import CredentialPool
+
+
+bumps = count(1)
+
+
+def write(pool_path, *lines):
+    with open(pool_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    # mtime granularity may hide a rewrite within the same tick
+    stamp = time() + next(bumps)
+    os.utime(pool_path, (stamp, stamp))
+
+
+@pytest.fixture
+def pool_path(tmp_path):
+    pool_path = str(tmp_path / "pool.txt")
+    write(pool_path, "# comment", "cookie-a UA-A", "", "cf_clearance=cookie-b")
+    return pool_path
+
+
+@pytest.fixture
+def pool(pool_path):
+    pool = CredentialPool(min_requests=4, reload_interval=0)
+    pool.load(pool_path)
+    return pool
+
+
+def test_parse():
+    assert CredentialPool.parse("  # comment") is None
+    credential = CredentialPool.parse("cf_clearance=abc Mozilla/5.0 (X11)")
+    assert (credential.cookie, credential.user_agent) == ("abc", "Mozilla/5.0 (X11)")
+    assert credential.apply({})["headers"] == {"User-Agent": "Mozilla/5.0 (X11)"}
+
+
+def test_rotates_over_healthy_credentials(pool):
+    cookies = [pool.acquire().cookie for _ in range(4)]
+    assert sorted(cookies) == ["cookie-a", "cookie-a", "cookie-b", "cookie-b"]
+    assert cookies[0] != cookies[1]
+
+
+def test_challenge_evicts_immediately(pool):
+    credential = pool.acquire()
+    assert not pool.report(credential, 403, False, True)
+    assert len(pool) == 1
+    assert all(pool.acquire() is not credential for _ in range(3))
+
+
+class Response:
+    def __init__(self, status_code: int, text: str = "", headers: dict = {}):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+
+def test_challenges_are_told_from_outages():
+    challenge = "<title>Just a moment...</title><script src='/cdn-cgi/challenge-platform/'>"
+    assert CredentialPool.challenged(Response(403, challenge))
+    assert CredentialPool.challenged(Response(503, challenge))
+    assert CredentialPool.challenged(Response(403, "", {"cf-mitigated": "challenge"}))
+    assert not CredentialPool.challenged(Response(503, "<h1>Service Unavailable</h1>"))
+    assert not CredentialPool.challenged(Response(502, challenge))
+    assert not CredentialPool.challenged(Response(200, '{"status": "ok"}'))
+
+
+def test_outages_count_towards_failure_rate(pool):
+    credential = pool.acquire()
+    for _ in range(3):
+        assert pool.report(credential, 502, False)
+    assert credential.evicted is None and credential.failures == 3
+    credential.requests = 4
+    assert not pool.report(credential, 503, False)
+    assert credential.evicted.startswith("failure rate")
+
+
+def test_failure_rate_evicts_after_min_requests(pool):
+    credential = pool.acquire()
+    assert pool.report(credential, 500, True)
+    credential.requests = 4
+    credential.failures = 2
+    assert pool.report(credential, 200, True)
+    assert not pool.report(credential, 500, True)
+    assert credential.evicted.startswith("failure rate")
+
+
+def test_exhausted_pool_returns_none(pool):
+    for credential in list(pool.credentials):
+        pool.report(credential, 503, False, True)
+    assert pool.acquire() is None
+    assert pool.exhausted
+
+
+def test_reload_keeps_stats_and_evictions(pool, pool_path):
+    credential = next(c for c in pool.credentials if c.cookie == "cookie-b")
+    pool.report(credential, 403, False, True)
+    write(pool_path, "cookie-a UA-A", "cookie-b", "cookie-c")
+    pool.acquire()
+    assert [c.cookie for c in pool.credentials] == ["cookie-a", "cookie-b", "cookie-c"]
+    assert pool.credentials[1] is credential and credential.evicted
+    assert len(pool) == 2
+
+
+def test_reload_drops_removed_cookies(pool, pool_path):
+    write(pool_path, "cookie-b")
+    assert pool.acquire().cookie == "cookie-b"
+    assert [c.cookie for c in pool.credentials] == ["cookie-b"]
+
+
+def test_edited_line_revives_evicted_cookie(pool, pool_path):
+    for credential in list(pool.credentials):
+        pool.report(credential, 403, False, True)
+    assert pool.acquire() is None
+    write(pool_path, "cookie-a UA-A", "cookie-b UA-B")
+    revived = pool.acquire()
+    assert revived.cookie == "cookie-b" and revived.user_agent == "UA-B"
+    assert revived.evicted is None and revived.failures == 0
+    assert not pool.exhausted
+    assert len(pool) == 1
+
+
+def test_readded_cookie_starts_afresh(pool, pool_path):
+    credential = next(c for c in pool.credentials if c.cookie == "cookie-b")
+    pool.report(credential, 403, False, True)
+    write(pool_path, "cookie-a UA-A")
+    pool.acquire()
+    write(pool_path, "cookie-a UA-A", "cookie-b")
+    pool.acquire()
+    assert len(pool) == 2
+
+
+def test_missing_file_keeps_the_pool(pool, pool_path):
+    os.remove(pool_path)
+    assert pool.acquire() is not None
+    assert len(pool.credentials) == 2
@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+
+from y2mate_api import downloader
+from y2mate_api.downloader import Handler
+
+
+def third_dict(server, vid: str = "abc") -> dict:
+    return {
+        "vid": vid,
+        "title": f"Title {vid}",
+        "ftype": "mp4",
+        "fquality": "720p",
+        "k": f"{vid}:720p",
+        "dlink": f"{server.url}/download/{vid}-720p",
+    }
+
+
+@pytest.fixture
+def dashboards(monkeypatch):
+    made = []
+    dashboard = downloader.Dashboard
+
+    def record(*args, **kwargs):
+        made.append(kwargs.get("enabled", True))
+        return dashboard(*args, **kwargs)
+
+    monkeypatch.setattr(downloader, "Dashboard", record)
+    return made
+
+
+@pytest.mark.parametrize("quiet", [False, True])
+def test_quiet_save_hides_progress_and_completion(mock, tmp_path, caplog, dashboards, quiet):
+    caplog.set_level(logging.INFO)
+    entry = third_dict(mock())
+    saved_to = Handler("query").save(
+        entry, str(tmp_path), quiet=quiet, disable_history=True
+    )
+    assert open(saved_to, "rb").read()[:256] == bytes(range(256))
+    assert entry["transferred"] == 100000
+    assert dashboards == ([] if quiet else [True])
+    assert any("✅" in message for message in caplog.messages) is not quiet
+
+
+def test_quiet_auto_save_disables_dashboard(mock, tmp_path, caplog, dashboards):
+    caplog.set_level(logging.INFO)
+    server = mock()
+    summary = Handler("query").auto_save(
+        str(tmp_path),
+        iterator=[third_dict(server, "a"), third_dict(server, "b")],
+        quiet=True,
+    )
+    assert len(summary["saved"]) == 2 and summary["bytes"] == 200000
+    assert dashboards == [False]
+    assert not any("✅" in message for message in caplog.messages)
@@ -0,0 +1,80 @@
+import pytest
+
+from y2mate_api.formats import FormatIndex, FormatRule, parse_bitrate, parse_height, parse_size
+
+links = {
+    "mp4": {
+        "137": {"size": "120.5 MB", "f": "mp4", "q": "1080p", "k": "a:1080p"},
+        "136": {"size": "60 MB", "f": "mp4", "q": "720p", "k": "a:720p"},
+        "22": {"size": "60 MB", "f": "3gp", "q": "720p", "k": "a:720p3"},
+        "18": {"size": "20 MB", "f": "mp4", "q": "360p", "k": "a:360p"},
+        "auto": {"size": "", "f": "mp4", "q": "auto", "k": "a:auto"},
+    },
+    "mp3": {
+        "mp3128": {"size": "3 MB", "f": "mp3", "q": "128kbps", "k": "a:128kbps"},
+        "140": {"size": "4 MB", "f": "m4a", "q": ".m4a", "q_text": ".m4a (192kbps)", "k": "a:m4a"},
+    },
+}
+
+
+@pytest.fixture
+def index():
+    return FormatIndex(links, duration=200)
+
+
+def test_labels_are_parsed():
+    assert parse_size("5.5 MB") == int(5.5 * 1024**2)
+    assert parse_size("") is None
+    assert parse_height("1080p") == 1080
+    assert parse_height("4k") == 2160
+    assert parse_height("auto") is None
+    assert parse_bitrate(".m4a", ".m4a (192kbps)") == 192
+
+
+def test_index_types_every_entry(index):
+    assert len(index) == 7
+    by_key = {media_format.key: media_format for media_format in index["mp4"]}
+    assert by_key["137"].height == 1080
+    assert by_key["137"].size == int(120.5 * 1024**2)
+    assert not by_key["auto"].known
+
+
+def test_sorters(index):
+    assert index.select("best").key == "137"
+    assert index.select("worst").key == "18"
+    assert index.select("smallest").key == "18"
+    assert index.select("largest").key == "137"
+    assert index.select("best", kind="mp3").key == "140"
+
+
+def test_filters_and_fallback_chain(index):
+    assert index.select("smallest[height>=720]").key == "136"
+    assert index.select("best[size<100MB]").key == "136"
+    assert index.select("best[height>2160]") is None
+    assert index.select("best[height>2160]/worst").key == "18"
+    assert index.select("best[bitrate<=128]", kind="mp3").key == "mp3128"
+
+
+def test_unknown_values_never_satisfy_a_filter():
+    index = FormatIndex({"mp4": {"22": {"size": "", "f": "mp4", "q": "720p", "k": "a:720p"}}})
+    assert index.select("best").key == "22"
+    assert index.select("best[size<=1GB]") is None
+
+
+def test_resolver_breaks_ties(index):
+    assert index.select("best[height=720]", resolver="3gp").key == "22"
+    assert index.select("best[height=720]", resolver="mp4").key == "136"
+
+
+@pytest.mark.parametrize(
+    "rule", ["fastest", "best[", "best[height~720]", "best[size<=huge]", "best[height>=tall]"]
+)
+def test_malformed_rules_are_rejected(rule):
+    with pytest.raises(AssertionError):
+        FormatRule(rule)
+
+
+def test_parse_splits_on_slash():
+    rules = FormatIndex.parse("smallest[height>=720]/ best[size<50MB] /best")
+    assert [rule.sorter for rule in rules] == ["smallest", "best", "best"]
+    assert len(rules[1].filters) == 1
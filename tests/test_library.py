@@ -0,0 +1,89 @@
+import hashlib
+from os import path
+
+import pytest
+
+from y2mate_api import main
+from y2mate_api.library import ContentManifest, hash_file
+
+content = b"media" * 1000
+digest = hashlib.sha256(content).hexdigest()
+
+
+def write(file_path, data: bytes = content) -> str:
+    with open(file_path, "wb") as fh:
+        fh.write(data)
+    return str(file_path)
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    manifest = ContentManifest(str(tmp_path / "library" / "library.db"))
+    monkeypatch.setattr(main, "manifest", manifest)
+    return manifest
+
+
+def test_hash_file(tmp_path):
+    file_path = write(tmp_path / "a.mp4")
+    assert hash_file(file_path).hexdigest() == digest
+    assert hash_file(file_path, end=5).hexdigest() == hashlib.sha256(b"media").hexdigest()
+
+
+def test_lookup_drops_moved_or_edited_files(manifest, tmp_path):
+    original = write(tmp_path / "a.mp4")
+    manifest.add(original, digest, len(content))
+    assert manifest.lookup(digest, len(content)) == original
+    assert manifest.lookup(digest, len(content), exclude=original) is None
+    write(original, b"edited")
+    assert manifest.lookup(digest, len(content)) is None
+    assert manifest.entries() == []
+
+
+def test_link_replaces_duplicate_by_hardlink(manifest, tmp_path):
+    original = write(tmp_path / "a.mp4")
+    manifest.add(original, digest, len(content))
+    duplicate = write(tmp_path / "b.mp4")
+    assert manifest.dedupe(duplicate, digest, len(content), "link") == original
+    assert path.samefile(original, duplicate)
+    assert not path.exists(duplicate + ".link")
+
+
+def test_skip_deletes_duplicate(manifest, tmp_path):
+    original = write(tmp_path / "a.mp4")
+    manifest.add(original, digest, len(content))
+    duplicate = write(tmp_path / "b.mp4")
+    assert manifest.dedupe(duplicate, digest, len(content), "skip") == original
+    assert not path.exists(duplicate)
+
+
+def test_off_keeps_both(manifest, tmp_path):
+    original = write(tmp_path / "a.mp4")
+    manifest.add(original, digest, len(content))
+    duplicate = write(tmp_path / "b.mp4")
+    assert manifest.dedupe(duplicate, digest, len(content), "off") is None
+    assert not path.samefile(original, duplicate)
+
+
+def test_unknown_mode_is_rejected(manifest, tmp_path):
+    with pytest.raises(AssertionError):
+        manifest.dedupe(write(tmp_path / "a.mp4"), digest, len(content), "copy")
+
+
+def test_utils_dedupe_records_and_skips(manifest, tmp_path):
+    first = {"vid": "a", "saved_to": write(tmp_path / "a.mp4")}
+    assert main.utils.dedupe(first, digest, len(content)) is None
+    assert first["sha256"] == digest
+    assert [entry["path"] for entry in manifest.entries()] == [first["saved_to"]]
+
+    second = {"vid": "b", "saved_to": write(tmp_path / "b.mp4")}
+    assert main.utils.dedupe(second, digest, len(content), "skip") == first["saved_to"]
+    assert second["saved_to"] == first["saved_to"]
+    assert not path.exists(tmp_path / "b.mp4")
+
+
+def test_utils_dedupe_off_keeps_saved_to(manifest, tmp_path):
+    main.utils.dedupe({"saved_to": write(tmp_path / "a.mp4")}, digest, len(content))
+    third_dict = {"saved_to": write(tmp_path / "b.mp4")}
+    assert main.utils.dedupe(third_dict, digest, len(content)) is None
+    assert third_dict["saved_to"] == str(tmp_path / "b.mp4")
+    assert path.isfile(third_dict["saved_to"])
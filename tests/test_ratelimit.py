@@ -0,0 +1,70 @@
+import pytest
+
+from y2mate_api import ratelimit
+from y2mate_api.ratelimit import RateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "monotonic", clock)
+    return clock
+
+
+def test_disabled_bucket_never_waits(clock):
+    bucket = TokenBucket()
+    assert [bucket.delay() for _ in range(100)] == [0] * 100
+
+
+def test_burst_then_rate(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    assert bucket.delay() == pytest.approx(0.1)
+    # Debt is queued, the next caller waits behind it
+    assert bucket.delay() == pytest.approx(0.2)
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.delay(2)
+    clock.now += 0.1
+    assert bucket.delay() == pytest.approx(0)
+    assert bucket.delay() == pytest.approx(0.1)
+    clock.now += 60
+    assert bucket.tokens <= bucket.capacity
+    assert bucket.delay(2) == 0
+    assert bucket.delay() == pytest.approx(0.1)
+
+
+def test_default_burst_is_one_second(clock):
+    bucket = TokenBucket(rate=5)
+    assert bucket.capacity == 5
+    assert TokenBucket(rate=0.5).capacity == 1
+
+
+def test_requests_draw_from_their_budget(clock):
+    limiter = RateLimiter()
+    limiter.configure(analyze=1, convert=0, download=0)
+    assert RateLimiter.budget("https://host/mates/analyzeV2/ajax") == "analyze"
+    assert RateLimiter.budget("https://host/mates/convertV2/index") == "convert"
+    assert RateLimiter.budget("https://cdn/file.mp4") == "download"
+    assert limiter.delay("https://host/mates/analyzeV2/ajax") == 0
+    assert limiter.delay("https://host/mates/analyzeV2/ajax") == pytest.approx(1)
+    assert limiter.delay("https://host/mates/convertV2/index") == 0
+
+
+def test_bandwidth_takes_the_stricter_cap(clock):
+    limiter = RateLimiter()
+    limiter.configure(bandwidth=1000, download_bandwidth=500)
+    bucket = limiter.new_download()
+    assert limiter.throttle_delay(500, bucket) == 0
+    assert limiter.throttle_delay(500, bucket) == pytest.approx(1)
@@ -0,0 +1,153 @@
+from threading import Event, Timer
+
+import pytest
+
+from y2mate_api import conversion
+from y2mate_api.conversion import BatchConverter
+from y2mate_api.downloader import Handler
+from y2mate_api.pipeline import Pipeline
+from y2mate_api.scheduler import DownloadScheduler
+
+
+class Source:
+    def __init__(self, vid: str):
+        self.vid = vid
+        self.title = f"Title {vid}"
+
+
+def saved(entry: dict) -> str:
+    entry["transferred"] = 10
+    return f"/media/{entry['vid']}"
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_scheduler_records_outcomes(workers):
+    scheduler = DownloadScheduler(saved, workers=workers)
+    with scheduler:
+        scheduler.submit({"vid": "a", "title": "A"})
+        scheduler.submit({}, Source("b"), "Conversion unfinished")
+        scheduler.submit({})
+    summary = scheduler.summary()
+    assert summary["saved"] == ["/media/a"]
+    assert summary["bytes"] == 10
+    assert [(item["vid"], item["error"]) for item in summary["failed"]] == [
+        ("b", "Conversion unfinished"),
+        (None, "Conversion failed"),
+    ]
+    assert summary["failed"][0]["title"] == "Title b"
+
+
+def test_scheduler_records_failed_saves():
+    def save(entry: dict) -> str:
+        raise OSError("disk full")
+
+    scheduler = DownloadScheduler(save, workers=1)
+    with scheduler:
+        scheduler.submit({"vid": "a"})
+    assert [item["error"] for item in scheduler.summary()["failed"]] == ["disk full"]
+
+
+def test_pipeline_counts_failed_conversions():
+    def convert(query_two: Source) -> dict:
+        if query_two.vid == "raises":
+            raise RuntimeError("host down")
+        if query_two.vid == "empty":
+            return {}
+        return {"vid": query_two.vid, "dlink": "http://host/file"}
+
+    summary = Pipeline(
+        [Source("raises"), Source("empty"), Source("ok")], convert, saved
+    ).run()
+    assert summary["saved"] == ["/media/ok"]
+    failed = {item["vid"]: item["error"] for item in summary["failed"]}
+    assert failed == {"raises": "host down", "empty": "Conversion failed"}
+
+
+@pytest.mark.parametrize("pipeline", [True, False])
+def test_auto_save_reports_unfinished_conversions(
+    tmp_path, api_config, fresh_cache, pipeline
+):
+    api_config.converting_rounds = 5
+    summary = Handler("query", timeout=5).auto_save(
+        str(tmp_path),
+        progress_bar=False,
+        pipeline=pipeline,
+        limit=2,
+        depth=0,
+        rounds=0,
+        interval=0,
+    )
+    assert summary["saved"] == []
+    assert len(summary["failed"]) == 2
+    assert all(item["vid"] and item["error"] for item in summary["failed"])
+
+
+def test_batch_conversion_reports_unfinished_conversions(tmp_path, api_config, fresh_cache):
+    api_config.converting_rounds = 5
+    summary = Handler("query", timeout=5).auto_save(
+        str(tmp_path),
+        progress_bar=False,
+        limit=2,
+        depth=0,
+        batch=True,
+        rounds=0,
+        interval=0,
+    )
+    assert summary["saved"] == []
+    assert [item["error"] for item in summary["failed"]] == ["Conversion failed"] * 2
+
+
+def test_scheduler_cancels_queued_entries_when_producer_fails():
+    started, release = Event(), Event()
+
+    def save(entry: dict) -> str:
+        started.set()
+        release.wait(5)
+        return f"/media/{entry['vid']}"
+
+    scheduler = DownloadScheduler(save, workers=1)
+    with pytest.raises(KeyboardInterrupt):
+        with scheduler:
+            scheduler.submit({"vid": "a"})
+            started.wait(5)
+            scheduler.submit({"vid": "b", "title": "B"})
+            Timer(0.1, release.set).start()
+            raise KeyboardInterrupt
+    summary = scheduler.summary()
+    assert summary["saved"] == ["/media/a"]
+    assert [(item["vid"], item["error"]) for item in summary["failed"]] == [("b", "Cancelled")]
+
+
+class Response:
+    def __init__(self, data: dict):
+        self.data = data
+
+    def json(self) -> dict:
+        return self.data
+
+
+def test_batch_converter_submits_everything_before_yielding(monkeypatch):
+    submitted = []
+
+    class Conversion:
+        def __init__(self, query_two):
+            self.query_two = query_two
+
+        def hunt(self, *args):
+            return [{"vid": self.query_two.vid}]
+
+        def cached(self, entry, timeout):
+            return {"dlink": "http://host/cached"} if entry["vid"] == "a" else None
+
+        def submit(self, entry, timeout):
+            submitted.append(entry["vid"])
+            return True, Response({"c_status": "CONVERTED", "dlink": "http://host/file"})
+
+        def remember(self, entry):
+            pass
+
+    monkeypatch.setattr(conversion, "third_query", Conversion)
+    converted = BatchConverter().convert([Source("a"), Source("b"), Source("c")])
+    assert next(converted)["vid"] == "a"
+    assert submitted == ["b", "c"]
+    converted.close()
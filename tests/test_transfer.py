@@ -0,0 +1,222 @@
+import hashlib
+import json
+from os import path
+
+import pytest
+
+from y2mate_api import transfer
+from y2mate_api.transfer import Download, TransferInterrupted
+
+
+def media(size: int) -> bytes:
+    return (bytes(range(256)) * (size // 256 + 1))[:size]
+
+
+def third_dict(server) -> dict:
+    return {
+        "vid": "abc",
+        "ftype": "mp4",
+        "fquality": "720p",
+        "k": "abc:720p",
+        "dlink": f"{server.url}/download/abc-720p",
+    }
+
+
+def save(download: Download) -> str:
+    download.open()
+    download.fetch()
+    return download.finish()
+
+
+def test_download_writes_part_then_renames(mock, tmp_path):
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(third_dict(mock()), save_to, timeout=5)
+    assert save(download) == save_to
+    assert open(save_to, "rb").read() == media(100000)
+    assert not path.exists(save_to + ".part")
+    assert not path.exists(save_to + ".part.json")
+    assert download.offset == 0 and download.sha256
+
+
+def test_journal_resumes_from_committed_byte(mock, tmp_path):
+    server = mock()
+    save_to = str(tmp_path / "media.mp4")
+    with open(save_to + ".part", "wb") as fh:
+        fh.write(media(30000))
+    with open(save_to + ".part.json", "w") as fh:
+        json.dump(dict(third_dict(server), committed=30000, length=100000), fh)
+    download = Download(third_dict(server), save_to, timeout=5)
+    save(download)
+    assert download.offset == 30000
+    assert open(save_to, "rb").read() == media(100000)
+    assert not path.exists(save_to + ".part.json")
+
+
+def test_journal_of_other_media_is_ignored(mock, tmp_path):
+    server = mock()
+    save_to = str(tmp_path / "media.mp4")
+    with open(save_to + ".part", "wb") as fh:
+        fh.write(b"\xff" * 30000)
+    with open(save_to + ".part.json", "w") as fh:
+        json.dump(dict(third_dict(server), vid="other", committed=30000), fh)
+    download = Download(third_dict(server), save_to, timeout=5)
+    save(download)
+    assert download.offset == 0
+    assert open(save_to, "rb").read() == media(100000)
+
+
+def test_resume_adopts_incomplete_file(mock, tmp_path):
+    save_to = str(tmp_path / "media.mp4")
+    with open(save_to, "wb") as fh:
+        fh.write(media(40000))
+    download = Download(third_dict(mock()), save_to, timeout=5, resume=True)
+    save(download)
+    assert download.offset == 40000
+    assert open(save_to, "rb").read() == media(100000)
+    assert not path.exists(save_to + ".part")
+
+
+def test_resume_keeps_finished_file(mock, tmp_path):
+    save_to = str(tmp_path / "media.mp4")
+    with open(save_to, "wb") as fh:
+        fh.write(media(100000))
+    download = Download(third_dict(mock()), save_to, timeout=5, resume=True)
+    assert download.open() == 100000
+    assert path.isfile(save_to) and not path.exists(save_to + ".part")
+    download.fetch()
+    assert download.finish() == save_to
+    assert open(save_to, "rb").read() == media(100000)
+    assert download.committed - download.offset == 0
+    assert not path.exists(save_to + ".part")
+    assert not path.exists(save_to + ".part.json")
+
+
+@pytest.fixture
+def reconnects(monkeypatch):
+    errors = []
+    reconnect = Download.reconnect
+
+    def spy(self, error):
+        errors.append(error)
+        return reconnect(self, error)
+
+    monkeypatch.setattr(Download, "reconnect", spy)
+    return errors
+
+
+def config(server):
+    return server.httpd.RequestHandlerClass.config
+
+
+def heal(server, fault: str):
+    r"""Progress callback clearing `fault` once the first connection is well under way"""
+    return lambda length: setattr(config(server), fault, 0)
+
+
+def test_truncated_stream_reconnects_from_committed_byte(mock, tmp_path, reconnects):
+    server = mock(truncate_rate=1, media_size=300000)
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(third_dict(server), save_to, chunk_size=16384, timeout=5)
+    download.open()
+    download.fetch(heal(server, "truncate_rate"))
+    download.finish()
+    assert len(reconnects) == 1
+    # Reconnects continue the same transfer, only a resume moves the offset
+    assert download.offset == 0
+    assert download.committed - download.offset == 300000
+    assert open(save_to, "rb").read() == media(300000)
+    assert download.sha256 == hashlib.sha256(media(300000)).hexdigest()
+
+
+def test_stalled_stream_reconnects(mock, tmp_path, reconnects, monkeypatch):
+    monkeypatch.setattr(Download, "stall_timeout", 0.5)
+    server = mock(stall_rate=1, stall=3)
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(third_dict(server), save_to, chunk_size=16384, timeout=5)
+    download.open()
+    download.fetch(heal(server, "stall_rate"))
+    download.finish()
+    assert len(reconnects) == 1
+    assert open(save_to, "rb").read() == media(100000)
+
+
+def test_truncated_segments_reconnect(mock, tmp_path, reconnects):
+    server = mock(truncate_rate=1)
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(
+        third_dict(server), save_to, segments=2, chunk_size=16384, timeout=5
+    )
+    download.open()
+    download.fetch(heal(server, "truncate_rate"))
+    download.finish()
+    assert open(save_to, "rb").read() == media(100000)
+
+
+def test_gives_up_after_reconnects(mock, tmp_path, reconnects, monkeypatch):
+    monkeypatch.setattr(Download, "reconnects", 2)
+    server = mock(truncate_rate=1)
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(third_dict(server), save_to, timeout=5)
+    download.open()
+    with pytest.raises(TransferInterrupted):
+        download.fetch()
+    assert len(reconnects) == 2
+    assert download.offset == 0
+    # What arrived stays journaled for the next attempt
+    assert path.isfile(save_to + ".part") and path.isfile(save_to + ".part.json")
+    config(server).truncate_rate = 0
+    resumed = Download(third_dict(server), save_to, timeout=5)
+    save(resumed)
+    assert resumed.offset == download.committed
+    assert open(save_to, "rb").read() == media(100000)
+
+
+def test_watchdog_drops_slow_connections(mock, tmp_path, reconnects, monkeypatch):
+    monkeypatch.setattr(Download, "min_rate", 100000)
+    monkeypatch.setattr(Download, "read_size", 4096)
+    monkeypatch.setattr(Download, "rate_window", 1)
+    monkeypatch.setattr(Download, "reconnects", 0)
+    server = mock(throttle=20000)
+    download = Download(third_dict(server), str(tmp_path / "media.mp4"), timeout=5)
+    download.open()
+    with pytest.raises(TransferInterrupted, match="fell below"):
+        download.fetch()
+
+
+def test_segments_refresh_expired_link(mock, tmp_path, monkeypatch):
+    server = mock()
+    refreshed = []
+
+    def refresh(entry, **kwargs):
+        refreshed.append(entry["dlink"])
+        return {"dlink": third_dict(server)["dlink"]}
+
+    monkeypatch.setattr(transfer.third_query, "refresh", refresh)
+    monkeypatch.setattr(Download, "reconnects", 0)
+    save_to = str(tmp_path / "media.mp4")
+    download = Download(
+        third_dict(server), save_to, segments=4, chunk_size=16384, timeout=5
+    )
+    download.open()
+    # The mock host answers 404 outside of /download/
+    download.third_dict["dlink"] = f"{server.url}/expired/abc"
+    download.fetch()
+    download.finish()
+    assert refreshed == [f"{server.url}/expired/abc"]
+    assert open(save_to, "rb").read() == media(100000)
+
+
+def test_segments_rejected_after_refresh_fail(mock, tmp_path, monkeypatch):
+    server = mock()
+    monkeypatch.setattr(
+        transfer.third_query,
+        "refresh",
+        lambda entry, **kwargs: {"dlink": f"{server.url}/expired/new"},
+    )
+    download = Download(
+        third_dict(server), str(tmp_path / "media.mp4"), segments=2, timeout=5
+    )
+    download.open()
+    download.third_dict["dlink"] = f"{server.url}/expired/abc"
+    with pytest.raises(Exception, match="Range request rejected - \\(404"):
+        download.fetch()
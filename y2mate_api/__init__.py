@@ -5,11 +5,39 @@ __author__ = "Smartwa"
 __repo__ = "https://github.com/Simatwa/y2mate-api"
 __disclaimer__ = "This script has no official relation with y2mate.com"
 
-from .main import first_query
-from .main import second_query
-from .main import third_query
-from .main import appdir
-from .main import session
-from .downloader import Handler
-
-__all__ = ["first_query", "second_query", "third_query", "Handler", "appdir", "session"]
+__all__ = [
+    "first_query",
+    "second_query",
+    "third_query",
+    "Handler",
+    "AsyncHandler",
+    "appdir",
+    "session",
+    "metrics",
+]
+
+# Resolved on first access (PEP 562) so that `y2mate --version` and friends
+# never pay for curl_cffi, rich or click
+__lazy__ = {
+    "first_query": ".main",
+    "second_query": ".main",
+    "third_query": ".main",
+    "appdir": ".main",
+    "session": ".main",
+    "metrics": ".main",
+    "Handler": ".downloader",
+    "AsyncHandler": ".async_handler",
+}
+
+
+def __getattr__(name: str):
+    if name in __lazy__:
+        from importlib import import_module
+
+        value = globals()[name] = getattr(import_module(__lazy__[name], __name__), name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(__lazy__))
@@ -0,0 +1,385 @@
+import asyncio
+from os import path, getcwd
+from curl_cffi.requests import AsyncSession
+from .main import (
+    logging,
+    utils,
+    first_query,
+    second_query,
+    third_query,
+    headers,
+    sessions,
+    get_excep,
+    cache,
+    limiter,
+    metrics,
+    credentials,
+)
+from .downloader import Handler
+from .transfer import Download
+from .crawler import Crawler
+
+"""
+asyncio-native counterpart of `Handler`
+"""
+
+
+class AsyncHandler:
+    def __init__(
+        self,
+        query: str,
+        author: str = None,
+        timeout: int = 30,
+        unique: bool = False,
+        concurrency: int = 10,
+    ):
+        r"""Initializes this `class`
+        :param query: Video name or youtube link
+        :type query: str
+        :param author: (Optional) Author (Channel) of the videos
+        :type author: str
+        :param timeout: (Optional) Http request timeout
+        :type timeout: int
+        :param unique: (Optional) Ignore previously downloaded media
+        :type unique: bool
+        :param concurrency: (Optional) Maximum second/third queries in flight
+        :type concurrency: int
+        """
+        self.query = query
+        self.author = author
+        self.timeout = timeout
+        self.keyword = None
+        self.unique = unique
+        self.concurrency = concurrency
+        self.saved_videos = utils.get_history()
+        self.session = None
+
+    def __str__(self):
+        return self.query
+
+    async def __aenter__(self):
+        self.__open_session()
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def __open_session(self):
+        if not self.session:
+            self.session = AsyncSession(
+                headers=headers,
+                cookies=dict(sessions.master.cookies),
+                max_clients=self.concurrency,
+            )
+
+    async def post(self, *args, **kwargs):
+        r"""Sends asynchronous http post request"""
+        self.__open_session()
+        kwargs["impersonate"] = "chrome"
+        for attempt in range(credentials.retries + 1):
+            credential = credentials.acquire()
+            if credential:
+                credential.apply(kwargs)
+            await asyncio.sleep(limiter.delay(args[0]))
+            resp = await self.session.post(*args, **kwargs)
+            is_json = "application/json" in resp.headers.get("content-type", "")
+            if not credential or credentials.report(
+                credential, resp.status_code, is_json, credentials.challenged(resp)
+            ):
+                break
+            metrics.count("credential_evictions")
+        return all([resp.ok, is_json]), resp
+
+    async def __first_query(self) -> first_query:
+        query_one = first_query(self.query)
+        cached = cache.get("search", self.query)
+        if cached:
+            metrics.count("cache_hits")
+            return query_one.parse(cached)
+        okay_status, resp = await self.post(
+            query_one.url, data=query_one.payload, timeout=self.timeout
+        )
+        if okay_status:
+            query_one.parse(resp.json())
+            cache.set("search", self.query, query_one.raw)
+            return query_one
+        logging.error(f"First query failed - [{resp.status_code} : {resp.reason}]")
+        return query_one
+
+    async def __second_query(self, query_one: first_query, video_dict: dict):
+        query_two = second_query(query_one)
+        query_two.video_dict = video_dict
+        vid = video_dict.get("v")
+        if cache.failed(vid):
+            return query_two
+        cached = cache.get("formats", vid)
+        if cached:
+            metrics.count("cache_hits")
+            return query_two.parse(cached)
+        okay_status, resp = await self.post(
+            query_two.url, data=query_two.get_payload(), timeout=self.timeout
+        )
+        if okay_status:
+            return query_two.store(vid, resp.json())
+        logging.error(f"Second query failed - [{resp.status_code} : {resp.reason}]")
+        cache.add_failure(vid)
+        return query_two
+
+    async def __third_query(
+        self,
+        query_two: second_query,
+        format: str,
+        quality: str,
+        resolver: str,
+        rounds: int = 4,
+        interval: float = 5,
+        select: str = None,
+    ) -> dict:
+        query_three = third_query(query_two)
+        hunted = query_three.hunt(format, quality, resolver, select)
+        if not hunted:
+            return {}
+        cached = await self.__cached(query_three, hunted[0])
+        if cached:
+            hunted[0].update(cached)
+            return hunted[0]
+        for repeat_count in range(rounds + 1):
+            okay_status, resp = await self.post(
+                query_three.url,
+                data=query_three.get_payload(hunted[0]),
+                timeout=self.timeout,
+            )
+            if not okay_status:
+                logging.error(
+                    f"Third query failed - [{resp.status_code} : {resp.reason}]"
+                )
+                return {}
+            if resp.json().get("c_status") != "CONVERTING":
+                resp_data = hunted[0]
+                resp_data.update(resp.json())
+                query_three.remember(resp_data)
+                return resp_data
+            metrics.count("conversion_rounds")
+            if repeat_count < rounds:
+                logging.debug(
+                    f"Converting video  : sleeping for {interval}s - round {repeat_count+1}"
+                )
+                await asyncio.sleep(interval)
+        logging.error(
+            f"Conversion unfinished after ({rounds}) rounds - {query_two.vid}"
+        )
+        return {}
+
+    async def __cached(self, query_three: third_query, entry: dict) -> dict:
+        r"""Counterpart of `third_query.cached` probing on the event loop"""
+        key = third_query.dlink_key(query_three.query_two.vid, entry)
+        third_dict = cache.get("dlink", key)
+        if not third_dict:
+            return
+        # A run may reach here from cached responses before any post opened it
+        self.__open_session()
+        try:
+            resp = await self.session.get(
+                third_dict["dlink"],
+                headers=dict(headers, Range="bytes=0-0"),
+                stream=True,
+                timeout=self.timeout,
+            )
+            await resp.aclose()
+            alive = resp.status_code in (200, 206)
+        except Exception as e:
+            logging.debug(f"Cached dlink probe failed - {get_excep(e)}")
+            alive = False
+        if not alive:
+            metrics.count("dlink_cache_stale")
+            cache.discard("dlink", key)
+            return
+        metrics.count("dlink_cache_hits")
+        return dict(third_dict)
+
+    def __accept(self, query_two: second_query) -> bool:
+        if self.author and not self.author.lower() in (query_two.a or "").lower():
+            logging.warning(f"Dropping {query_two.title} by {query_two.a}")
+            return False
+        if self.unique and query_two.vid in self.saved_videos:
+            logging.warning(f"Skipping {query_two.title} - Reason : Duplicate")
+            return False
+        return True
+
+    async def run(
+        self,
+        format: str = "mp4",
+        quality: str = "auto",
+        resolver: str = None,
+        limit: int = 1,
+        keyword: str = None,
+        author: str = None,
+        depth: int = None,
+        breadth: int = None,
+        frontier: int = 1000,
+        bloom: bool = False,
+        rounds: int = 4,
+        interval: float = 5,
+        select: str = None,
+    ):
+        r"""Generate and yield video dictionary as each conversion completes
+        :param format: (Optional) Media format mp4/mp3
+        :param quality: (Optional) Media qualiy such as 720p/128kbps
+        :param resolver: (Optional) Additional format info : [m4a,3gp,mp4,mp3]
+        :param limit: (Optional) Total videos to be generated
+        :param keyword: (Optional) Video keyword
+        :param author: (Optional) Author of the videos
+        :param depth: (Optional) Related-video hops to follow, None for unlimited
+        :param breadth: (Optional) Related videos followed from each video, None for all
+        :param frontier: (Optional) Videos waiting to be visited, the rest are dropped
+        :param bloom: (Optional) Track visited ids with a fixed-size Bloom filter
+        :param rounds: (Optional) Times to re-check a conversion in progress
+        :param interval: (Optional) Seconds to wait between the rounds
+        :param select: (Optional) Format rules tried in turn, overrides quality
+        :type quality: str
+        :type limit: int
+        :type keyword: str
+        :type author: str
+        :type depth: int
+        :type breadth: int
+        :type frontier: int
+        :type bloom: bool
+        :type rounds: int
+        :type interval: float
+        :type select: str
+        :rtype: dict
+        """
+        self.author = author
+        self.keyword = keyword
+        query_one = await self.__first_query()
+        if not query_one.processed:
+            return
+        crawler = Crawler(
+            max_depth=depth, max_breadth=breadth, frontier_size=frontier, bloom=bloom
+        )
+        if query_one.is_link:
+            crawler.push([{"v": query_one.vid, "t": query_one.title}])
+            query_one.is_link = False
+        else:
+            crawler.push(
+                [
+                    entry
+                    for entry in query_one.vitems
+                    if not self.keyword
+                    or self.keyword.lower() in entry.get("t", "").lower()
+                ]
+            )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def resolve(depth: int, video_dict: dict):
+            async with semaphore:
+                query_two = await self.__second_query(query_one, video_dict)
+                if not query_two.processed:
+                    return depth, query_two, {}
+                if not self.__accept(query_two):
+                    return depth, query_two, None
+                return depth, query_two, await self.__third_query(
+                    query_two, format, quality, resolver, rounds, interval, select
+                )
+
+        yielded = 0
+        tasks = set()
+        try:
+            while yielded < limit and (crawler or tasks):
+                while crawler and len(tasks) < min(self.concurrency, limit - yielded):
+                    tasks.add(asyncio.ensure_future(resolve(*crawler.pop())))
+                if not tasks:
+                    break
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    depth, query_two, third_dict = task.result()
+                    if third_dict is not None and query_two.processed:
+                        crawler.push(query_two.related, depth + 1)
+                    if third_dict is None:
+                        continue
+                    if not third_dict:
+                        logging.error(f"Empty object - {third_dict}")
+                        continue
+                    if yielded < limit:
+                        yielded += 1
+                        yield third_dict
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def save(
+        self,
+        third_dict: dict,
+        dir: str = "",
+        naming_format: str = None,
+        disable_history: bool = False,
+        dedupe: str = "off",
+    ) -> str:
+        r"""Download media based on response of `third_query` dict-data-type
+        :param third_dict: Response of `AsyncHandler.run()`
+        :param dir: (Optional) Directory for saving the contents
+        :param naming_format: (Optional) Format for generating filename
+        :param disable_history: (Optional) Don't save the download to history
+        :param dedupe: (Optional) link/skip/off - hardlink or drop the file when identical media is saved already
+        :type third_dict: dict
+        :type dir: str
+        :type naming_format: str
+        :type disable_history: bool
+        :type dedupe: str
+        :rtype: str
+        """
+        assert third_dict.get(
+            "dlink"
+        ), "The video selected does not support that quality, try lower qualities."
+        filename = Handler.generate_filename(third_dict, naming_format)
+        save_to = path.join(dir, filename)
+        # Same `.part` file and journal as `Handler.save`, kept off the event loop
+        download = Download(third_dict, save_to, headers=headers, timeout=self.timeout)
+        size_in_bytes = await asyncio.to_thread(download.open)
+        await asyncio.to_thread(download.fetch)
+        await asyncio.to_thread(download.finish)
+        third_dict["saved_to"] = (
+            save_to
+            if any([save_to.startswith("/"), ":" in save_to])
+            else path.join(getcwd(), dir, filename)
+        )
+        original = await asyncio.to_thread(
+            utils.dedupe, third_dict, download.sha256, download.size, dedupe
+        )
+        if original and dedupe == "skip":
+            save_to = original
+        if not disable_history:
+            await asyncio.to_thread(utils.add_history, third_dict)
+        logging.info(f"{filename} - {round(size_in_bytes / 1000000, 2)}MB ✅")
+        return save_to
+
+    async def auto_save(
+        self,
+        dir: str = "",
+        naming_format: str = None,
+        *args,
+        **kwargs,
+    ) -> list:
+        r"""Query and save all the media concurrently
+        :param dir: (Optional) Path to Directory for saving the media files
+        :param naming_format: (Optional) Format for generating filename
+        :type dir: str
+        :type naming_format: str
+        args & kwargs for `AsyncHandler.run`
+        :rtype: list
+        """
+        downloads = [
+            asyncio.ensure_future(self.save(entry, dir, naming_format))
+            async for entry in self.run(*args, **kwargs)
+        ]
+        saved = []
+        for result in await asyncio.gather(*downloads, return_exceptions=True):
+            if isinstance(result, Exception):
+                logging.error(f"Failed to save media - {get_excep(result)}")
+            else:
+                saved.append(result)
+        return saved
@@ -0,0 +1,133 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, BoundedSemaphore
+from time import perf_counter
+from .main import logging, get_excep
+from .downloader import Handler
+from .progress import Dashboard
+
+"""
+Concurrent processing of `--input` files
+"""
+
+
+def read_queries(input_path: str):
+    r"""Lazily yields line number and query of non-blank, first-seen lines
+    :param input_path: Path to text file containing query per line
+    :type input_path: str
+    :rtype: tuple(int, str)
+    """
+    seen = set()
+    with open(input_path) as fh:
+        for line_no, line in enumerate(fh, start=1):
+            query = line.strip()
+            if not query:
+                continue
+            if query in seen:
+                logging.debug(f"Skipping duplicate line {line_no} : {query}")
+                continue
+            seen.add(query)
+            yield line_no, query
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        handler_args: dict,
+        auto_save_args: dict,
+        jobs: int = 1,
+        report_path: str = None,
+    ):
+        r"""Initializes this `class`
+        :param handler_args: Keyword arguments for `Handler`
+        :type handler_args: dict
+        :param auto_save_args: Keyword arguments for `Handler.auto_save`
+        :type auto_save_args: dict
+        :param jobs: (Optional) Lines resolved and downloaded at once
+        :type jobs: int
+        :param report_path: (Optional) Path to write per-line results as json lines
+        :type report_path: str
+        """
+        self.handler_args = handler_args
+        self.auto_save_args = auto_save_args
+        self.jobs = max(jobs, 1)
+        self.report_path = report_path
+        self.lock = Lock()
+        self.dashboard = None
+        self.summary = {"ok": 0, "skipped": 0, "failed": 0, "bytes": 0, "saved": []}
+
+    def process(self, line_no: int, query: str) -> dict:
+        r"""Resolves and downloads media of one line
+        :param line_no: Line number in the input file
+        :param query: Video name or youtube link
+        :type line_no: int
+        :type query: str
+        :rtype: dict
+        """
+        report = {"line": line_no, "query": query}
+        started_at = perf_counter()
+        try:
+            handler_args = dict(self.handler_args, query=query)
+            summary = Handler(**handler_args).auto_save(
+                **self.auto_save_args, dashboard=self.dashboard
+            )
+            report["saved"] = summary["saved"]
+            report["bytes"] = summary["bytes"]
+            if summary["failed"]:
+                report["status"] = "failed"
+                report["error"] = "; ".join(
+                    str(item.get("error")) for item in summary["failed"]
+                )
+            else:
+                report["status"] = "ok" if summary["saved"] else "skipped"
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            logging.error(f"Line {line_no} ({query}) failed - {get_excep(e)}")
+            report["status"] = "failed"
+            report["error"] = str(get_excep(e))
+            report["bytes"] = 0
+        report["duration"] = round(perf_counter() - started_at, 3)
+        return report
+
+    def __record(self, report: dict, report_fh):
+        with self.lock:
+            self.summary[report["status"]] += 1
+            self.summary["bytes"] += report.get("bytes", 0)
+            self.summary["saved"].extend(report.get("saved", []))
+            if report_fh:
+                report_fh.write(json.dumps(report) + "\n")
+                report_fh.flush()
+
+    def run(self, input_path: str) -> dict:
+        r"""Processes every query in `input_path`
+        :param input_path: Path to text file containing query per line
+        :type input_path: str
+        :rtype: dict
+        """
+        report_fh = open(self.report_path, "w") if self.report_path else None
+        # One surface for every line in flight
+        self.dashboard = Dashboard(
+            enabled=self.auto_save_args.get("progress_bar", True)
+        ).start()
+        # Bounds lines read ahead of the workers
+        slots = BoundedSemaphore(self.jobs * 2)
+
+        def work(line_no, query):
+            try:
+                self.__record(self.process(line_no, query), report_fh)
+            finally:
+                slots.release()
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.jobs, thread_name_prefix="y2mate-batch"
+            ) as executor:
+                for line_no, query in read_queries(input_path):
+                    slots.acquire()
+                    executor.submit(work, line_no, query)
+        finally:
+            self.dashboard.stop()
+            if report_fh:
+                report_fh.close()
+        return self.summary
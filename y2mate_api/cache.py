@@ -0,0 +1,172 @@
+import json
+import logging
+import sqlite3
+from collections import OrderedDict
+from os import path, makedirs
+from threading import Lock
+from time import time
+
+"""
+Tiered (memory -> disk) cache for `analyzeV2` responses
+"""
+
+ttls = {
+    "search": 6 * 3600,  # first_query responses keyed by query string
+    "formats": 12 * 3600,  # second_query responses keyed by video id
+    "failure": 15 * 60,  # video ids that failed or had no formats
+    "dlink": 2 * 3600,  # third_query responses keyed by vid:ftype:fquality
+}
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        db_path: str,
+        ttls: dict = ttls,
+        memory_size: int = 256,
+        max_entries: int = 10000,
+    ):
+        r"""Initializes this `class`
+        :param db_path: Path to the sqlite store
+        :type db_path: str
+        :param ttls: (Optional) Seconds to live per kind of entry
+        :type ttls: dict
+        :param memory_size: (Optional) Entries kept in the in-memory LRU
+        :type memory_size: int
+        :param max_entries: (Optional) Entries kept on disk before eviction
+        :type max_entries: int
+        """
+        self.db_path = db_path
+        self.ttls = dict(ttls)
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.enabled = True
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.__conn = None
+        self.__writes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        r"""Lazily opened connection to the disk store"""
+        if self.__conn is None:
+            if not path.isdir(path.dirname(self.db_path)):
+                makedirs(path.dirname(self.db_path))
+            self.__conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (kind TEXT, key TEXT, "
+                "value TEXT, expires REAL, accessed REAL, PRIMARY KEY (kind, key))"
+            )
+        return self.__conn
+
+    def get(self, kind: str, key: str):
+        r"""Returns a private copy of the unexpired cached value or None
+        :param kind: Entry kind - search/formats/failure
+        :param key: Query string or video id
+        :type kind: str
+        :type key: str
+        :rtype: object
+        """
+        if not self.enabled or not key:
+            return
+        now = time()
+        with self.lock:
+            entry = self.memory.get((kind, key))
+            if entry:
+                if entry[0] > now:
+                    self.memory.move_to_end((kind, key))
+                    # Decoded per hit, callers mutate what they get back
+                    return json.loads(entry[1])
+                del self.memory[(kind, key)]
+            try:
+                row = self.conn.execute(
+                    "SELECT value, expires FROM responses WHERE kind=? AND key=?",
+                    (kind, key),
+                ).fetchone()
+                if not row:
+                    return
+                if row[1] <= now:
+                    self.conn.execute(
+                        "DELETE FROM responses WHERE kind=? AND key=?", (kind, key)
+                    )
+                    return
+                self.conn.execute(
+                    "UPDATE responses SET accessed=? WHERE kind=? AND key=?",
+                    (now, kind, key),
+                )
+            except sqlite3.Error as e:
+                logging.debug(f"Cache lookup failed - {e}")
+                return
+            self.__remember(kind, key, row[1], row[0])
+            return json.loads(row[0])
+
+    def set(self, kind: str, key: str, value=True, ttl: int = None) -> None:
+        r"""Caches `value` under `kind` & `key`
+        :param kind: Entry kind - search/formats/failure
+        :param key: Query string or video id
+        :param value: (Optional) Json serializable value
+        :param ttl: (Optional) Seconds to live, defaults to `self.ttls[kind]`
+        :type kind: str
+        :type key: str
+        :type ttl: int
+        :rtype: None
+        """
+        if not self.enabled or not key:
+            return
+        now = time()
+        expires = now + (ttl or self.ttls.get(kind, 3600))
+        encoded = json.dumps(value)
+        with self.lock:
+            self.__remember(kind, key, expires, encoded)
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, encoded, expires, now),
+                )
+                self.__writes += 1
+                if self.__writes % 100 == 0:
+                    self.__evict(now)
+            except sqlite3.Error as e:
+                logging.debug(f"Cache store failed - {e}")
+
+    def discard(self, kind: str, key: str) -> None:
+        r"""Deletes the entry under `kind` & `key`"""
+        with self.lock:
+            self.memory.pop((kind, key), None)
+            try:
+                self.conn.execute(
+                    "DELETE FROM responses WHERE kind=? AND key=?", (kind, key)
+                )
+            except sqlite3.Error as e:
+                logging.debug(f"Cache delete failed - {e}")
+
+    def failed(self, key: str) -> bool:
+        r"""Checks for a negative entry of a video id"""
+        return bool(self.get("failure", key))
+
+    def add_failure(self, key: str) -> None:
+        r"""Records a short-lived negative entry of a video id"""
+        self.set("failure", key, True)
+
+    def purge(self) -> None:
+        r"""Deletes every cached response"""
+        with self.lock:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("VACUUM")
+
+    def __remember(self, kind, key, expires, encoded: str):
+        self.memory[(kind, key)] = (expires, encoded)
+        self.memory.move_to_end((kind, key))
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def __evict(self, now: float):
+        self.conn.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        self.conn.execute(
+            "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses "
+            "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
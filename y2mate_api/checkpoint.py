@@ -0,0 +1,270 @@
+import json
+import logging
+import sqlite3
+from os import path, makedirs
+from threading import RLock
+from time import time
+from uuid import uuid4
+
+"""
+Durable per-run record of every item's stage, so interrupted runs resume where they stopped
+"""
+
+# Stages an item moves through, `failed` may follow any of them
+stages = ["resolved", "converted", "downloading", "done", "failed"]
+
+
+class CheckpointStore:
+    def __init__(self, db_path: str, keep_days: float = 7):
+        r"""Initializes this `class`
+        :param db_path: Path to the sqlite store
+        :type db_path: str
+        :param keep_days: (Optional) Days finished runs are kept
+        :type keep_days: float
+        """
+        self.db_path = db_path
+        self.keep_days = keep_days
+        self.lock = RLock()
+        self.__conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        r"""Lazily opened connection"""
+        with self.lock:
+            if self.__conn is None:
+                if not path.isdir(path.dirname(self.db_path)):
+                    makedirs(path.dirname(self.db_path))
+                conn = sqlite3.connect(
+                    self.db_path,
+                    check_same_thread=False,
+                    isolation_level=None,
+                    timeout=30,
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS runs (id TEXT PRIMARY KEY, "
+                    "created REAL, updated REAL, status TEXT, args TEXT)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS searches (run TEXT, query TEXT, "
+                    "data TEXT, PRIMARY KEY (run, query))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS items (run TEXT, query TEXT, vid TEXT, "
+                    "seq INTEGER, depth INTEGER, stage TEXT, offset INTEGER, error TEXT, "
+                    "data TEXT, updated REAL, PRIMARY KEY (run, query, vid))"
+                )
+                self.__conn = conn
+            return self.__conn
+
+    def create(self, args: dict) -> "Checkpoint":
+        r"""Starts recording a new run
+        :param args: Json-serializable arguments needed to start the run again
+        :type args: dict
+        :rtype: Checkpoint
+        """
+        conn = self.conn
+        run_id = uuid4().hex[:8]
+        now = time()
+        with self.lock:
+            self.prune()
+            conn.execute(
+                "INSERT INTO runs (id, created, updated, status, args) VALUES (?, ?, ?, ?, ?)",
+                (run_id, now, now, "running", json.dumps(args)),
+            )
+        return Checkpoint(self, run_id, args)
+
+    def open(self, run_id: str) -> "Checkpoint":
+        r"""Recorded run to resume, `last` picks the latest unfinished one
+        :param run_id: Id logged when the run started
+        :type run_id: str
+        :rtype: Checkpoint
+        """
+        conn = self.conn
+        with self.lock:
+            if run_id == "last":
+                row = conn.execute(
+                    "SELECT id, args FROM runs WHERE status != 'done' "
+                    "ORDER BY created DESC LIMIT 1"
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT id, args FROM runs WHERE id = ?", (run_id,)
+                ).fetchone()
+        assert row, (
+            "No unfinished run to resume"
+            if run_id == "last"
+            else f"No recorded run with id '{run_id}'"
+        )
+        return Checkpoint(self, row[0], json.loads(row[1]))
+
+    def runs(self) -> list:
+        r"""Recorded runs, latest first"""
+        conn = self.conn
+        with self.lock:
+            return [
+                dict(
+                    zip(("id", "created", "updated", "status", "items", "done"), row)
+                )
+                for row in conn.execute(
+                    "SELECT runs.id, runs.created, runs.updated, runs.status, "
+                    "COUNT(items.vid), SUM(items.stage = 'done') FROM runs "
+                    "LEFT JOIN items ON items.run = runs.id "
+                    "GROUP BY runs.id ORDER BY runs.created DESC"
+                )
+            ]
+
+    def prune(self) -> None:
+        r"""Deletes finished runs older than `keep_days`"""
+        conn = self.conn
+        expired = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM runs WHERE status = 'done' AND updated < ?",
+                (time() - self.keep_days * 86400,),
+            )
+        ]
+        for table, column in (("items", "run"), ("searches", "run"), ("runs", "id")):
+            conn.executemany(
+                f"DELETE FROM {table} WHERE {column} = ?", [(run_id,) for run_id in expired]
+            )
+
+
+class Checkpoint:
+    def __init__(self, store: CheckpointStore, run_id: str, args: dict):
+        r"""Initializes this `class`
+        :param store: Where the run is recorded
+        :type store: CheckpointStore
+        :param run_id: Id of the run
+        :type run_id: str
+        :param args: Arguments the run was started with
+        :type args: dict
+        """
+        self.store = store
+        self.id = run_id
+        self.args = args
+
+    def search(self, query: str) -> dict:
+        r"""Recorded `first_query` response of `query`, None when not searched yet
+        :rtype: dict
+        """
+        with self.store.lock:
+            row = self.store.conn.execute(
+                "SELECT data FROM searches WHERE run = ? AND query = ?", (self.id, query)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def searched(self, query: str, data: dict) -> None:
+        r"""Records `first_query` response of `query`"""
+        with self.store.lock:
+            self.store.conn.execute(
+                "INSERT OR REPLACE INTO searches (run, query, data) VALUES (?, ?, ?)",
+                (self.id, query, json.dumps(data)),
+            )
+
+    @staticmethod
+    def __item(row: tuple) -> dict:
+        vid, depth, stage, offset, error, data = row
+        return dict(
+            vid=vid,
+            depth=depth,
+            stage=stage,
+            offset=offset,
+            error=error,
+            **json.loads(data or "{}"),
+        )
+
+    def items(self, query: str) -> list:
+        r"""Items recorded under `query` in the order they were resolved
+        :rtype: list
+        """
+        with self.store.lock:
+            return [
+                self.__item(row)
+                for row in self.store.conn.execute(
+                    "SELECT vid, depth, stage, offset, error, data FROM items "
+                    "WHERE run = ? AND query = ? ORDER BY seq",
+                    (self.id, query),
+                )
+            ]
+
+    def item(self, query: str, vid: str) -> dict:
+        r"""Recorded item, None when unknown
+        :rtype: dict
+        """
+        with self.store.lock:
+            row = self.store.conn.execute(
+                "SELECT vid, depth, stage, offset, error, data FROM items "
+                "WHERE run = ? AND query = ? AND vid = ?",
+                (self.id, query, vid),
+            ).fetchone()
+        return self.__item(row) if row else None
+
+    def mark(
+        self,
+        query: str,
+        vid: str,
+        stage: str,
+        offset: int = None,
+        error: str = None,
+        depth: int = None,
+        **data,
+    ) -> None:
+        r"""Moves an item to `stage`, merging `data` into what was recorded before
+        :param query: Query the item was found through
+        :param vid: Video id
+        :param stage: One of `stages`
+        :param offset: (Optional) Bytes downloaded so far
+        :param error: (Optional) Reason of a failure
+        :param depth: (Optional) Related-video hops from the search results
+        :type query: str
+        :type vid: str
+        :type stage: str
+        :type offset: int
+        :type error: str
+        :type depth: int
+        """
+        assert stage in stages, f"'{stage}' is not in stages - {stages}"
+        conn = self.store.conn
+        now = time()
+        with self.store.lock:
+            row = conn.execute(
+                "SELECT data FROM items WHERE run = ? AND query = ? AND vid = ?",
+                (self.id, query, vid),
+            ).fetchone()
+            if row:
+                merged = json.loads(row[0] or "{}")
+                merged.update(data)
+                conn.execute(
+                    "UPDATE items SET stage = ?, offset = COALESCE(?, offset), error = ?, "
+                    "data = ?, updated = ? WHERE run = ? AND query = ? AND vid = ?",
+                    (stage, offset, error, json.dumps(merged), now, self.id, query, vid),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO items (run, query, vid, seq, depth, stage, offset, error, "
+                    "data, updated) VALUES (?, ?, ?, (SELECT COUNT(*) FROM items "
+                    "WHERE run = ?), ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.id,
+                        query,
+                        vid,
+                        self.id,
+                        depth or 0,
+                        stage,
+                        offset or 0,
+                        error,
+                        json.dumps(data),
+                        now,
+                    ),
+                )
+            conn.execute("UPDATE runs SET updated = ? WHERE id = ?", (now, self.id))
+
+    def finish(self, status: str = "done") -> None:
+        r"""Marks the run as finished, `done` runs are pruned after `keep_days`"""
+        with self.store.lock:
+            self.store.conn.execute(
+                "UPDATE runs SET status = ?, updated = ? WHERE id = ?",
+                (status, time(), self.id),
+            )
+        logging.debug(f"Run {self.id} {status}")
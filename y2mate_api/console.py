@@ -1,10 +1,13 @@
 import argparse
 import logging
+import json
 from . import __version__, __info__, __disclaimer__
 from .main import utils
-from os import getcwd, remove, getenv
-from sys import exit
-from .main import history_path, utils
+from os import getcwd, getenv
+from sys import exit, argv
+from .main import utils, cache, sessions, limiter, metrics, checkpoints, credentials
+from .library import dedupe_modes
+from .sinks import open_sink
 
 mp4_qualities = [
     "4k",
@@ -61,6 +64,11 @@ def get_args():
         choices=resolvers,
         metavar="|".join(resolvers),
     )
+    parser.add_argument(
+        "--select",
+        help="Format rules tried in turn, overrides --quality e.g 'smallest[height>=720]/best[size<=50MB]/best' - %(default)s",
+        metavar="RULES",
+    )
     parser.add_argument(
         "-k",
         "--keyword",
@@ -80,6 +88,27 @@ def get_args():
         type=int,
         default=1,
     )
+    parser.add_argument(
+        "--depth",
+        help="Related-video hops to follow beyond the first results, unlimited by default",
+        type=int,
+    )
+    parser.add_argument(
+        "--breadth",
+        help="Related videos followed from each video, all by default",
+        type=int,
+    )
+    parser.add_argument(
+        "--frontier",
+        help="Videos queued for a visit at most, the rest are dropped - %(default)s",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--bloom",
+        help="Track visited videos in a fixed-size Bloom filter for very large crawls - %(default)s",
+        action="store_true",
+    )
     parser.add_argument(
         "-d",
         "--dir",
@@ -101,12 +130,78 @@ def get_args():
         type=int,
         default=256,
     )
+    parser.add_argument(
+        "-s",
+        "--segments",
+        help="Parallel connections per download (where ranges are supported) - %(default)s",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--buffers",
+        help="Chunk-sized buffers between each connection and its disk writer - %(default)s",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--fsync",
+        help="Flush each download to disk before marking it complete - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        help="Seconds a download may go without receiving a byte before it re-connects - %(default)s",
+        type=float,
+        default=30,
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--min-rate",
+        help="Throughput in KB/s a download connection must sustain before it re-connects, 0 for none - %(default)s",
+        type=float,
+        default=0,
+        metavar="KB",
+    )
+    parser.add_argument(
+        "--reconnects",
+        help="Range re-connects of a stalled or truncated download before it fails - %(default)s",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--stdout",
+        help="Stream the media to stdout instead of saving files e.g `| ffmpeg -i - ...` - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--pipe",
+        help="Stream the media into this named pipe instead of saving files - %(default)s",
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--dedupe",
+        help="Hardlink (link) or delete (skip) downloads identical to media saved before - %(default)s",
+        choices=dedupe_modes,
+        default="off",
+    )
     parser.add_argument(
         "-i",
         "--input",
         help="Path to text file containing query per line - %(default)s",
         metavar="PATH",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Lines of --input processed at once - %(default)s",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--report",
+        help="Path to write per-line results of --input as json lines - %(default)s",
+        metavar="PATH",
+    )
     parser.add_argument(
         "-o",
         "--output",
@@ -119,6 +214,12 @@ def get_args():
         help="cf_clearance cookie value for y2mate.com",
         metavar="COOKIE",
     )
+    parser.add_argument(
+        "--cf-pool",
+        help="File of 'COOKIE [USER-AGENT]' lines rotated across requests, re-read when changed",
+        metavar="PATH",
+        default=getenv("Y2MATE_CF_POOL"),
+    )
     parser.add_argument(
         "-thr",
         "--thread",
@@ -126,6 +227,93 @@ def get_args():
         type=int,
         default=0,
     )
+    parser.add_argument(
+        "--batch-convert",
+        help="Submit all conversions first then poll them together - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--rounds",
+        help="Times to re-check a conversion in progress - %(default)s",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--poll-interval",
+        help="Seconds to wait between conversion checks - %(default)s",
+        type=float,
+        default=5,
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--converters",
+        help="Conversions running while earlier media download - %(default)s",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--max-link-age",
+        help="Seconds a dlink may wait for download before it is re-converted - %(default)s",
+        type=float,
+        default=600,
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--no-pipeline",
+        help="Convert and download one media at a time - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--pool-size",
+        help="Keep-alive connections per download host - %(default)s",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--pool-stats",
+        help="Log connection-reuse statistics when done - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--analyze-rate",
+        help="Maximum analyzeV2 requests per second, 0 for unlimited - %(default)s",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--convert-rate",
+        help="Maximum convertV2 requests per second, 0 for unlimited - %(default)s",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--download-rate",
+        help="Maximum download-host requests per second, 0 for unlimited - %(default)s",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--bandwidth",
+        help="Total download bandwidth in KB/s, 0 for unlimited - %(default)s",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--download-bandwidth",
+        help="Bandwidth of each download in KB/s, 0 for unlimited - %(default)s",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Write stage latencies, retries and throughput as json to this path",
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        help="Write the same metrics as a Prometheus textfile to this path",
+        metavar="PATH",
+    )
     parser.add_argument(
         "--disable-bar",
         help="Disable download progress bar - %(default)s",
@@ -143,7 +331,7 @@ def get_args():
     )
     parser.add_argument(
         "--quiet",
-        help="Not to stdout anything other than logs - %(default)s",
+        help="Hide progress and completed downloads, errors are still logged - %(default)s",
         action="store_true",
     )
     parser.add_argument(
@@ -156,29 +344,194 @@ def get_args():
         help="Clear all download histories - %(default)s",
         action="store_true",
     )
+    parser.add_argument(
+        "--no-cache",
+        help="Bypass the cache of search and format responses - %(default)s",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dlink-ttl",
+        help="Seconds a converted download link is reused before converting again, 0 to disable - %(default)s",
+        type=float,
+        default=7200,
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--purge-cache",
+        help="Delete all cached search and format responses - %(default)s",
+        action="store_true",
+    )
     parser.add_argument(
         "--resume", action="store_true", help="Resume downloading incomplete downloads"
     )
+    parser.add_argument(
+        "--resume-batch",
+        help="Continue an interrupted run with its recorded flags, 'last' for the latest unfinished one",
+        metavar="ID",
+    )
+    parser.add_argument(
+        "--runs",
+        help="Stdout recorded runs that can be resumed - %(default)s",
+        action="store_true",
+    )
     parser.add_argument(
         "--play", help="Play media after download - %(default)s", action="store_true"
     )
     return parser.parse_args()
 
 
+def get_serve_args(argv: list):
+    parser = argparse.ArgumentParser(
+        prog="y2mate serve",
+        description="Run jobs posted to a local HTTP/JSON API on warm sessions",
+        epilog="POST /jobs {query, format, quality, limit, ...} - GET /jobs/<id>[/progress] - DELETE /jobs/<id> - GET /status - GET /metrics",
+    )
+    parser.add_argument(
+        "--host", help="Interface to listen on - %(default)s", default="127.0.0.1"
+    )
+    parser.add_argument(
+        "-p", "--port", help="Port to listen on - %(default)s", type=int, default=8680
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Jobs running at once - %(default)s",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--queue-size",
+        help="Jobs waiting for a worker, more are refused with 429 - %(default)s",
+        type=int,
+        default=16,
+    )
+    parser.add_argument(
+        "--keep",
+        help="Finished jobs kept for status queries - %(default)s",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        help="Directory for saving the contents - %(default)s",
+        default=getcwd(),
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        help="Http request timeout in seconds - %(default)s",
+        type=int,
+        default=30,
+    )
+    parser.add_argument(
+        "-thr",
+        "--thread",
+        help="Downloads at once within a job - %(default)s",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-cf",
+        "--cf-clearance",
+        help="cf_clearance cookie value for y2mate.com",
+        metavar="COOKIE",
+    )
+    parser.add_argument(
+        "--cf-pool",
+        help="File of 'COOKIE [USER-AGENT]' lines rotated across requests, re-read when changed",
+        metavar="PATH",
+        default=getenv("Y2MATE_CF_POOL"),
+    )
+    parser.add_argument(
+        "--unique",
+        help="Auto-skip any media that you once dowloaded - %(default)s",
+        action="store_true",
+    )
+    return parser.parse_args(argv)
+
+
+def serve(argv: list):
+    args = get_serve_args(argv)
+    from .server import JobServer
+
+    metrics.enabled = True
+    cf_clearance_value = args.cf_clearance or getenv("Y2MATE_CF_CLEARANCE")
+    if cf_clearance_value:
+        sessions.master.cookies.update({"cf_clearance": cf_clearance_value})
+    if args.cf_pool:
+        credentials.load(args.cf_pool)
+    JobServer(
+        dict(timeout=args.timeout, unique=args.unique, thread=args.thread),
+        dict(dir=args.dir, progress_bar=False, quiet=True),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        keep=args.keep,
+    ).serve_forever()
+
+
 @utils.error_handler(exit_on_error=True)
 def main():
+    if argv[1:2] == ["serve"]:
+        return serve(argv[2:])
     args = get_args()
-    from . import Handler
-
+    if args.runs:
+        print(json.dumps(checkpoints.runs(), indent=4))
+        exit(0)
+    if args.resume_batch:
+        checkpoint = checkpoints.open(args.resume_batch)
+        # The cookie is never recorded, a fresh one is likely needed anyway.
+        # Flags added since the run was recorded keep their defaults
+        recorded = dict(vars(args))
+        recorded.update(checkpoint.args)
+        recorded.update(cf_clearance=args.cf_clearance, resume_batch=checkpoint.id)
+        args = argparse.Namespace(**recorded)
+        logging.info(f"Resuming run {checkpoint.id}")
     if args.history:
         print(utils.get_history(dump=True))
         exit(0)
     if args.clear:
-        remove(history_path)
+        utils.clear_history()
         logging.info("Histories cleared successfully!")
         exit(0)
+    if args.purge_cache:
+        cache.purge()
+        logging.info("Cache purged successfully!")
+        exit(0)
+    cache.enabled = args.no_cache == False
+    cache.ttls["dlink"] = args.dlink_ttl
+    metrics.enabled = bool(args.metrics_json or args.metrics_prom)
+    sessions.pool_size = args.pool_size
+    limiter.configure(
+        analyze=args.analyze_rate,
+        convert=args.convert_rate,
+        download=args.download_rate,
+        bandwidth=args.bandwidth * 1024,
+        download_bandwidth=args.download_bandwidth * 1024,
+    )
     if not args.format:
         raise Exception("You must specify media format [ -f mp3/4]")
+    if (args.stdout or args.pipe) and (args.confirm or args.play):
+        raise Exception("Streamed media can't be combined with --confirm or --play")
+    if args.select:
+        from .formats import FormatIndex
+
+        FormatIndex.parse(args.select)
+    from . import Handler
+    from .transfer import Download
+
+    Download.stall_timeout = args.stall_timeout
+    Download.min_rate = int(args.min_rate * 1024)
+    Download.reconnects = max(args.reconnects, 0)
+    if not args.resume_batch:
+        checkpoint = checkpoints.create(dict(vars(args), cf_clearance=None))
+        logging.info(
+            f"Recording run {checkpoint.id} - continue it with --resume-batch {checkpoint.id}"
+        )
+
     h_mult_args = lambda v: v if not v else " ".join(v)
     handler_init_args = dict(
         query=h_mult_args(args.query),
@@ -187,6 +540,7 @@ def main():
         confirm=args.confirm,
         unique=args.unique,
         thread=args.thread,
+        checkpoint=checkpoint,
     )
     auto_save_args = dict(
         dir=args.dir,
@@ -202,24 +556,62 @@ def main():
         format=args.format,
         quality=args.quality,
         resolver=args.resolver,
+        select=args.select,
         limit=args.limit,
+        depth=args.depth,
+        breadth=args.breadth,
+        frontier=args.frontier,
+        bloom=args.bloom,
         keyword=h_mult_args(args.keyword),
         author=h_mult_args(args.author),
         resume=args.resume,
+        segments=args.segments,
+        buffers=args.buffers,
+        fsync=args.fsync,
+        dedupe=args.dedupe,
+        sink=open_sink("-" if args.stdout else args.pipe) if args.stdout or args.pipe else None,
+        pipeline=args.no_pipeline == False,
+        converters=args.converters,
+        max_link_age=args.max_link_age,
+        batch=args.batch_convert,
+        rounds=args.rounds,
+        interval=args.poll_interval,
     )
     cf_clearance_value = args.cf_clearance or getenv("Y2MATE_CF_CLEARANCE")
     if cf_clearance_value:
         from . import session
 
         session.cookies.update({"cf_clearance": cf_clearance_value})
+    if args.cf_pool:
+        credentials.load(args.cf_pool)
     logging.info(f"y2mate launched - v{__version__}")
     if args.input:
-        for query in open(args.input).read().strip().split("\n"):
-            handler_init_args["query"] = query
-            auto_save_args["limit"] = 1
-            Handler(**handler_init_args).auto_save(**auto_save_args)
+        from .batch import BatchRunner
+
+        auto_save_args["limit"] = 1
+        summary = BatchRunner(
+            handler_init_args,
+            auto_save_args,
+            jobs=1 if args.confirm or auto_save_args["sink"] else args.jobs,
+            report_path=args.report,
+        ).run(args.input)
+        failed = summary["failed"]
     else:
-        Handler(**handler_init_args).auto_save(**auto_save_args)
+        summary = Handler(**handler_init_args).auto_save(**auto_save_args)
+        failed = len(summary["failed"])
+    if auto_save_args["sink"]:
+        auto_save_args["sink"].close()
+    checkpoint.finish("failed" if failed else "done")
+    total = len(summary["saved"])
     logging.info(
-        f"Done downloading ({args.limit}) {'audio' if args.format=='mp3' else 'video'}{'' if args.limit==1 else 's'}"
+        f"Done downloading ({total}) {'audio' if args.format=='mp3' else 'video'}{'' if total==1 else 's'}"
+        + (f" - ({failed}) failed" if failed else "")
     )
+    if args.pool_stats:
+        logging.info(f"Connection pool stats - {json.dumps(sessions.stats())}")
+        if credentials.enabled:
+            logging.info(f"cf_clearance pool stats - {json.dumps(credentials.stats())}")
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
@@ -0,0 +1,128 @@
+from time import sleep, monotonic
+from .main import logging, metrics, third_query
+
+"""
+Two-phase (submit all, then poll together) conversion of `second_query` objects
+"""
+
+
+class BatchConverter:
+    def __init__(
+        self,
+        format: str = "mp4",
+        quality: str = "auto",
+        resolver: str = None,
+        timeout: int = 30,
+        rounds: int = 4,
+        interval: float = 5,
+        max_interval: float = 30,
+        backoff: float = 1.5,
+        select: str = None,
+    ):
+        r"""Initializes this `class`
+        :param format: (Optional) Media format mp4/mp3
+        :type format: str
+        :param quality: (Optional) Media qualiy such as 720p/128kbps
+        :type quality: str
+        :param resolver: (Optional) Additional format info : [m4a,3gp,mp4,mp3]
+        :type resolver: str
+        :param timeout: (Optional) Http requests timeout
+        :type timeout: int
+        :param rounds: (Optional) Polling rounds before giving up on pending items
+        :type rounds: int
+        :param interval: (Optional) Initial seconds between polling rounds
+        :type interval: float
+        :param max_interval: (Optional) Upper bound of the interval
+        :type max_interval: float
+        :param backoff: (Optional) Interval multiplier for rounds without progress
+        :type backoff: float
+        :param select: (Optional) Format rules tried in turn, overrides quality
+        :type select: str
+        """
+        self.format = format
+        self.quality = quality
+        self.resolver = resolver
+        self.timeout = timeout
+        self.rounds = rounds
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.select = select
+
+    def __call__(self, *args, **kwargs):
+        return self.convert(*args, **kwargs)
+
+    def __check(self, query_three: third_query, entry: dict):
+        r"""Returns converted dict, None while converting or {} on failure"""
+        okay_status, resp = query_three.submit(entry, self.timeout)
+        if not okay_status:
+            logging.error(
+                f"Third query failed - [{resp.status_code} : {resp.reason}] - {query_three.query_two.vid}"
+            )
+            return {}
+        feedback = resp.json()
+        if feedback.get("c_status") == "CONVERTING":
+            metrics.count("conversion_rounds")
+            return
+        entry.update(feedback)
+        query_three.remember(entry)
+        return entry
+
+    def convert(self, query_twos: list):
+        r"""Submits conversion of every item first then polls the pending ones together
+        :param query_twos: Processed `second_query` objects
+        :type query_twos: list
+        :rtype: dict
+        """
+        pending = []
+        ready = []
+        # Every item is submitted before the first is handed out, so a consumer
+        # stopping early never leaves part of the list unsubmitted
+        for query_two in query_twos:
+            query_three = third_query(query_two)
+            hunted = query_three.hunt(
+                self.format, self.quality, self.resolver, self.select
+            )
+            if not hunted:
+                continue
+            cached = query_three.cached(hunted[0], self.timeout)
+            if cached:
+                hunted[0].update(cached)
+                ready.append(hunted[0])
+                continue
+            result = self.__check(query_three, hunted[0])
+            if result is None:
+                pending.append((query_three, hunted[0]))
+            elif result:
+                ready.append(result)
+        logging.debug(f"Submitted conversions - ({len(pending)}) pending")
+        yield from ready
+
+        interval = self.interval
+        checked_at = monotonic()
+        for round_no in range(self.rounds):
+            if not pending:
+                break
+            logging.debug(
+                f"Converting ({len(pending)}) items : sleeping for {interval}s - round {round_no+1}"
+            )
+            sleep(max(interval - (monotonic() - checked_at), 0))
+            checked_at = monotonic()
+            still_pending = []
+            for query_three, entry in pending:
+                result = self.__check(query_three, entry)
+                if result is None:
+                    still_pending.append((query_three, entry))
+                elif result:
+                    yield result
+            interval = (
+                self.interval
+                if len(still_pending) < len(pending)
+                else min(interval * self.backoff, self.max_interval)
+            )
+            pending = still_pending
+
+        for query_three, _ in pending:
+            logging.error(
+                f"Conversion unfinished after ({self.rounds}) rounds - {query_three.query_two.vid}"
+            )
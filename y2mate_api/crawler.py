@@ -0,0 +1,138 @@
+import heapq
+import logging
+from collections import deque
+from hashlib import blake2b
+from itertools import count
+from math import ceil, log
+
+"""
+Breadth-first crawl of search results and related videos
+"""
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001):
+        r"""Initializes this `class`
+        :param capacity: (Optional) Items expected, memory is fixed at creation
+        :type capacity: int
+        :param error_rate: (Optional) Acceptable false-positive rate at `capacity`
+        :type error_rate: float
+        """
+        self.size = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray(ceil(self.size / 8))
+        self.count = 0
+
+    def __positions(self, item: str):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for x in range(self.hashes):
+            yield (first + x * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self.__positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.__positions(item)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class Crawler:
+    def __init__(
+        self,
+        max_depth: int = None,
+        max_breadth: int = None,
+        frontier_size: int = 1000,
+        bloom: bool = False,
+        bloom_capacity: int = 1000000,
+        score: object = None,
+    ):
+        r"""Initializes this `class`
+        :param max_depth: (Optional) Related-video hops followed from the first results, None for unlimited
+        :type max_depth: int
+        :param max_breadth: (Optional) Related videos taken from each video, None for all
+        :type max_breadth: int
+        :param frontier_size: (Optional) Videos waiting to be visited, the rest are dropped
+        :type frontier_size: int
+        :param bloom: (Optional) Track seen ids in a fixed-size Bloom filter instead of a set
+        :type bloom: bool
+        :param bloom_capacity: (Optional) Ids the Bloom filter is sized for
+        :type bloom_capacity: int
+        :param score: (Optional) Callable ranking a video dict, higher is visited first - FIFO when None
+        :type score: object
+        """
+        self.max_depth = max_depth
+        self.max_breadth = max_breadth
+        self.frontier_size = frontier_size
+        self.score = score
+        self.seen = BloomFilter(bloom_capacity) if bloom else set()
+        self.frontier = [] if score else deque()
+        self.order = count()
+        self.stats = {"queued": 0, "duplicates": 0, "pruned": 0, "overflow": 0}
+
+    def __len__(self) -> int:
+        return len(self.frontier)
+
+    def __contains__(self, vid: str) -> bool:
+        return vid in self.seen
+
+    def __iter__(self):
+        r"""Pops videos until the frontier runs dry, pushes made meanwhile included"""
+        while self.frontier:
+            yield self.pop()
+
+    def push(self, entries: list, depth: int = 0) -> int:
+        r"""Queues unseen videos found at `depth`
+        :param entries: Dicts having video id `v` and title `t`
+        :param depth: (Optional) Hops from the first results, 0 for the results themselves
+        :type entries: list
+        :type depth: int
+        :rtype: int
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            self.stats["pruned"] += len(entries or [])
+            return 0
+        if depth and self.max_breadth is not None:
+            entries = (entries or [])[: self.max_breadth]
+        queued = 0
+        for entry in entries or []:
+            vid = entry.get("v")
+            if not vid or vid in self.seen:
+                self.stats["duplicates"] += 1
+                continue
+            if len(self.frontier) >= self.frontier_size:
+                self.stats["overflow"] += 1
+                continue
+            self.seen.add(vid)
+            if self.score:
+                heapq.heappush(
+                    self.frontier, (-self.score(entry), depth, next(self.order), entry)
+                )
+            else:
+                self.frontier.append((depth, entry))
+            queued += 1
+        self.stats["queued"] += queued
+        return queued
+
+    def pop(self) -> tuple:
+        r"""Next video to visit
+        :rtype: tuple(int, dict)
+        """
+        if self.score:
+            _, depth, _, entry = heapq.heappop(self.frontier)
+            return depth, entry
+        return self.frontier.popleft()
+
+    def log_stats(self) -> None:
+        logging.debug(
+            f"Crawl - queued ({self.stats['queued']}) duplicates ({self.stats['duplicates']}) "
+            f"beyond depth ({self.stats['pruned']}) frontier overflow ({self.stats['overflow']})"
+        )
@@ -0,0 +1,246 @@
+import logging
+from os import path
+from threading import Lock
+from time import monotonic
+
+"""
+Rotating pool of cf_clearance cookies and the user-agents they were issued to
+"""
+
+# Found in the interstitial pages Cloudflare serves instead of the origin's reply
+challenge_markers = ("cf-chl", "challenge-platform", "cf_chl_opt", "Just a moment...")
+
+
+class Credential:
+    def __init__(self, cookie: str, user_agent: str = None):
+        r"""Initializes this `class`
+        :param cookie: cf_clearance cookie value
+        :type cookie: str
+        :param user_agent: (Optional) User-Agent the cookie was issued to, Cloudflare binds them
+        :type user_agent: str
+        """
+        self.cookie = cookie
+        self.user_agent = user_agent
+        self.requests = 0
+        self.failures = 0
+        self.evicted = None
+
+    def __repr__(self):
+        return f"<Credential {self.name}>"
+
+    @property
+    def name(self) -> str:
+        r"""Cookie shortened for logs"""
+        return f"{self.cookie[:8]}..."
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.requests if self.requests else 0.0
+
+    def apply(self, kwargs: dict) -> dict:
+        r"""Sets cookie and User-Agent on keyword arguments of a request
+        :param kwargs: Keyword arguments of `Session.request`
+        :type kwargs: dict
+        :rtype: dict
+        """
+        kwargs["cookies"] = {"cf_clearance": self.cookie}
+        if self.user_agent:
+            kwargs["headers"] = dict(
+                kwargs.get("headers") or {}, **{"User-Agent": self.user_agent}
+            )
+        return kwargs
+
+
+class CredentialPool:
+    def __init__(
+        self,
+        max_failure_rate: float = 0.5,
+        min_requests: int = 10,
+        reload_interval: float = 5,
+        retries: int = 2,
+    ):
+        r"""Initializes this `class`
+        :param max_failure_rate: (Optional) Share of failed requests that evicts a credential
+        :type max_failure_rate: float
+        :param min_requests: (Optional) Requests made before `max_failure_rate` applies
+        :type min_requests: int
+        :param reload_interval: (Optional) Seconds between checks of the file for changes
+        :type reload_interval: float
+        :param retries: (Optional) Requests repeated on the next credential after an eviction
+        :type retries: int
+        """
+        self.max_failure_rate = max_failure_rate
+        self.min_requests = min_requests
+        self.reload_interval = reload_interval
+        self.retries = retries
+        self.lock = Lock()
+        self.path = None
+        self.mtime = None
+        self.checked_at = 0
+        self.credentials = []
+        self.position = 0
+        self.exhausted = False
+
+    def __len__(self) -> int:
+        return len(self.healthy)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def healthy(self) -> list:
+        return [credential for credential in self.credentials if not credential.evicted]
+
+    @staticmethod
+    def parse(line: str) -> Credential:
+        r"""Credential in a `COOKIE [USER-AGENT]` line, None for blanks and `#` comments
+        :param line: Line of the pool file
+        :type line: str
+        :rtype: Credential
+        """
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return
+        cookie, _, user_agent = line.partition(" ")
+        if cookie.startswith("cf_clearance="):
+            cookie = cookie[len("cf_clearance=") :]
+        return Credential(cookie, user_agent.strip() or None)
+
+    def load(self, pool_path: str) -> None:
+        r"""Reads credentials from `pool_path`, one `COOKIE [USER-AGENT]` per line
+        :param pool_path: Path to the pool file, re-read whenever it changes
+        :type pool_path: str
+        """
+        assert path.isfile(pool_path), f"cf_clearance pool not found - '{pool_path}'"
+        self.path = pool_path
+        with self.lock:
+            self.__reload(force=True)
+
+    def __reload(self, force: bool = False) -> None:
+        r"""Swaps in the credentials of a changed file, called with `lock` held"""
+        try:
+            mtime = path.getmtime(self.path)
+        except OSError as e:
+            logging.warning(f"Keeping cf_clearance pool - {e}")
+            return
+        if mtime == self.mtime and not force:
+            return
+        with open(self.path) as fh:
+            parsed = [credential for credential in map(self.parse, fh) if credential]
+        known = {credential.cookie: credential for credential in self.credentials}
+        credentials = []
+        added = 0
+        for credential in parsed:
+            # Stats and evictions survive a reload of the same line, an edited line starts afresh
+            current = known.get(credential.cookie)
+            if current and current.user_agent == credential.user_agent:
+                credentials.append(current)
+            else:
+                credentials.append(credential)
+                added += 1
+        self.credentials = credentials
+        self.mtime = mtime
+        if added:
+            self.exhausted = False
+        logging.info(
+            f"Loaded cf_clearance pool - ({len(self.healthy)}) healthy of ({len(credentials)})"
+            + (f", ({added}) new" if added and not force else "")
+        )
+
+    def acquire(self) -> Credential:
+        r"""Next healthy credential in rotation, None when the pool is off or exhausted
+        :rtype: Credential
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if monotonic() - self.checked_at >= self.reload_interval:
+                self.checked_at = monotonic()
+                self.__reload()
+            healthy = self.healthy
+            if not healthy:
+                if not self.exhausted:
+                    self.exhausted = True
+                    logging.error(
+                        "Every cf_clearance cookie in the pool is evicted - add fresh ones to "
+                        f"{self.path}"
+                    )
+                return
+            self.position = (self.position + 1) % len(healthy)
+            credential = healthy[self.position]
+            credential.requests += 1
+            return credential
+
+    @staticmethod
+    def challenged(resp) -> bool:
+        r"""Whether `resp` is a Cloudflare challenge rather than a reply of the origin
+        :param resp: Http response
+        :rtype: bool
+        """
+        if resp.headers.get("cf-mitigated", "").lower() == "challenge":
+            return True
+        if resp.status_code not in (403, 503):
+            return False
+        try:
+            text = resp.text
+        except Exception:
+            return False
+        return any(marker in text for marker in challenge_markers)
+
+    def report(
+        self,
+        credential: Credential,
+        status_code: int,
+        is_json: bool,
+        challenged: bool = False,
+    ) -> bool:
+        r"""Records the outcome of a request, returns False when it evicted the credential
+        :param credential: Credential the request was made with
+        :param status_code: Http status of the response
+        :param is_json: Whether the response is json as the API replies
+        :param challenged: (Optional) Whether Cloudflare challenged the request - see `challenged`
+        :type credential: Credential
+        :type status_code: int
+        :type is_json: bool
+        :type challenged: bool
+        :rtype: bool
+        """
+        failed = status_code >= 400 or not is_json
+        reason = None
+        with self.lock:
+            if failed:
+                credential.failures += 1
+            if challenged:
+                reason = f"{status_code} challenge"
+            # Outages of the origin only count towards the failure rate
+            elif (
+                credential.requests >= self.min_requests
+                and credential.failure_rate > self.max_failure_rate
+            ):
+                reason = f"failure rate {round(credential.failure_rate, 2)}"
+            if not reason:
+                return True
+            if credential.evicted:
+                return False
+            credential.evicted = reason
+        logging.warning(
+            f"Evicted cf_clearance {credential.name} - {reason} - ({len(self)}) left"
+        )
+        return False
+
+    def stats(self) -> list:
+        r"""Requests, failures and state of every credential
+        :rtype: list
+        """
+        with self.lock:
+            return [
+                {
+                    "cookie": credential.name,
+                    "requests": credential.requests,
+                    "failures": credential.failures,
+                    "failure_rate": round(credential.failure_rate, 3),
+                    "evicted": credential.evicted,
+                }
+                for credential in self.credentials
+            ]
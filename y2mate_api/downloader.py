@@ -5,13 +5,19 @@ from .main import (
     second_query,
     third_query,
     headers,
+    metrics,
+    get_excep,
 )
-from tqdm import tqdm
+from .transfer import Download, StreamDownload
+from .sinks import Sink, open_sink
+from .scheduler import DownloadScheduler
+from .pipeline import Pipeline
+from .conversion import BatchConverter
+from .progress import Dashboard
+from .crawler import Crawler
+from .checkpoint import Checkpoint
 from colorama import Fore
 from os import path, getcwd
-from threading import Thread
-from click import launch as launch_media, confirm as confirm_from_user
-import requests as requests_native
 
 """
 - query string
@@ -36,6 +42,7 @@ class Handler:
         confirm: bool = False,
         unique: bool = False,
         thread: int = 0,
+        checkpoint: Checkpoint = None,
     ):
         r"""Initializes this `class`
         :param query: Video name or youtube link
@@ -50,6 +57,8 @@ class Handler:
         :type confirm: bool
         :param thread: (Optional) Thread the download process through `auto-save` method
         :type thread int
+        :param checkpoint: (Optional) Run to record stages in and resume from
+        :type checkpoint: Checkpoint
         """
         self.query = query
         self.author = author
@@ -58,9 +67,9 @@ class Handler:
         self.confirm = confirm
         self.unique = unique
         self.thread = thread
+        self.checkpoint = checkpoint
         self.vitems = []
-        self.related = []
-        self.dropped = []
+        self.crawler = Crawler()
         self.total = 1
         self.saved_videos = utils.get_history()
 
@@ -97,8 +106,16 @@ class Handler:
     def __make_first_query(self):
         r"""Sets query_one attribute to `self`"""
         query_one = first_query(self.query)
-        self.__setattr__("query_one", query_one.main(self.timeout))
-        if self.query_one.is_link == False:
+        recorded = self.checkpoint.search(self.query) if self.checkpoint else None
+        if recorded:
+            logging.debug(f"Recorded first query  : {self.query}")
+            query_one.parse(recorded)
+        else:
+            query_one.main(self.timeout)
+            if self.checkpoint and query_one.processed:
+                self.checkpoint.searched(self.query, query_one.raw)
+        self.__setattr__("query_one", query_one)
+        if self.query_one.processed and self.query_one.is_link == False:
             self.vitems.extend(self.__filter_videos(self.query_one.vitems))
 
     @utils.error_handler(exit_on_error=True)
@@ -106,6 +123,8 @@ class Handler:
         video_id = second_query_obj.vid
         video_author = second_query_obj.a or "unknown"
         video_title = second_query_obj.title or "untitled"
+        if self.confirm:
+            from click import confirm as confirm_from_user
         if video_id in self.saved_videos:
             if self.unique:
                 return False, "Duplicate"
@@ -124,82 +143,118 @@ class Handler:
         return True, "Auto"
 
     def __make_second_query(self):
-        r"""Links first query with 3rd query"""
-        init_query_two = second_query(self.query_one)
+        r"""Visits search results (or the linked video) then their related videos breadth-first"""
+        assert self.query_one.processed, "First query failed"
+        recorded = [
+            item
+            for item in (self.checkpoint.items(self.query) if self.checkpoint else [])
+            if item.get("analysis")
+        ]
+        for item in recorded:
+            self.crawler.seen.add(item["vid"])
+        if self.query_one.is_link:
+            self.crawler.push([{"v": self.query_one.vid, "t": self.query_one.title}])
+        else:
+            self.crawler.push(self.vitems)
         x = 0
-        if not self.query_one.is_link:
-            for video_dict in self.vitems:
-                init_query_two.video_dict = video_dict
-                query_2 = init_query_two.main(timeout=self.timeout)
-                if query_2.processed:
-                    if query_2.vid in self.dropped:
-                        continue
-                    if self.author and not self.author.lower() in query_2.a.lower():
-                        logging.warning(
-                            f"Dropping {Fore.YELLOW+query_2.title+Fore.RESET} by  {Fore.RED+query_2.a+Fore.RESET}"
-                        )
-                        continue
-                    else:
-                        yes_download, reason = self.__verify_item(query_2)
-                        if not yes_download:
-                            logging.warning(
-                                f"Skipping {Fore.YELLOW+query_2.title+Fore.RESET} by {Fore.MAGENTA+query_2.a+Fore.RESET} -  Reason : {Fore.BLUE+reason+Fore.RESET}"
-                            )
-                            self.dropped.append(query_2.vid)
-                            continue
-                        self.related.append(query_2.related)
-                        yield query_2
-                        x += 1
-                        if x >= self.total:
-                            break
-                else:
-                    logging.warning(
-                        f"Dropping unprocessed query_two object of index {x}"
-                    )
+        # Items of an interrupted run come first, finished ones only count towards the limit
+        for item in recorded:
+            if x >= self.total:
+                break
+            query_2 = second_query(self.query_one)
+            query_2.video_dict = {"v": item["vid"], "t": item["analysis"].get("title")}
+            query_2.parse(item["analysis"])
+            self.crawler.push(query_2.related, item["depth"] + 1)
+            x += 1
+            if item["stage"] != "done":
+                yield query_2
+        for depth, video_dict in self.crawler:
+            if x >= self.total:
+                break
+            query_2 = second_query(self.query_one)
+            query_2.video_dict = video_dict
+            query_2.main(timeout=self.timeout)
+            if not query_2.processed:
+                logging.warning(
+                    f"Dropping unprocessed query_two object of id {video_dict.get('v')}"
+                )
+                continue
+            if self.author and not self.author.lower() in (query_2.a or "").lower():
+                logging.warning(
+                    f"Dropping {Fore.YELLOW+query_2.title+Fore.RESET} by  {Fore.RED+query_2.a+Fore.RESET}"
+                )
+                continue
+            yes_download, reason = self.__verify_item(query_2)
+            if not yes_download:
+                logging.warning(
+                    f"Skipping {Fore.YELLOW+query_2.title+Fore.RESET} by {Fore.MAGENTA+query_2.a+Fore.RESET} -  Reason : {Fore.BLUE+reason+Fore.RESET}"
+                )
+                continue
+            self.crawler.push(query_2.related, depth + 1)
+            if self.checkpoint:
+                self.checkpoint.mark(
+                    self.query, query_2.vid, "resolved", depth=depth, analysis=query_2.raw
+                )
+            yield query_2
+            x += 1
+        self.crawler.log_stats()
 
-        else:
-            query_2 = init_query_two.main(timeout=self.timeout)
-            if query_2.processed:
-                # self.related.extend(query_2.related)
-                self.vitems.extend(query_2.related)
-                self.query_one.is_link = False
-                if self.total == 1:
-                    yield query_2
-                else:
-                    for video_dict in self.vitems:
-                        init_query_two.video_dict = video_dict
-                        query_2 = init_query_two.main(timeout=self.timeout)
-                        if query_2.processed:
-                            if (
-                                self.author
-                                and not self.author.lower() in query_2.a.lower()
-                            ):
-                                logging.warning(
-                                    f"Dropping {Fore.YELLOW+query_2.title+Fore.RESET} by  {Fore.RED+query_2.a+Fore.RESET}"
-                                )
-                                continue
-                            else:
-                                yes_download, reason = self.__verify_item(query_2)
-                                if not yes_download:
-                                    logging.warning(
-                                        f"Skipping {Fore.YELLOW+query_2.title+Fore.RESET} by {Fore.MAGENTA+query_2.a+Fore.RESET} -  Reason : {Fore.BLUE+reason+Fore.RESET}"
-                                    )
-                                    self.dropped.append(query_2.vid)
-                                    continue
+    def __prepare(
+        self,
+        format: str = "mp4",
+        quality: str = "auto",
+        resolver: str = None,
+        limit: int = 1,
+        keyword: str = None,
+        author: str = None,
+        rounds: int = 4,
+        interval: float = 5,
+        depth: int = None,
+        breadth: int = None,
+        frontier: int = 1000,
+        bloom: bool = False,
+        select: str = None,
+    ) -> tuple:
+        r"""Makes the first query and returns the second-query generator with the conversion args
+        :rtype: tuple(generator, dict)
+        """
+        self.author = author
+        self.keyword = keyword
+        self.total = limit
+        self.crawler = Crawler(
+            max_depth=depth, max_breadth=breadth, frontier_size=frontier, bloom=bloom
+        )
+        self.__make_first_query()
+        conversion_args = dict(
+            format=format,
+            quality=quality,
+            resolver=resolver,
+            timeout=self.timeout,
+            rounds=rounds,
+            interval=interval,
+            select=select,
+        )
+        return self.__make_second_query(), conversion_args
 
-                                self.related.append(query_2.related)
-                                yield query_2
-                                x += 1
-                                if x >= self.total:
-                                    break
-                        else:
-                            logging.warning(
-                                f"Dropping unprocessed query_two object of index {x}"
-                            )
-                            yield
-            else:
-                logging.warning("Dropping unprocessed query_two object")
-                yield
+    def __convert(self, query_two: second_query, conversion_args: dict) -> dict:
+        r"""Converts `query_two` unless the run recorded its conversion already"""
+        recorded = (
+            self.checkpoint.item(self.query, query_two.vid) if self.checkpoint else None
+        )
+        if recorded and recorded.get("converted"):
+            logging.debug(f"Recorded third query  : {query_two.vid}")
+            return recorded["converted"]
+        third_dict = third_query(query_two).main(**conversion_args)
+        self.__mark(query_two.vid, third_dict, "Conversion failed")
+        return third_dict
+
+    def __mark(self, vid: str, third_dict: dict, error: str) -> None:
+        if not self.checkpoint:
+            return
+        if third_dict:
+            self.checkpoint.mark(self.query, vid, "converted", converted=third_dict)
+        else:
+            self.checkpoint.mark(self.query, vid, "failed", error=error)
 
     def run(
         self,
@@ -209,6 +264,14 @@ class Handler:
         limit: int = 1,
         keyword: str = None,
         author: str = None,
+        batch: bool = False,
+        rounds: int = 4,
+        interval: float = 5,
+        depth: int = None,
+        breadth: int = None,
+        frontier: int = 1000,
+        bloom: bool = False,
+        select: str = None,
     ):
         r"""Generate and yield video dictionary
         :param format: (Optional) Media format mp4/mp3
@@ -217,31 +280,114 @@ class Handler:
         :param limit: (Optional) Total videos to be generated
         :param keyword: (Optional) Video keyword
         :param author: (Optional) Author of the videos
+        :param batch: (Optional) Submit all conversions first then poll them together
+        :param rounds: (Optional) Times to re-check conversions in progress
+        :param interval: (Optional) Seconds to wait between the rounds
+        :param depth: (Optional) Related-video hops to follow, None for unlimited
+        :param breadth: (Optional) Related videos followed from each video, None for all
+        :param frontier: (Optional) Videos waiting to be visited, the rest are dropped
+        :param bloom: (Optional) Track visited ids with a fixed-size Bloom filter
+        :param select: (Optional) Format rules tried in turn e.g `smallest[height>=720]/best[size<=50MB]/best` - overrides quality
         :type quality: str
         :type total: int
         :type keyword: str
         :type author: str
+        :type batch: bool
+        :type rounds: int
+        :type interval: float
+        :type depth: int
+        :type breadth: int
+        :type frontier: int
+        :type bloom: bool
+        :type select: str
         :rtype: object
         """
-        self.author = author
-        self.keyword = keyword
-        self.total = limit
-        self.__make_first_query()
-        for query_two_obj in self.__make_second_query():
-            if query_two_obj:
-                self.vitems.extend(query_two_obj.related)
-                yield third_query(query_two_obj).main(
-                    **dict(
-                        format=format,
-                        quality=quality,
-                        resolver=resolver,
-                        timeout=self.timeout,
-                    )
+        for third_dict, _, _ in self.__convert_all(
+            format,
+            quality,
+            resolver,
+            limit,
+            keyword,
+            author,
+            batch,
+            rounds=rounds,
+            interval=interval,
+            depth=depth,
+            breadth=breadth,
+            frontier=frontier,
+            bloom=bloom,
+            select=select,
+        ):
+            yield third_dict
+
+    def __convert_all(
+        self,
+        format: str = "mp4",
+        quality: str = "auto",
+        resolver: str = None,
+        limit: int = 1,
+        keyword: str = None,
+        author: str = None,
+        batch: bool = False,
+        rounds: int = 4,
+        interval: float = 5,
+        depth: int = None,
+        breadth: int = None,
+        frontier: int = 1000,
+        bloom: bool = False,
+        select: str = None,
+    ):
+        r"""`Handler.run` yielding `second_query` and error along, the dict empty on failure
+        :rtype: tuple(dict, second_query, str)
+        """
+        query_twos, conversion_args = self.__prepare(
+            format,
+            quality,
+            resolver,
+            limit,
+            keyword,
+            author,
+            rounds=rounds,
+            interval=interval,
+            depth=depth,
+            breadth=breadth,
+            frontier=frontier,
+            bloom=bloom,
+            select=select,
+        )
+        if batch:
+            pending = {}
+            for query_two_obj in query_twos:
+                recorded = (
+                    self.checkpoint.item(self.query, query_two_obj.vid)
+                    if self.checkpoint
+                    else None
                 )
-            else:
-                logging.error(f"Empty object - {query_two_obj}")
+                if recorded and recorded.get("converted"):
+                    yield recorded["converted"], query_two_obj, None
+                else:
+                    pending[query_two_obj.vid] = query_two_obj
+            for third_dict in BatchConverter(**conversion_args).convert(
+                list(pending.values())
+            ):
+                self.__mark(third_dict.get("vid"), third_dict, None)
+                yield third_dict, pending.pop(third_dict.get("vid"), None), None
+            for query_two_obj in pending.values():
+                self.__mark(query_two_obj.vid, {}, "Conversion failed")
+                yield {}, query_two_obj, "Conversion failed"
+            return
+        for query_two_obj in query_twos:
+            try:
+                third_dict = self.__convert(query_two_obj, conversion_args)
+            except Exception as e:
+                logging.error(f"Conversion of {query_two_obj.vid} failed - {get_excep(e)}")
+                self.__mark(query_two_obj.vid, {}, str(get_excep(e)))
+                yield {}, query_two_obj, str(get_excep(e))
+                continue
+            yield third_dict, query_two_obj, None if third_dict else "Conversion failed"
 
-    def generate_filename(self, third_dict: dict, naming_format: str = None) -> str:
+    @staticmethod
+    def generate_filename(third_dict: dict, naming_format: str = None) -> str:
         r"""Generate filename based on the response of `third_query`
         :param third_dict: response of `third_query.main()` object
         :param naming_format: (Optional) Format for generating filename based on `third_dict` keys
@@ -285,6 +431,15 @@ class Handler:
         chunk_size: int = 512,
         play: bool = False,
         resume: bool = False,
+        segments: int = 1,
+        buffers: int = 4,
+        fsync: bool = False,
+        dedupe: str = "off",
+        sink: object = None,
+        dashboard: Dashboard = None,
+        pipeline: bool = True,
+        converters: int = 1,
+        max_link_age: float = 600,
         *args,
         **kwargs,
     ):
@@ -292,11 +447,20 @@ class Handler:
         :param dir: (Optional) Path to Directory for saving the media files
         :param iterator: (Optional) Function that yields third_query object - `Handler.run`
         :param progress_bar: (Optional) Display progress bar
-        :param quiet: (Optional) Not to stdout anything
+        :param quiet: (Optional) Hide progress and completed downloads
         :param naming_format: (Optional) Format for generating filename
         :param chunk_size: (Optional) Chunk_size for downloading files in KB
         :param play: (Optional) Auto-play the media after download
         :param resume: (Optional) Resume the incomplete download
+        :param segments: (Optional) Parallel connections per download
+        :param buffers: (Optional) Chunk-sized write buffers per connection
+        :param fsync: (Optional) Flush every download to disk before renaming it
+        :param dedupe: (Optional) link/skip/off - hardlink or drop downloads identical to saved media
+        :param sink: (Optional) Stream every media in turn into `-` (stdout), a named pipe, file-like object or callable
+        :param dashboard: (Optional) Progress surface shared with other callers, one is made when `progress_bar`
+        :param pipeline: (Optional) Convert the next media while the current one downloads
+        :param converters: (Optional) Conversions in flight at once when pipelined
+        :param max_link_age: (Optional) Seconds a converted dlink may wait for download before it is re-converted
         :type dir: str
         :type iterator: object
         :type progress_bar: bool
@@ -305,45 +469,105 @@ class Handler:
         :type chunk_size: int
         :type play: bool
         :type resume: bool
+        :type segments: int
+        :type buffers: int
+        :type fsync: bool
+        :type dedupe: str
+        :type sink: object
+        :type dashboard: Dashboard
+        :type pipeline: bool
+        :type converters: int
+        :type max_link_age: float
         args & kwargs for the iterator
-        :rtype: None
+        :rtype: dict
         """
-        iterator_object = iterator or self.run(*args, **kwargs)
+        # Prompts of `confirm` and batch conversion need the stages to run in turn
+        pipelined = (
+            pipeline
+            and iterator is None
+            and not args
+            and not self.confirm
+            and not kwargs.get("batch")
+        )
+        own_dashboard = dashboard is None
+        if own_dashboard:
+            dashboard = Dashboard(enabled=progress_bar and not quiet).start()
+        # Media follow one another into a sink, so only one is downloaded at a time
+        own_sink = sink is not None and not isinstance(sink, Sink)
+        if sink is not None:
+            sink = open_sink(sink)
+        download_workers = self.thread if sink is None else 1
 
-        for x, entry in enumerate(iterator_object):
-            if self.thread:
-                t1 = Thread(
-                    target=self.save,
-                    args=(
-                        entry,
-                        dir,
-                        False,
-                        quiet,
-                        naming_format,
-                        chunk_size,
-                        play,
-                        resume,
-                    ),
-                )
-                t1.start()
-                thread_count = x + 1
-                if thread_count % self.thread == 0 or thread_count == self.total:
-                    logging.debug(
-                        f"Waiting for current running threads to finish - thread_count : {thread_count}"
-                    )
-                    t1.join()
-            else:
-                self.save(
+        def save(entry: dict) -> str:
+            try:
+                saved_to = self.save(
                     entry,
                     dir,
-                    progress_bar,
+                    False,
                     quiet,
                     naming_format,
                     chunk_size,
                     play,
                     resume,
+                    segments,
+                    buffers,
+                    fsync,
+                    dedupe=dedupe,
+                    sink=sink,
+                    dashboard=dashboard,
                 )
+            except Exception as e:
+                if self.checkpoint:
+                    self.checkpoint.mark(
+                        self.query, entry.get("vid"), "failed", error=str(get_excep(e))
+                    )
+                raise
+            if self.checkpoint and saved_to:
+                self.checkpoint.mark(self.query, entry.get("vid"), "done", saved_to=saved_to)
+            return saved_to
+
+        try:
+            if pipelined:
+                kwargs.pop("batch", None)
+                query_twos, conversion_args = self.__prepare(**kwargs)
+                summary = Pipeline(
+                    query_twos,
+                    lambda query_two: self.__convert(query_two, conversion_args),
+                    save,
+                    refresh=lambda third_dict: third_query.refresh(
+                        third_dict,
+                        timeout=self.timeout,
+                        rounds=conversion_args["rounds"],
+                        interval=conversion_args["interval"],
+                    ),
+                    convert_workers=converters,
+                    download_workers=download_workers,
+                    max_link_age=max_link_age,
+                ).run()
+            else:
+                scheduler = DownloadScheduler(save, workers=download_workers)
+                with scheduler:
+                    if iterator:
+                        for entry in iterator:
+                            scheduler.submit(entry)
+                    else:
+                        for entry, query_two, error in self.__convert_all(
+                            *args, **kwargs
+                        ):
+                            scheduler.submit(entry, query_two, error)
+                summary = scheduler.summary()
+        finally:
+            if own_dashboard:
+                dashboard.stop()
+            if own_sink:
+                sink.close()
+        logging.debug(
+            f"Saved ({len(summary['saved'])}) failed ({len(summary['failed'])}) "
+            f"- {round(summary['bytes'] / 1000000, 2)}MB in {summary['duration']}s"
+        )
+        return summary
 
+    @metrics.timed("save")
     def save(
         self,
         third_dict: dict,
@@ -354,18 +578,30 @@ class Handler:
         chunk_size: int = 512,
         play: bool = False,
         resume: bool = False,
+        segments: int = 1,
+        buffers: int = 4,
+        fsync: bool = False,
         disable_history=False,
+        dedupe: str = "off",
+        sink: object = None,
+        dashboard: Dashboard = None,
     ):
         r"""Download media based on response of `third_query` dict-data-type
         :param third_dict: Response of `third_query.run()`
         :param dir: (Optional) Directory for saving the contents
         :param progress_bar: (Optional) Display download progress bar
-        :param quiet: (Optional) Not to stdout anything
+        :param quiet: (Optional) Hide progress and completed downloads
         :param naming_format: (Optional) Format for generating filename
         :param chunk_size: (Optional) Chunk_size for downloading files in KB
         :param play: (Optional) Auto-play the media after download
-        :param resume: (Optional) Resume the incomplete download
+        :param resume: (Optional) Adopt an incomplete file at the final path, `.part` files resume regardless
+        :param segments: (Optional) Parallel range connections for the download
+        :param buffers: (Optional) Chunk-sized buffers between each connection and the disk writer
+        :param fsync: (Optional) Flush the file to disk before renaming it
         :param disable_history (Optional) Don't save the download to history.
+        :param dedupe: (Optional) link/skip/off - hardlink or drop the file when identical media is saved already
+        :param sink: (Optional) Stream the media into `-` (stdout), a named pipe, file-like object or callable instead
+        :param dashboard: (Optional) Progress surface to report on instead of a bar of its own
         :type third_dict: dict
         :type dir: str
         :type progress_bar: bool
@@ -374,7 +610,13 @@ class Handler:
         :type chunk_size: int
         :type play: bool
         :type resume: bool
+        :type segments: int
+        :type buffers: int
+        :type fsync: bool
         :type disable_history: bool
+        :type dedupe: str
+        :type sink: object
+        :type dashboard: Dashboard
         :rtype: None
         """
         if third_dict:
@@ -384,87 +626,93 @@ class Handler:
             if third_dict.get("mess"):
                 logging.warning(third_dict.get("mess"))
 
-            current_downloaded_size = 0
-            current_downloaded_size_in_mb = 0
             filename = self.generate_filename(third_dict, naming_format)
-            save_to = path.join(dir, filename)
-            mod_headers = headers
-
-            if resume:
-                assert path.exists(save_to), f"File not found in path - '{save_to}'"
-                current_downloaded_size = path.getsize(save_to)
-                # Set the headers to resume download from the last byte
-                mod_headers = {"Range": f"bytes={current_downloaded_size}-"}
-                current_downloaded_size_in_mb = round(
-                    current_downloaded_size / 1000000, 2
-                )  # convert to mb
-
-            resp = requests_native.get(
-                third_dict["dlink"], stream=True, headers=mod_headers
-            )
+            if sink is not None:
+                own_sink = not isinstance(sink, Sink)
+                sink = open_sink(sink)
+                download = StreamDownload(
+                    third_dict,
+                    sink,
+                    chunk_size=chunk_size * 1024,
+                    headers=headers,
+                    timeout=self.timeout,
+                    buffers=buffers,
+                )
+                save_to = sink.name
+            else:
+                save_to = path.join(dir, filename)
+                download = Download(
+                    third_dict,
+                    save_to,
+                    segments=segments,
+                    chunk_size=chunk_size * 1024,
+                    headers=headers,
+                    timeout=self.timeout,
+                    resume=resume,
+                    buffers=buffers,
+                    fsync=fsync,
+                    on_checkpoint=(
+                        (
+                            lambda committed: self.checkpoint.mark(
+                                self.query,
+                                third_dict.get("vid"),
+                                "downloading",
+                                offset=committed,
+                            )
+                        )
+                        if self.checkpoint
+                        else None
+                    ),
+                )
+            try:
+                size_in_bytes = download.open()
+                size_in_mb = round(size_in_bytes / 1000000, 2)
 
-            default_content_length = 0
-            size_in_bytes = int(
-                resp.headers.get("content-length", default_content_length)
-            )
-            if not size_in_bytes:
-                if resume:
-                    raise FileExistsError(
-                        f"Download completed for the file in path - '{save_to}'"
-                    )
-                else:
-                    raise Exception(
-                        f"Cannot download file of content-length {size_in_bytes} bytes "
-                        f"-  {resp.headers.get('content-type')} ({resp.status_code}, {resp.reason})"
-                        f" - {resp.url}"
-                    )
+                third_dict["saved_to"] = (
+                    save_to
+                    if any([sink is not None, save_to.startswith("/"), ":" in save_to])
+                    else path.join(getcwd(), dir, filename)
+                )
 
-            if resume:
-                assert (
-                    size_in_bytes != current_downloaded_size
-                ), f"Download completed for the file in path - '{save_to}'"
+                def try_play_media():
+                    if play and sink is None:
+                        from click import launch as launch_media
 
-            size_in_mb = (
-                round(size_in_bytes / 1000000, 2) + current_downloaded_size_in_mb
-            )
-            chunk_size_in_bytes = chunk_size * 1024
+                        launch_media(third_dict["saved_to"])
 
-            third_dict["saved_to"] = (
-                save_to
-                if any([save_to.startswith("/"), ":" in save_to])
-                else path.join(getcwd(), dir, filename)
-            )
-            try_play_media = lambda: (
-                launch_media(third_dict["saved_to"]) if play else None
-            )
-            saving_mode = "ab" if resume else "wb"
-            if progress_bar:
-                if not quiet:
-                    print(f"{filename}")
-                with tqdm(
-                    total=size_in_bytes + current_downloaded_size,
-                    bar_format="%s%d MB %s{bar} %s{l_bar}%s"
-                    % (Fore.GREEN, size_in_mb, Fore.CYAN, Fore.YELLOW, Fore.RESET),
-                    initial=current_downloaded_size,
-                ) as p_bar:
-                    # p_bar.update(current_downloaded_size)
-                    with open(save_to, saving_mode) as fh:
-                        for chunks in resp.iter_content(chunk_size=chunk_size_in_bytes):
-                            fh.write(chunks)
-                            p_bar.update(chunk_size_in_bytes)
-                    if not disable_history:
-                        utils.add_history(third_dict)
-                    try_play_media()
-                    return save_to
+                own_dashboard = dashboard is None and progress_bar and not quiet
+                if own_dashboard:
+                    dashboard = Dashboard().start()
+                transfer = (
+                    dashboard.add(filename, size_in_bytes, download.offset)
+                    if dashboard
+                    else None
+                )
+                try:
+                    download.fetch(transfer.update if transfer else None)
+                finally:
+                    if transfer:
+                        dashboard.remove(transfer)
+                    if own_dashboard:
+                        dashboard.stop()
+                download.finish()
+            finally:
+                if sink is not None and own_sink:
+                    sink.close()
+            if sink is None:
+                original = utils.dedupe(third_dict, download.sha256, download.size, dedupe)
+                if original and dedupe == "skip":
+                    save_to = original
             else:
-                with open(save_to, saving_mode) as fh:
-                    for chunks in resp.iter_content(chunk_size=chunk_size_in_bytes):
-                        fh.write(chunks)
-                if not disable_history:
-                    utils.add_history(third_dict)
+                third_dict["sha256"] = download.sha256
+            if not disable_history:
+                utils.add_history(third_dict)
+            # Read by `DownloadScheduler`, files and sinks alike, never recorded
+            third_dict["transferred"] = download.committed - download.offset
 
-                try_play_media()
+            try_play_media()
+            if not quiet:
                 logging.info(f"{filename} - {size_in_mb}MB ✅")
-                return save_to
+            return save_to
         else:
             logging.error(f"Empty `third_dict` parameter parsed : {third_dict}")
@@ -0,0 +1,241 @@
+import re
+import logging
+
+"""
+Typed index of the formats listed by `analyzeV2` and rule-based selection over it
+"""
+
+size_units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+named_heights = {"4k": 2160, "8k": 4320, "2k": 1440}
+sorters = ["best", "worst", "smallest", "largest"]
+filter_pattern = re.compile(r"^\s*(height|bitrate|size|ext)\s*(<=|>=|!=|<|>|=)\s*(\S+?)\s*$")
+operators = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def parse_size(size: str) -> int:
+    r"""Bytes in a size label such as `5.5 MB`, None when not parseable
+    :param size: Size label
+    :type size: str
+    :rtype: int
+    """
+    match = re.match(r"^\s*([\d.]+)\s*([KMG]?B)\s*$", str(size or ""), re.I)
+    if not match:
+        return None
+    return int(float(match.group(1)) * size_units[match.group(2).upper()])
+
+
+def parse_height(quality: str) -> int:
+    r"""Vertical resolution in a quality label such as `720p` or `4k`
+    :param quality: Quality label
+    :type quality: str
+    :rtype: int
+    """
+    quality = str(quality or "").lower()
+    if quality in named_heights:
+        return named_heights[quality]
+    match = re.match(r"^(\d+)p", quality)
+    return int(match.group(1)) if match else None
+
+
+def parse_bitrate(*labels) -> int:
+    r"""Kbps in the first label mentioning them such as `.m4a (128kbps)`
+    :rtype: int
+    """
+    for label in labels:
+        match = re.search(r"(\d+)\s*kbps", str(label or ""), re.I)
+        if match:
+            return int(match.group(1))
+
+
+class MediaFormat:
+    def __init__(self, key: str, entry: dict, kind: str, duration: float = None):
+        r"""Initializes this `class`
+        :param key: Format id in `links`
+        :type key: str
+        :param entry: Raw format entry having `size`, `f`, `q` and `k`
+        :type entry: dict
+        :param kind: mp4 or mp3
+        :type kind: str
+        :param duration: (Optional) Length of the media in seconds, used to estimate bitrate
+        :type duration: float
+        """
+        self.key = key
+        self.entry = entry
+        self.kind = kind
+        self.ext = entry.get("f")
+        self.quality = entry.get("q")
+        self.height = parse_height(self.quality)
+        self.size = parse_size(entry.get("size"))
+        self.bitrate = parse_bitrate(self.quality, entry.get("q_text"))
+        if self.bitrate is None and self.size and duration:
+            # Average over the whole file, good enough to compare renditions
+            self.bitrate = int(self.size * 8 / duration / 1000)
+
+    def __repr__(self):
+        return (
+            f"<MediaFormat {self.kind} {self.quality} ({self.ext}) "
+            f"height={self.height} bitrate={self.bitrate} size={self.size}>"
+        )
+
+    @property
+    def rank(self) -> tuple:
+        r"""Sort key, higher is better quality"""
+        if self.kind == "mp4":
+            return (self.height or 0, self.bitrate or 0, self.size or 0)
+        return (self.bitrate or 0, self.size or 0)
+
+    @property
+    def known(self) -> bool:
+        r"""Whether it names a concrete rendition rather than `auto`"""
+        return bool(self.height or self.bitrate)
+
+    def value(self, field: str):
+        return getattr(self, field)
+
+
+class FormatRule:
+    def __init__(self, rule: str):
+        r"""Initializes this `class`
+        :param rule: Sorter optionally followed by filters e.g `smallest[height>=720][size<=50MB]`
+        :type rule: str
+        """
+        self.rule = rule.strip()
+        match = re.match(r"^(\w+)((?:\[[^\]]*\])*)$", self.rule)
+        assert match, f"Malformed format rule '{self.rule}'"
+        self.sorter = match.group(1).lower()
+        assert (
+            self.sorter in sorters
+        ), f"'{self.sorter}' is not in supported sorters - {sorters}"
+        self.filters = []
+        for condition in re.findall(r"\[([^\]]*)\]", match.group(2)):
+            parsed = filter_pattern.match(condition)
+            assert parsed, f"Malformed filter '[{condition}]' in format rule '{self.rule}'"
+            field, operator, value = parsed.groups()
+            self.filters.append((field, operators[operator], self.__convert(field, value)))
+
+    def __repr__(self):
+        return f"<FormatRule {self.rule}>"
+
+    @staticmethod
+    def __convert(field: str, value: str):
+        if field == "ext":
+            return value.lower()
+        if field == "size":
+            size = parse_size(value if not value.isdigit() else f"{value}B")
+            assert size is not None, f"'{value}' is not a size such as 50MB"
+            return size
+        if field == "height":
+            height = parse_height(value if not value.isdigit() else f"{value}p")
+            assert height is not None, f"'{value}' is not a resolution such as 720p"
+            return height
+        bitrate = parse_bitrate(value if not value.isdigit() else f"{value}kbps")
+        assert bitrate is not None, f"'{value}' is not a bitrate such as 192kbps"
+        return bitrate
+
+    def matches(self, media_format: MediaFormat) -> bool:
+        for field, operator, value in self.filters:
+            actual = media_format.value(field)
+            # Unknown values can't be shown to satisfy a limit
+            if actual is None or not operator(actual, value):
+                return False
+        return True
+
+    def pick(self, media_formats: list, resolver: str = None) -> MediaFormat:
+        r"""The format this rule selects, None when nothing matches
+        :param media_formats: Candidates
+        :param resolver: (Optional) Container preferred among equals
+        :type media_formats: list
+        :type resolver: str
+        :rtype: MediaFormat
+        """
+        candidates = [
+            media_format
+            for media_format in media_formats
+            if media_format.known and self.matches(media_format)
+        ]
+        if not candidates:
+            return
+        preferred = lambda media_format: media_format.ext == resolver
+        if self.sorter == "smallest":
+            # Unknown sizes sort behind every known one, the better rendition wins a tie
+            return min(
+                candidates,
+                key=lambda media_format: (
+                    media_format.size is None,
+                    media_format.size or 0,
+                    [-value for value in media_format.rank],
+                    not preferred(media_format),
+                ),
+            )
+        if self.sorter == "largest":
+            return max(
+                candidates,
+                key=lambda media_format: (
+                    media_format.size is not None,
+                    media_format.size or 0,
+                    media_format.rank,
+                    preferred(media_format),
+                ),
+            )
+        if self.sorter == "best":
+            return max(
+                candidates,
+                key=lambda media_format: (media_format.rank, preferred(media_format)),
+            )
+        return min(
+            candidates,
+            key=lambda media_format: (media_format.rank, not preferred(media_format)),
+        )
+
+
+class FormatIndex:
+    def __init__(self, links: dict, duration: float = None):
+        r"""Initializes this `class`
+        :param links: `links` of `analyzeV2` detail response
+        :type links: dict
+        :param duration: (Optional) Length of the media in seconds
+        :type duration: float
+        """
+        self.formats = {"mp4": [], "mp3": []}
+        for kind in self.formats:
+            for key, entry in ((links or {}).get(kind) or {}).items():
+                self.formats[kind].append(MediaFormat(key, entry, kind, duration))
+
+    def __getitem__(self, kind: str) -> list:
+        return self.formats[kind]
+
+    def __len__(self) -> int:
+        return sum(len(media_formats) for media_formats in self.formats.values())
+
+    @staticmethod
+    def parse(rules: str) -> list:
+        r"""Splits a fallback chain such as `smallest[height>=720]/best[size<50MB]/best`
+        :param rules: Rules separated by `/`, tried in turn
+        :type rules: str
+        :rtype: list
+        """
+        return [FormatRule(rule) for rule in str(rules).split("/") if rule.strip()]
+
+    def select(self, rules: object, kind: str = "mp4", resolver: str = None) -> MediaFormat:
+        r"""First format picked along the fallback chain
+        :param rules: Chain as str or list of `FormatRule`
+        :param kind: (Optional) mp4 or mp3
+        :param resolver: (Optional) Container preferred among equals
+        :type rules: object
+        :type kind: str
+        :type resolver: str
+        :rtype: MediaFormat
+        """
+        rules = self.parse(rules) if isinstance(rules, str) else rules
+        for rule in rules:
+            picked = rule.pick(self.formats[kind], resolver)
+            if picked:
+                logging.debug(f"Format rule {rule.rule} picked {picked}")
+                return picked
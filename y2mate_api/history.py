@@ -0,0 +1,163 @@
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from os import path, makedirs, replace
+from threading import RLock
+
+"""
+Indexed download history backed by sqlite
+"""
+
+
+class HistoryStore:
+    def __init__(self, db_path: str, json_path: str = None, prog: str = "y2mate"):
+        r"""Initializes this `class`
+        :param db_path: Path to the sqlite store
+        :type db_path: str
+        :param json_path: (Optional) Legacy `history.json` to migrate from
+        :type json_path: str
+        :param prog: (Optional) Root key of the dumped history
+        :type prog: str
+        """
+        self.db_path = db_path
+        self.json_path = json_path
+        self.prog = prog
+        self.lock = RLock()
+        self.__conn = None
+        self.__vids = set()
+        self.__formats = set()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        r"""Lazily opened connection, migrating legacy history on first use"""
+        with self.lock:
+            if self.__conn is None:
+                if not path.isdir(path.dirname(self.db_path)):
+                    makedirs(path.dirname(self.db_path))
+                conn = sqlite3.connect(
+                    self.db_path,
+                    check_same_thread=False,
+                    isolation_level=None,
+                    timeout=30,
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, "
+                    "vid TEXT, ftype TEXT, fquality TEXT, datetime TEXT, data TEXT)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS history_format "
+                    "ON history (vid, ftype, fquality)"
+                )
+                self.__conn = conn
+                self.__migrate()
+                for vid, ftype, fquality in conn.execute(
+                    "SELECT vid, ftype, fquality FROM history"
+                ):
+                    self.__vids.add(vid)
+                    self.__formats.add((vid, ftype, fquality))
+            return self.__conn
+
+    def open(self) -> "HistoryStore":
+        r"""Connects now rather than on first use, surfacing errors of the store early
+        :rtype: HistoryStore
+        """
+        self.conn
+        return self
+
+    def __migrate(self):
+        if not self.json_path or not path.isfile(self.json_path):
+            return
+        try:
+            with open(self.json_path) as fh:
+                entries = json.load(fh).get(self.prog) or []
+            self.__conn.execute("BEGIN")
+            self.__conn.executemany(
+                "INSERT INTO history (vid, ftype, fquality, datetime, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [self.__row(entry) for entry in entries],
+            )
+            self.__conn.execute("COMMIT")
+            replace(self.json_path, self.json_path + ".migrated")
+            logging.info(f"Migrated ({len(entries)}) history entries to {self.db_path}")
+        except Exception as e:
+            if self.__conn.in_transaction:
+                self.__conn.execute("ROLLBACK")
+            logging.error(f"Failed to migrate history - {e}")
+
+    @staticmethod
+    def __row(data: dict) -> tuple:
+        return (
+            data.get("vid"),
+            data.get("ftype"),
+            data.get("fquality"),
+            data.get("datetime"),
+            json.dumps(data),
+        )
+
+    def add(self, data: dict) -> None:
+        r"""Adds entry to history
+        :param data: Response of `third query`
+        :type data: dict
+        :rtype: None
+        """
+        conn = self.conn
+        data["datetime"] = datetime.now().strftime("%c")
+        with self.lock:
+            conn.execute(
+                "INSERT INTO history (vid, ftype, fquality, datetime, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self.__row(data),
+            )
+            self.__vids.add(data.get("vid"))
+            self.__formats.add(
+                (data.get("vid"), data.get("ftype"), data.get("fquality"))
+            )
+
+    def contains(self, vid: str, ftype: str = None, fquality: str = None) -> bool:
+        r"""Checks whether media was once downloaded
+        :param vid: Video id
+        :param ftype: (Optional) Media format mp4/mp3
+        :param fquality: (Optional) Media quality
+        :type vid: str
+        :type ftype: str
+        :type fquality: str
+        :rtype: bool
+        """
+        self.conn
+        if ftype is None:
+            return vid in self.__vids
+        return (vid, ftype, fquality) in self.__formats
+
+    def __contains__(self, vid: str) -> bool:
+        return self.contains(vid)
+
+    def __iter__(self):
+        self.conn
+        return iter(list(self.__vids))
+
+    def __len__(self) -> int:
+        self.conn
+        return len(self.__vids)
+
+    def entries(self) -> list:
+        r"""Lists all history entries in order of download"""
+        conn = self.conn
+        with self.lock:
+            return [
+                json.loads(row[0])
+                for row in conn.execute("SELECT data FROM history ORDER BY id")
+            ]
+
+    def dump(self) -> str:
+        r"""Returns whole history as json str"""
+        return json.dumps({self.prog: self.entries()}, indent=4)
+
+    def clear(self) -> None:
+        r"""Deletes all history entries"""
+        conn = self.conn
+        with self.lock:
+            conn.execute("DELETE FROM history")
+            self.__vids.clear()
+            self.__formats.clear()
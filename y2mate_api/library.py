@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import sqlite3
+from os import path, makedirs, remove, replace, link
+from threading import RLock
+from time import time
+
+"""
+Content manifest of saved media, used to hardlink or skip duplicate downloads
+"""
+
+dedupe_modes = ["link", "skip", "off"]
+
+
+def hash_file(file_path: str, hasher: object = None, end: int = None) -> object:
+    r"""Feeds the first `end` bytes of a file to `hasher`
+    :param file_path: Path to the file
+    :param hasher: (Optional) `hashlib` object, sha256 when not given
+    :param end: (Optional) Bytes to read, the whole file when not given
+    :type file_path: str
+    :type hasher: object
+    :type end: int
+    :rtype: object
+    """
+    hasher = hasher or hashlib.sha256()
+    remaining = path.getsize(file_path) if end is None else end
+    with open(file_path, "rb") as fh:
+        while remaining > 0:
+            chunk = fh.read(min(remaining, 1048576))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+class ContentManifest:
+    def __init__(self, db_path: str):
+        r"""Initializes this `class`
+        :param db_path: Path to the sqlite store
+        :type db_path: str
+        """
+        self.db_path = db_path
+        self.lock = RLock()
+        self.__conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        r"""Lazily opened connection"""
+        with self.lock:
+            if self.__conn is None:
+                if not path.isdir(path.dirname(self.db_path)):
+                    makedirs(path.dirname(self.db_path))
+                conn = sqlite3.connect(
+                    self.db_path,
+                    check_same_thread=False,
+                    isolation_level=None,
+                    timeout=30,
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+                    "sha256 TEXT, size INTEGER, vid TEXT, ftype TEXT, fquality TEXT, "
+                    "added REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+                self.__conn = conn
+            return self.__conn
+
+    def add(self, file_path: str, sha256: str, size: int, third_dict: dict = {}) -> None:
+        r"""Records the content of a saved file
+        :param file_path: Absolute path of the file
+        :param sha256: Hex digest of its content
+        :param size: Bytes in the file
+        :param third_dict: (Optional) Response of `third_query` the file was saved from
+        :type file_path: str
+        :type sha256: str
+        :type size: int
+        :type third_dict: dict
+        """
+        conn = self.conn
+        with self.lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, sha256, size, vid, ftype, fquality, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path.abspath(file_path),
+                    sha256,
+                    size,
+                    third_dict.get("vid"),
+                    third_dict.get("ftype"),
+                    third_dict.get("fquality"),
+                    time(),
+                ),
+            )
+
+    def lookup(self, sha256: str, size: int, exclude: str = None) -> str:
+        r"""Path of a file still holding this content, None when there is none
+        :param sha256: Hex digest of the content
+        :param size: Bytes in the content
+        :param exclude: (Optional) Path not to return, usually the new copy itself
+        :type sha256: str
+        :type size: int
+        :type exclude: str
+        :rtype: str
+        """
+        conn = self.conn
+        exclude = exclude and path.abspath(exclude)
+        with self.lock:
+            rows = conn.execute(
+                "SELECT path FROM files WHERE sha256 = ? AND size = ? ORDER BY added",
+                (sha256, size),
+            ).fetchall()
+        for (file_path,) in rows:
+            if file_path == exclude:
+                continue
+            # Files moved or edited since are dropped rather than trusted
+            if path.isfile(file_path) and path.getsize(file_path) == size:
+                return file_path
+            self.forget(file_path)
+
+    def forget(self, file_path: str) -> None:
+        r"""Drops the record of a file"""
+        conn = self.conn
+        with self.lock:
+            conn.execute("DELETE FROM files WHERE path = ?", (path.abspath(file_path),))
+
+    def entries(self) -> list:
+        r"""Every recorded file, oldest first"""
+        conn = self.conn
+        with self.lock:
+            return [
+                dict(zip(("path", "sha256", "size", "vid", "ftype", "fquality", "added"), row))
+                for row in conn.execute(
+                    "SELECT path, sha256, size, vid, ftype, fquality, added FROM files "
+                    "ORDER BY added"
+                )
+            ]
+
+    def dedupe(self, file_path: str, sha256: str, size: int, mode: str = "link") -> str:
+        r"""Replaces a new file by the copy already in the library
+        :param file_path: Path of the file just saved
+        :param sha256: Hex digest of its content
+        :param size: Bytes in the file
+        :param mode: (Optional) `link` hardlinks the existing copy in its place, `skip` deletes it
+        :type file_path: str
+        :type sha256: str
+        :type size: int
+        :type mode: str
+        :rtype: str
+        """
+        assert mode in dedupe_modes, f"'{mode}' is not in dedupe modes - {dedupe_modes}"
+        existing = mode != "off" and self.lookup(sha256, size, exclude=file_path)
+        if not existing:
+            return
+        if mode == "skip":
+            remove(file_path)
+            return existing
+        temp_path = file_path + ".link"
+        try:
+            link(existing, temp_path)
+        except OSError as e:
+            # Other filesystem or no hardlink support - keep the copy
+            logging.debug(f"Cannot hardlink {existing} - {e}")
+            return
+        replace(temp_path, file_path)
+        return existing
@@ -1,15 +1,20 @@
-# import requests
-from curl_cffi import requests
 import logging
 from time import sleep
-import json
-from os import path, makedirs
-from datetime import datetime
+from copy import deepcopy
+from os import path, getenv
 from appdirs import AppDirs
 from sys import exit
+from .cache import ResponseCache
+from .history import HistoryStore
+from .checkpoint import CheckpointStore
+from .credentials import CredentialPool
+from .library import ContentManifest
+from .sessions import SessionPool
+from .ratelimit import RateLimiter
+from .telemetry import Metrics
+from .formats import FormatIndex
 
 __prog__ = "y2mate"
-session = requests.Session()
 
 headers = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
@@ -19,23 +24,52 @@ headers = {
     "referer": "https://y2mate.com",
 }
 
-session.headers.update(headers)
+
+def new_session():
+    r"""Builds the curl_cffi session shared by the main thread"""
+    from curl_cffi import requests
+
+    session = requests.Session()
+    session.headers.update(headers)
+    return session
+
+
+sessions = SessionPool(new_session)
+
+limiter = RateLimiter()
+
+credentials = CredentialPool()
+
+metrics = Metrics()
 
 get_excep = lambda e: e.args[1] if len(e.args) > 1 else e
 
+# Cache directory is created by the stores on first use
 appdir = AppDirs(__prog__)
 
-if not path.isdir(appdir.user_cache_dir):
-    try:
-        makedirs(appdir.user_cache_dir)
-    except Exception as e:
-        print(
-            f"Error : {get_excep(e)}  while creating site directory - "
-            + appdir.user_cache_dir
-        )
-
 history_path = path.join(appdir.user_cache_dir, "history.json")
 
+base_url = getenv("Y2MATE_BASE_URL", "https://www.y2mate.com").rstrip("/")
+analyze_url = f"{base_url}/mates/analyzeV2/ajax"
+convert_url = f"{base_url}/mates/convertV2/index"
+
+history = HistoryStore(
+    path.join(appdir.user_cache_dir, "history.db"), history_path, __prog__
+)
+
+cache = ResponseCache(path.join(appdir.user_cache_dir, "responses.db"))
+
+manifest = ContentManifest(path.join(appdir.user_cache_dir, "library.db"))
+
+checkpoints = CheckpointStore(path.join(appdir.user_cache_dir, "checkpoints.db"))
+
+
+def __getattr__(name: str):
+    # `session` loads curl_cffi, so it is only built once something asks for it
+    if name == "session":
+        return sessions.master
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class utils:
     @staticmethod
@@ -65,65 +99,104 @@ class utils:
 
         return decorator
 
+    @staticmethod
+    def request(method: str, url: str, **kwargs) -> tuple:
+        r"""Sends http request rotating the pooled cf_clearance cookies
+        :param method: get/post
+        :param url: Url of the API
+        :type method: str
+        :type url: str
+        :rtype: tuple(bool, object)
+        """
+        kwargs["impersonate"] = "chrome"
+        for attempt in range(credentials.retries + 1):
+            credential = credentials.acquire()
+            if credential:
+                credential.apply(kwargs)
+            limiter.acquire(url)
+            resp = getattr(sessions.api(), method)(url, **kwargs)
+            is_json = "application/json" in resp.headers.get("content-type", "")
+            okay_status = all([resp.ok, is_json])
+            if not okay_status:
+                metrics.count("api_errors")
+            if not credential or credentials.report(
+                credential, resp.status_code, is_json, credentials.challenged(resp)
+            ):
+                break
+            metrics.count("credential_evictions")
+        return okay_status, resp
+
     @staticmethod
     def get(*args, **kwargs):
         r"""Sends http get request"""
-        kwargs["impersonate"] = "chrome"
-        resp = session.get(*args, **kwargs)
-        return all([resp.ok, "application/json" in resp.headers["content-type"]]), resp
+        return utils.request("get", *args, **kwargs)
 
     @staticmethod
     def post(*args, **kwargs):
         r"""Sends http post request"""
-        kwargs["impersonate"] = "chrome"
-        resp = session.post(*args, **kwargs)
-        return all([resp.ok, "application/json" in resp.headers["content-type"]]), resp
+        return utils.request("post", *args, **kwargs)
 
     @staticmethod
     def add_history(data: dict) -> None:
-        f"""Adds entry to history
+        r"""Adds entry to history
         :param data: Response of `third query`
         :type data: dict
         :rtype: None
         """
         try:
-            if not path.isfile(history_path):
-                data1 = {__prog__: []}
-                with open(history_path, "w") as fh:
-                    json.dump(data1, fh)
-            with open(history_path) as fh:
-                saved_data = json.load(fh).get(__prog__)
-            data["datetime"] = datetime.now().strftime("%c")
-            saved_data.append(data)
-            with open(history_path, "w") as fh:
-                json.dump({__prog__: saved_data}, fh, indent=4)
+            history.add(data)
         except Exception as e:
             logging.error(f"Failed to add to history - {get_excep(e)}")
 
     @staticmethod
-    def get_history(dump: bool = False) -> list:
+    def dedupe(third_dict: dict, sha256: str, size: int, mode: str = "off") -> str:
+        r"""Records a saved file in the manifest, replacing it by an identical one already there
+        :param third_dict: Response of `third query` having `saved_to`
+        :param sha256: Hex digest of the file
+        :param size: Bytes in the file
+        :param mode: (Optional) link/skip/off - hardlink or delete the duplicate, or keep it
+        :type third_dict: dict
+        :type sha256: str
+        :type size: int
+        :type mode: str
+        :rtype: str
+        """
+        third_dict["sha256"] = sha256
+        try:
+            original = manifest.dedupe(third_dict["saved_to"], sha256, size, mode)
+            if original and mode == "skip":
+                metrics.count("dedupe_skipped")
+                logging.info(f"Skipped duplicate of {original}")
+                third_dict["saved_to"] = original
+                return original
+            if original:
+                metrics.count("dedupe_linked")
+                logging.info(f"Hardlinked duplicate of {original}")
+            manifest.add(third_dict["saved_to"], sha256, size, third_dict)
+            return original
+        except Exception as e:
+            logging.error(f"Failed to deduplicate {third_dict['saved_to']} - {get_excep(e)}")
+
+    @staticmethod
+    def get_history(dump: bool = False) -> HistoryStore:
         r"""Loads download history
         :param dump: (Optional) Return whole history as str
         :type dump: bool
-        :rtype: list|str
+        :rtype: HistoryStore|str
         """
         try:
-            resp = []
-            if not path.isfile(history_path):
-                data1 = {__prog__: []}
-                with open(history_path, "w") as fh:
-                    json.dump(data1, fh)
-            with open(history_path) as fh:
-                if dump:
-                    return json.dumps(json.load(fh), indent=4)
-                entries = json.load(fh).get(__prog__)
-            for entry in entries:
-                resp.append(entry.get("vid"))
-            return resp
+            if dump:
+                return history.dump()
+            return history.open()
         except Exception as e:
             logging.error(f"Failed to load history - {get_excep(e)}")
             return []
 
+    @staticmethod
+    def clear_history() -> None:
+        r"""Deletes all download histories"""
+        history.clear()
+
 
 class first_query:
     def __init__(self, query: str):
@@ -132,7 +205,7 @@ class first_query:
         :type query: str
         """
         self.query_string = query
-        self.url = "https://www.y2mate.com/mates/analyzeV2/ajax"
+        self.url = analyze_url
         self.payload = self.__get_payload()
         self.processed = False
         self.is_link = False
@@ -168,26 +241,42 @@ class first_query:
     def __call__(self, timeout: int = 30):
         return self.main(timeout)
 
+    def parse(self, dict_data: dict):
+        r"""Sets class attributes from `analyzeV2` search response
+        :param dict_data: Json response
+        :type dict_data: dict
+        """
+        self.__setattr__("raw", dict_data)
+        for key in dict_data.keys():
+            self.__setattr__(key, dict_data.get(key))
+        self.is_link = not hasattr(self, "vitems")
+        self.processed = True
+        return self
+
+    @metrics.timed("first_query")
     def main(self, timeout=30):
         r"""Sets class attributes
         :param timeout: (Optional) Http requests timeout
         :type timeout: int
         """
+        cached = cache.get("search", self.query_string)
+        if cached:
+            metrics.count("cache_hits")
+            logging.debug(f"Cached first query  : {self.query_string}")
+            return self.parse(cached)
         logging.debug(f"Making first query  : {self.payload.get('k_query')}")
         okay_status, resp = utils.post(self.url, data=self.payload, timeout=timeout)
         # print(resp.headers["content-type"])
         # print(resp.content)
         if okay_status:
-            dict_data = resp.json()
-            self.__setattr__("raw", dict_data)
-            for key in dict_data.keys():
-                self.__setattr__(key, dict_data.get(key))
-            self.is_link = not hasattr(self, "vitems")
-            self.processed = True
+            self.parse(resp.json())
+            cache.set("search", self.query_string, self.raw)
         else:
             logging.debug(f"{resp.headers.get('content-type')} - {resp.content}")
             logging.error(f"First query failed - [{resp.status_code} : {resp.reason}]")
-            if session.cookies.get("cf_clearance"):
+            if credentials.enabled:
+                logging.info(f"cf_clearance pool - ({len(credentials)}) healthy cookies left")
+            elif sessions.master.cookies.get("cf_clearance"):
                 logging.info("Seems like CF-CLEARANCE cookie has expired!")
             else:
                 logging.info("Try passing CF-CLEARANCE cookie.")
@@ -208,7 +297,7 @@ class second_query:
         self.item_no = item_no
         self.processed = False
         self.video_dict = None
-        self.url = "https://www.y2mate.com/mates/analyzeV2/ajax"
+        self.url = analyze_url
         # self.payload  = self.__get_payload()
 
     def __str__(self):
@@ -288,6 +377,31 @@ class second_query:
     def __exit__(self, *args, **kwargs):
         self.processed = False
 
+    def parse(self, dict_data: dict):
+        r"""Sets formats and related videos from `analyzeV2` detail response
+        :param dict_data: Json response
+        :type dict_data: dict
+        """
+        # Format entries get dlink, saved_to etc written into them later
+        dict_data = deepcopy(dict_data)
+        for key in dict_data.keys():
+            self.__setattr__(key, dict_data.get(key))
+        links = dict_data.get("links")
+        self.__setattr__("video", links.get("mp4"))
+        self.__setattr__("audio", links.get("mp3"))
+        duration = dict_data.get("t")
+        self.__setattr__(
+            "format_index",
+            FormatIndex(
+                links, duration if isinstance(duration, (int, float)) else None
+            ),
+        )
+        self.__setattr__("related", dict_data.get("related")[0].get("contents"))
+        self.__setattr__("raw", dict_data)
+        self.processed = True
+        return self
+
+    @metrics.timed("second_query")
     def main(self, item_no: int = 0, timeout: int = 30):
         r"""Requests for video formats and related videos
         :param item_no: (Optional) Index of query_one.vitems
@@ -298,24 +412,45 @@ class second_query:
         self.processed = False
         if item_no:
             self.item_no = item_no
+        vid = self.get_item().get("v")
+        if cache.failed(vid):
+            logging.debug(f"Skipping second query of recently failed id : {vid}")
+            return self
+        cached = cache.get("formats", vid)
+        if cached:
+            metrics.count("cache_hits")
+            logging.debug(f"Cached second query  : {vid}")
+            return self.parse(cached)
         okay_status, resp = utils.post(
             self.url, data=self.get_payload(), timeout=timeout
         )
 
         if okay_status:
-            dict_data = resp.json()
-            for key in dict_data.keys():
-                self.__setattr__(key, dict_data.get(key))
-            links = dict_data.get("links")
-            self.__setattr__("video", links.get("mp4"))
-            self.__setattr__("audio", links.get("mp3"))
-            self.__setattr__("related", dict_data.get("related")[0].get("contents"))
-            self.__setattr__("raw", dict_data)
-            self.processed = True
+            self.store(vid, resp.json())
 
         else:
             logging.debug(f"{resp.headers.get('content-type')} - {resp.content}")
             logging.error(f"Second query failed - [{resp.status_code} : {resp.reason}]")
+            cache.add_failure(vid)
+        return self
+
+    def store(self, vid: str, dict_data: dict):
+        r"""Parses `dict_data` and caches it, or records a failure when it lacks formats
+        :param vid: Video id queried
+        :param dict_data: Json response
+        :type vid: str
+        :type dict_data: dict
+        """
+        try:
+            self.parse(dict_data)
+        except Exception as e:
+            logging.error(f"Second query returned unusable response - {get_excep(e)}")
+            cache.add_failure(vid)
+            return self
+        if self.video or self.audio:
+            cache.set("formats", vid, dict_data)
+        else:
+            cache.add_failure(vid)
         return self
 
 
@@ -323,7 +458,7 @@ class third_query:
     def __init__(self, query_two: object):
         assert query_two.processed, "Unprocessed second_query object parsed"
         self.query_two = query_two
-        self.url = "https://www.y2mate.com/mates/convertV2/index"
+        self.url = convert_url
         self.formats = ["mp4", "mp3"]
         self.qualities_plus = ["best", "worst"]
         self.qualities = {
@@ -368,21 +503,23 @@ class third_query:
     def get_payload(self, keys):
         return {"k": keys.get("k"), "vid": self.query_two.vid}
 
-    def main(
+    def hunt(
         self,
         format: str = "mp4",
         quality="auto",
         resolver: str = None,
-        timeout: int = 30,
-    ):
-        r"""
+        select: str = None,
+    ) -> list:
+        r"""Lists `query_two` format entries matching the params, preferred first
         :param format: (Optional) Media format mp4/mp3
         :param quality: (Optional) Media qualiy such as 720p
         :param resolver: (Optional) Additional format info : [m4a,3gp,mp4,mp3]
-        :param timeout: (Optional) Http requests timeout
-        :type type: str
+        :param select: (Optional) Format rules tried in turn e.g `smallest[height>=720]/best[size<=50MB]/best` - overrides quality
+        :type format: str
         :type quality: str
-        :type timeout: int
+        :type resolver: str
+        :type select: str
+        :rtype: list
         """
         if not resolver:
             resolver = "mp4" if format == "mp4" else "mp3"
@@ -398,12 +535,12 @@ class third_query:
 
         items = self.query_two.video if format == "mp4" else self.query_two.audio
         hunted = []
-        if quality in self.qualities_plus:
-            keys = list(items.keys())
-            if quality == self.qualities_plus[0]:
-                hunted.append(items[keys[0]])
-            else:
-                hunted.append(items[keys[len(keys) - 2]])
+        if select or quality in self.qualities_plus:
+            picked = self.query_two.format_index.select(
+                select or quality, format, resolver
+            )
+            if picked:
+                hunted.append(picked.entry)
         else:
             for key in items.keys():
                 if items[key].get("q") == quality:
@@ -412,41 +549,156 @@ class third_query:
             for entry in hunted:
                 if entry.get("f") == resolver:
                     hunted.insert(0, entry)
-        if hunted:
-
-            def hunter_manager(souped_entry: dict = hunted[0], repeat_count=0):
-                payload = self.get_payload(souped_entry)
-                okay_status, resp = utils.post(self.url, data=payload)
-                if okay_status:
-                    sanitized_feedback = resp.json()
-                    if sanitized_feedback.get("c_status") == "CONVERTING":
-                        if repeat_count >= 4:
-                            return (False, {})
-                        else:
-                            logging.debug(
-                                f"Converting video  : sleeping for 5s - round {repeat_count+1}"
-                            )
-                            sleep(5)
-                            repeat_count += 1
-                            return hunter_manager(souped_entry)
-                    return okay_status, resp
-                return okay_status, resp
-
-            okay_status, resp = hunter_manager()
-
-            if okay_status:
-                resp_data = hunted[0]
-                resp_data.update(resp.json())
-                return resp_data
+        if not hunted:
+            logging.error(
+                f"Zero media hunted with params : {{quality : {quality}, format : {format}"
+                + (f", select : {select}" if select else "")
+                + "  }"
+            )
+        return hunted
 
-            else:
-                logging.debug(f"{resp.headers.get('content-type')} - {resp.content}")
+    @staticmethod
+    def dlink_key(vid: str, entry: dict) -> str:
+        r"""Key of the dlink cache for format `entry` of `vid`"""
+        return f"{vid}:{entry.get('f')}:{entry.get('q')}"
+
+    @staticmethod
+    def remember(third_dict: dict) -> None:
+        r"""Caches a converted response until its dlink likely expires
+        :param third_dict: Response of `third_query.main()`
+        :type third_dict: dict
+        """
+        if third_dict.get("dlink") and cache.ttls.get("dlink"):
+            cache.set(
+                "dlink",
+                third_query.dlink_key(third_dict.get("vid"), third_dict),
+                {key: value for key, value in third_dict.items() if key != "saved_to"},
+            )
+
+    def cached(self, entry: dict, timeout: int = 30) -> dict:
+        r"""Earlier conversion of format `entry` whose dlink still answers, None otherwise
+        :param entry: Format entry from `third_query.hunt`
+        :param timeout: (Optional) Http requests timeout
+        :type entry: dict
+        :type timeout: int
+        :rtype: dict
+        """
+        key = self.dlink_key(self.query_two.vid, entry)
+        third_dict = cache.get("dlink", key)
+        if not third_dict:
+            return
+        from .transfer import probe
+
+        try:
+            size, _ = probe(third_dict["dlink"], headers, timeout)
+        except Exception as e:
+            logging.debug(f"Cached dlink probe failed - {get_excep(e)}")
+            size = 0
+        if not size:
+            metrics.count("dlink_cache_stale")
+            cache.discard("dlink", key)
+            return
+        metrics.count("dlink_cache_hits")
+        logging.debug(f"Cached third query  : {key}")
+        return dict(third_dict)
+
+    @staticmethod
+    def refresh(
+        third_dict: dict, timeout: int = 30, rounds: int = 4, interval: float = 5
+    ) -> dict:
+        r"""Converts media of an earlier `third_query` response again for a fresh dlink
+        :param third_dict: Response of `third_query.main()`
+        :param timeout: (Optional) Http requests timeout
+        :param rounds: (Optional) Times to re-check a conversion in progress
+        :param interval: (Optional) Seconds to wait between the rounds
+        :type third_dict: dict
+        :type timeout: int
+        :type rounds: int
+        :type interval: float
+        :rtype: dict
+        """
+        payload = {"k": third_dict.get("k"), "vid": third_dict.get("vid")}
+        metrics.count("dlink_refreshes")
+        for repeat_count in range(rounds + 1):
+            okay_status, resp = utils.post(convert_url, data=payload, timeout=timeout)
+            if not okay_status:
                 logging.error(
                     f"Third query failed - [{resp.status_code} : {resp.reason}]"
                 )
                 return {}
+            if resp.json().get("c_status") != "CONVERTING":
+                resp_data = dict(third_dict)
+                resp_data.update(resp.json())
+                third_query.remember(resp_data)
+                return resp_data
+            metrics.count("conversion_rounds")
+            if repeat_count < rounds:
+                sleep(interval)
+        return {}
+
+    def submit(self, entry: dict, timeout: int = 30) -> tuple:
+        r"""Posts one conversion request for a hunted format entry
+        :param entry: Format entry from `third_query.hunt`
+        :param timeout: (Optional) Http requests timeout
+        :type entry: dict
+        :type timeout: int
+        :rtype: tuple(bool, object)
+        """
+        return utils.post(self.url, data=self.get_payload(entry), timeout=timeout)
+
+    @metrics.timed("third_query")
+    def main(
+        self,
+        format: str = "mp4",
+        quality="auto",
+        resolver: str = None,
+        timeout: int = 30,
+        rounds: int = 4,
+        interval: float = 5,
+        select: str = None,
+    ):
+        r"""
+        :param format: (Optional) Media format mp4/mp3
+        :param quality: (Optional) Media qualiy such as 720p
+        :param resolver: (Optional) Additional format info : [m4a,3gp,mp4,mp3]
+        :param timeout: (Optional) Http requests timeout
+        :param rounds: (Optional) Times to re-check a conversion in progress
+        :param interval: (Optional) Seconds to wait between the rounds
+        :param select: (Optional) Format rules tried in turn, overrides quality
+        :type type: str
+        :type quality: str
+        :type timeout: int
+        :type rounds: int
+        :type interval: float
+        :type select: str
+        """
+        hunted = self.hunt(format, quality, resolver, select)
+        if not hunted:
+            return {}
+        cached = self.cached(hunted[0], timeout)
+        if cached:
+            hunted[0].update(cached)
+            return hunted[0]
+        for repeat_count in range(rounds + 1):
+            okay_status, resp = self.submit(hunted[0], timeout)
+            if not okay_status:
+                break
+            if resp.json().get("c_status") != "CONVERTING":
+                resp_data = hunted[0]
+                resp_data.update(resp.json())
+                self.remember(resp_data)
+                return resp_data
+            metrics.count("conversion_rounds")
+            if repeat_count < rounds:
+                logging.debug(
+                    f"Converting video  : sleeping for {interval}s - round {repeat_count+1}"
+                )
+                sleep(interval)
         else:
             logging.error(
-                f"Zero media hunted with params : {{quality : {quality}, format : {format}  }}"
+                f"Conversion unfinished after ({rounds}) rounds - {self.query_two.vid}"
             )
             return {}
+        logging.debug(f"{resp.headers.get('content-type')} - {resp.content}")
+        logging.error(f"Third query failed - [{resp.status_code} : {resp.reason}]")
+        return {}
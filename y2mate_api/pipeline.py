@@ -0,0 +1,109 @@
+import logging
+from queue import Queue
+from threading import Thread, Lock
+from time import monotonic
+from .main import get_excep
+from .scheduler import DownloadScheduler
+
+"""
+Resolve, convert and download stages joined by bounded queues
+"""
+
+
+class Pipeline:
+    def __init__(
+        self,
+        query_twos: object,
+        convert: object,
+        save: object,
+        refresh: object = None,
+        convert_workers: int = 1,
+        download_workers: int = 1,
+        max_link_age: float = 600,
+    ):
+        r"""Initializes this `class`
+        :param query_twos: Iterable of processed `second_query` objects, consumed by one thread
+        :type query_twos: object
+        :param convert: Callable turning a `second_query` into `third_query` dict
+        :type convert: object
+        :param save: Callable receiving `third_query` dict and returning saved path
+        :type save: object
+        :param refresh: (Optional) Callable returning `third_query` dict with a fresh dlink
+        :type refresh: object
+        :param convert_workers: (Optional) Conversions in flight at once
+        :type convert_workers: int
+        :param download_workers: (Optional) Downloads in flight at once
+        :type download_workers: int
+        :param max_link_age: (Optional) Seconds a dlink may wait for a download worker before it is re-resolved
+        :type max_link_age: float
+        """
+        self.query_twos = query_twos
+        self.convert = convert
+        self.refresh = refresh
+        self.convert_workers = max(convert_workers, 1)
+        self.max_link_age = max_link_age
+        # Converted entries wait here; its bound is what keeps dlinks fresh
+        self.scheduler = DownloadScheduler(
+            self.__save, workers=max(download_workers, 1)
+        )
+        self.save = save
+        self.resolved = Queue(maxsize=self.convert_workers)
+        self.lock = Lock()
+        self.converted_at = {}
+
+    def __resolve(self) -> None:
+        try:
+            for query_two in self.query_twos:
+                self.resolved.put(query_two)
+        except Exception as e:
+            logging.error(f"Resolving stopped - {get_excep(e)}")
+        finally:
+            for _ in range(self.convert_workers):
+                self.resolved.put(None)
+
+    def __convert(self) -> None:
+        while True:
+            query_two = self.resolved.get()
+            if query_two is None:
+                return
+            try:
+                third_dict = self.convert(query_two)
+            except Exception as e:
+                logging.error(f"Conversion of {query_two.vid} failed - {get_excep(e)}")
+                self.scheduler.fail(query_two, str(get_excep(e)))
+                continue
+            if third_dict:
+                with self.lock:
+                    self.converted_at[id(third_dict)] = monotonic()
+            # Blocks while every download worker is busy and the queue is full
+            self.scheduler.submit(third_dict, query_two)
+
+    def __save(self, third_dict: dict) -> str:
+        with self.lock:
+            converted_at = self.converted_at.pop(id(third_dict), None)
+        if (
+            self.refresh
+            and converted_at is not None
+            and monotonic() - converted_at > self.max_link_age
+        ):
+            logging.debug(f"Re-resolving dlink queued for too long - {third_dict.get('vid')}")
+            refreshed = self.refresh(third_dict)
+            if refreshed.get("dlink"):
+                third_dict.update(refreshed)
+        return self.save(third_dict)
+
+    def run(self) -> dict:
+        r"""Runs every stage to completion
+        :rtype: dict
+        """
+        threads = [Thread(target=self.__resolve, name="y2mate-resolve", daemon=True)]
+        threads += [
+            Thread(target=self.__convert, name=f"y2mate-convert-{x}", daemon=True)
+            for x in range(self.convert_workers)
+        ]
+        with self.scheduler:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.scheduler.summary()
@@ -0,0 +1,217 @@
+import logging
+import sys
+from threading import Thread, Lock, Event
+from time import monotonic
+
+"""
+Shared progress surface of concurrent downloads
+"""
+
+
+class Transfer:
+    def __init__(self, name: str, total: int, completed: int = 0):
+        r"""Initializes this `class`
+        :param name: Label of the download
+        :type name: str
+        :param total: Size in bytes
+        :type total: int
+        :param completed: (Optional) Bytes already on disk
+        :type completed: int
+        """
+        self.name = name
+        self.total = total
+        self.completed = completed
+        self.rate = 0.0
+        self.sampled = completed
+
+    def update(self, amount: int) -> None:
+        r"""Counts `amount` bytes written - the only per-chunk work"""
+        self.completed += amount
+
+    @property
+    def eta(self) -> float:
+        return (self.total - self.completed) / self.rate if self.rate else None
+
+
+class Dashboard:
+    # Weight of the latest sample in the smoothed rates
+    smoothing = 0.3
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        refresh_per_second: float = 4,
+        log_interval: float = 10,
+        console: object = None,
+    ):
+        r"""Initializes this `class`
+        :param enabled: (Optional) Render anything at all, counters work regardless
+        :type enabled: bool
+        :param refresh_per_second: (Optional) Times per second counters are sampled and drawn
+        :type refresh_per_second: float
+        :param log_interval: (Optional) Seconds between log lines when stderr is not a TTY
+        :type log_interval: float
+        :param console: (Optional) `rich.console.Console` to draw on
+        :type console: object
+        """
+        self.enabled = enabled
+        self.interval = 1 / refresh_per_second
+        self.log_interval = log_interval
+        self.console = console
+        self.lock = Lock()
+        self.transfers = []
+        self.finished = 0
+        self.rate = 0.0
+        self.live = None
+        self.streams = []
+        self.stopped = Event()
+        self.thread = None
+        self.sampled_at = self.logged_at = monotonic()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args, **kwargs):
+        self.stop()
+
+    def add(self, name: str, total: int, completed: int = 0) -> Transfer:
+        r"""Registers a download and returns the counter to feed
+        :param name: Label of the download
+        :param total: Size in bytes
+        :param completed: (Optional) Bytes already on disk
+        :type name: str
+        :type total: int
+        :type completed: int
+        :rtype: Transfer
+        """
+        transfer = Transfer(name, total, completed)
+        with self.lock:
+            self.transfers.append(transfer)
+        return transfer
+
+    def remove(self, transfer: Transfer) -> None:
+        r"""Drops a finished or failed download from the surface"""
+        with self.lock:
+            if transfer in self.transfers:
+                self.transfers.remove(transfer)
+                self.finished += 1
+
+    def start(self):
+        r"""Starts sampling and drawing"""
+        if not self.enabled or self.thread:
+            return self
+        if (self.console.is_terminal if self.console else sys.stderr.isatty()):
+            from rich.console import Console
+            from rich.live import Live
+
+            stderr = sys.stderr
+            self.live = Live(
+                console=self.console or Console(stderr=True),
+                auto_refresh=False,
+                transient=True,
+                redirect_stderr=True,
+            )
+            self.live.start()
+            # Log records then print above the dashboard instead of through it
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, logging.StreamHandler) and handler.stream in (
+                    stderr,
+                    sys.__stderr__,
+                ):
+                    self.streams.append((handler, handler.stream))
+                    handler.setStream(sys.stderr)
+        self.stopped.clear()
+        self.thread = Thread(target=self.__loop, name="y2mate-progress", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        r"""Stops sampling and clears the dashboard"""
+        if not self.thread:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        if self.live:
+            self.live.stop()
+            for handler, stream in self.streams:
+                handler.setStream(stream)
+            self.streams.clear()
+            self.live = None
+
+    def sample(self) -> list:
+        r"""Updates smoothed rates from the counters and returns active downloads
+        :rtype: list
+        """
+        with self.lock:
+            transfers = list(self.transfers)
+        now = monotonic()
+        elapsed = max(now - self.sampled_at, 1e-3)
+        self.sampled_at = now
+        rate = 0.0
+        for transfer in transfers:
+            completed = transfer.completed
+            current = (completed - transfer.sampled) / elapsed
+            transfer.sampled = completed
+            transfer.rate += self.smoothing * (current - transfer.rate)
+            rate += transfer.rate
+        self.rate = rate
+        return transfers
+
+    def __loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            transfers = self.sample()
+            if self.live:
+                self.live.update(self.render(transfers), refresh=True)
+            elif transfers and monotonic() - self.logged_at >= self.log_interval:
+                self.logged_at = monotonic()
+                logging.info(self.summary(transfers))
+
+    @staticmethod
+    def __size(size: float) -> str:
+        return f"{round(size / 1000000, 2)}MB"
+
+    @staticmethod
+    def __eta(seconds: float) -> str:
+        if seconds is None:
+            return "-:--"
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes}:{seconds:02d}"
+
+    def summary(self, transfers: list) -> str:
+        r"""One-line state of the active downloads
+        :rtype: str
+        """
+        completed = sum(transfer.completed for transfer in transfers)
+        total = sum(transfer.total for transfer in transfers)
+        eta = (total - completed) / self.rate if self.rate else None
+        return (
+            f"Downloading ({len(transfers)}) - {self.__size(completed)} of {self.__size(total)}"
+            f" at {self.__size(self.rate)}/s - ETA {self.__eta(eta)}"
+            + (f" - ({self.finished}) done" if self.finished else "")
+        )
+
+    def render(self, transfers: list):
+        r"""Table with a row per active download
+        :rtype: rich.table.Table
+        """
+        from rich.table import Table
+        from rich.progress_bar import ProgressBar
+
+        table = Table(box=None, caption=self.summary(transfers), caption_justify="left")
+        table.add_column("Media", style="green", no_wrap=True, max_width=48)
+        table.add_column("Progress", width=32)
+        table.add_column("%", justify="right", style="yellow")
+        table.add_column("Size", justify="right", style="cyan")
+        table.add_column("Speed", justify="right", style="magenta")
+        table.add_column("ETA", justify="right")
+        for transfer in transfers:
+            table.add_row(
+                transfer.name,
+                ProgressBar(total=transfer.total or 1, completed=transfer.completed, width=30),
+                f"{int(transfer.completed * 100 / (transfer.total or 1))}%",
+                self.__size(transfer.total),
+                f"{self.__size(transfer.rate)}/s",
+                self.__eta(transfer.eta),
+            )
+        return table
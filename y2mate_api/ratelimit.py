@@ -0,0 +1,128 @@
+from threading import Lock
+from time import monotonic, sleep
+
+"""
+Token-bucket request budgets and bandwidth caps
+"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float = 0, burst: float = None):
+        r"""Initializes this `class`
+        :param rate: (Optional) Tokens added per second, 0 disables the bucket
+        :type rate: float
+        :param burst: (Optional) Bucket capacity, defaults to one second worth of tokens
+        :type burst: float
+        """
+        self.lock = Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate: float = 0, burst: float = None) -> None:
+        r"""Changes rate and capacity of the bucket"""
+        with self.lock:
+            self.rate = rate or 0
+            self.capacity = burst or max(self.rate, 1)
+            self.tokens = self.capacity
+            self.updated = monotonic()
+
+    def delay(self, amount: float = 1) -> float:
+        r"""Reserves `amount` tokens and returns seconds to wait before using them
+        :param amount: (Optional) Tokens to take
+        :type amount: float
+        :rtype: float
+        """
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # Tokens may go negative; later callers then wait for the debt too
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def acquire(self, amount: float = 1) -> None:
+        r"""Blocks until `amount` tokens are available"""
+        wait = self.delay(amount)
+        if wait:
+            sleep(wait)
+
+
+class RateLimiter:
+    def __init__(self):
+        r"""Initializes this `class` with every budget unlimited"""
+        self.requests = {
+            "analyze": TokenBucket(),
+            "convert": TokenBucket(),
+            "download": TokenBucket(),
+        }
+        self.bandwidth = TokenBucket()
+        self.download_bandwidth = 0
+
+    def configure(
+        self,
+        analyze: float = 0,
+        convert: float = 0,
+        download: float = 0,
+        bandwidth: float = 0,
+        download_bandwidth: float = 0,
+    ) -> None:
+        r"""Sets the budgets, 0 means unlimited
+        :param analyze: (Optional) `analyzeV2` requests per second
+        :param convert: (Optional) `convertV2` requests per second
+        :param download: (Optional) Download-host requests per second
+        :param bandwidth: (Optional) Bytes per second across all downloads
+        :param download_bandwidth: (Optional) Bytes per second of each download
+        :type analyze: float
+        :type convert: float
+        :type download: float
+        :type bandwidth: float
+        :type download_bandwidth: float
+        """
+        self.requests["analyze"].configure(analyze)
+        self.requests["convert"].configure(convert)
+        self.requests["download"].configure(download)
+        self.bandwidth.configure(bandwidth)
+        self.download_bandwidth = download_bandwidth
+
+    @staticmethod
+    def budget(url: str) -> str:
+        r"""Names the request budget `url` draws from"""
+        if "analyzeV2" in url:
+            return "analyze"
+        if "convertV2" in url:
+            return "convert"
+        return "download"
+
+    def delay(self, url: str) -> float:
+        r"""Reserves a request to `url` and returns seconds to wait"""
+        return self.requests[self.budget(url)].delay()
+
+    def acquire(self, url: str) -> None:
+        r"""Blocks until a request to `url` fits its budget"""
+        self.requests[self.budget(url)].acquire()
+
+    def new_download(self) -> TokenBucket:
+        r"""Creates the bandwidth bucket of one download"""
+        return TokenBucket(self.download_bandwidth)
+
+    def throttle_delay(self, size: int, bucket: TokenBucket = None) -> float:
+        r"""Reserves `size` bytes of bandwidth and returns seconds to wait
+        :param size: Bytes just transferred
+        :param bucket: (Optional) Bucket from `new_download`
+        :type size: int
+        :type bucket: TokenBucket
+        :rtype: float
+        """
+        wait = self.bandwidth.delay(size)
+        if bucket:
+            wait = max(wait, bucket.delay(size))
+        return wait
+
+    def throttle(self, size: int, bucket: TokenBucket = None) -> None:
+        r"""Blocks until `size` bytes fit the global and per-download bandwidth"""
+        wait = self.throttle_delay(size, bucket)
+        if wait:
+            sleep(wait)
@@ -0,0 +1,160 @@
+import logging
+from queue import Queue, Empty
+from threading import Thread, Lock
+from time import perf_counter
+from .main import get_excep
+
+"""
+Fixed-size worker pool behind `Handler.auto_save`
+"""
+
+
+class DownloadScheduler:
+    def __init__(self, save: object, workers: int = 0, queue_size: int = None):
+        r"""Initializes this `class`
+        :param save: Callable receiving `third_query` dict and returning saved path
+        :type save: object
+        :param workers: (Optional) Concurrent downloads, 0 downloads in the caller's thread
+        :type workers: int
+        :param queue_size: (Optional) Entries waiting for a worker, defaults to `workers`
+        :type queue_size: int
+        """
+        self.save = save
+        self.workers = workers
+        self.queue = Queue(maxsize=queue_size or max(workers, 1))
+        self.lock = Lock()
+        self.items = []
+        self.threads = []
+        self.started_at = perf_counter()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, *args, **kwargs):
+        if exc_type:
+            # The producer stopped early, entries no worker took yet are dropped
+            self.cancel()
+        self.join()
+
+    def start(self):
+        r"""Spawns the worker threads"""
+        for x in range(self.workers):
+            thread = Thread(target=self.__work, name=f"y2mate-download-{x}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def __work(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                if entry is None:
+                    return
+                self.process(entry)
+            finally:
+                self.queue.task_done()
+
+    def process(self, entry: dict) -> dict:
+        r"""Downloads one entry and records its outcome
+        :param entry: Response of `third_query`
+        :type entry: dict
+        :rtype: dict
+        """
+        report = {"vid": entry.get("vid"), "title": entry.get("title")}
+        started_at = perf_counter()
+        try:
+            saved_to = self.save(entry)
+            report["saved_to"] = saved_to
+            # Bytes the transfer received, a sink or a deduped file has none on disk
+            report["bytes"] = entry.pop("transferred", 0)
+            report["status"] = "ok" if saved_to else "failed"
+        except Exception as e:
+            logging.error(f"Failed to save {entry.get('title')} - {get_excep(e)}")
+            report["status"] = "failed"
+            report["error"] = str(get_excep(e))
+        report["duration"] = round(perf_counter() - started_at, 3)
+        with self.lock:
+            self.items.append(report)
+        return report
+
+    def fail(self, source: object, error: str) -> dict:
+        r"""Records an item that never reached download
+        :param source: `second_query` or dict having `vid` and `title`, None when unknown
+        :param error: Why the item failed
+        :type source: object
+        :type error: str
+        :rtype: dict
+        """
+        if isinstance(source, dict):
+            vid, title = source.get("vid"), source.get("title")
+        else:
+            vid, title = getattr(source, "vid", None), getattr(source, "title", None)
+        report = {
+            "vid": vid,
+            "title": title,
+            "status": "failed",
+            "error": error,
+            "duration": 0,
+        }
+        with self.lock:
+            self.items.append(report)
+        return report
+
+    def submit(self, entry: dict, source: object = None, error: str = None) -> None:
+        r"""Queues entry for download, blocking while the queue is full
+        :param entry: Response of `third_query`, empty when its conversion failed
+        :param source: (Optional) `second_query` the entry was converted from
+        :param error: (Optional) Why the conversion failed
+        :type entry: dict
+        :type source: object
+        :type error: str
+        :rtype: None
+        """
+        if not entry:
+            logging.error(f"Empty `third_dict` parameter parsed : {entry}")
+            self.fail(source, error or "Conversion failed")
+            return
+        if self.workers:
+            self.queue.put(entry)
+        else:
+            self.process(entry)
+
+    def cancel(self) -> int:
+        r"""Drops entries still waiting for a worker, recording them as failed
+        :rtype: int
+        """
+        dropped = 0
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except Empty:
+                return dropped
+            self.queue.task_done()
+            if entry:
+                self.fail(entry, "Cancelled")
+                dropped += 1
+
+    def join(self) -> dict:
+        r"""Waits for every queued download to finish
+        :rtype: dict
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
+        return self.summary()
+
+    def summary(self) -> dict:
+        r"""Saved paths, failures, bytes and timings of processed entries
+        :rtype: dict
+        """
+        with self.lock:
+            items = list(self.items)
+        return {
+            "saved": [item["saved_to"] for item in items if item["status"] == "ok"],
+            "failed": [item for item in items if item["status"] != "ok"],
+            "bytes": sum(item.get("bytes", 0) for item in items),
+            "duration": round(perf_counter() - self.started_at, 3),
+            "items": items,
+        }
@@ -0,0 +1,389 @@
+import json
+import re
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from queue import Queue, Full
+from threading import Thread, Lock
+from collections import OrderedDict
+from time import time, monotonic
+from uuid import uuid4
+from . import __version__
+from .main import logging, get_excep, metrics, sessions, credentials
+from .downloader import Handler
+from .formats import FormatIndex
+from .library import dedupe_modes
+from .progress import Dashboard
+
+"""
+Long-running daemon serving download jobs over a local HTTP/JSON API
+"""
+
+# Job fields accepted from clients and the `Handler.auto_save` argument they feed
+job_fields = {
+    "format": str,
+    "quality": str,
+    "resolver": str,
+    "select": str,
+    "limit": int,
+    "keyword": str,
+    "author": str,
+    "depth": int,
+    "breadth": int,
+    "segments": int,
+    "resume": bool,
+    "dedupe": str,
+    "naming_format": str,
+}
+
+
+class Job:
+    def __init__(self, query: str, options: dict):
+        r"""Initializes this `class`
+        :param query: Video name or youtube link
+        :type query: str
+        :param options: Validated `job_fields`
+        :type options: dict
+        """
+        self.id = uuid4().hex[:12]
+        self.query = query
+        self.options = options
+        self.status = "queued"
+        self.created_at = time()
+        self.started_at = None
+        self.finished_at = None
+        self.summary = None
+        self.error = None
+        # Never drawn, only its counters are read by the progress endpoint
+        self.dashboard = Dashboard(enabled=False)
+
+    def progress(self) -> dict:
+        with self.dashboard.lock:
+            transfers = list(self.dashboard.transfers)
+        return {
+            "finished": self.dashboard.finished,
+            "active": [
+                {
+                    "name": transfer.name,
+                    "completed": transfer.completed,
+                    "total": transfer.total,
+                }
+                for transfer in transfers
+            ],
+            "completed": sum(transfer.completed for transfer in transfers),
+            "total": sum(transfer.total for transfer in transfers),
+        }
+
+    def to_dict(self, progress: bool = False) -> dict:
+        data = {
+            "id": self.id,
+            "query": self.query,
+            "options": self.options,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.summary:
+            data["result"] = {
+                key: self.summary[key] for key in ("saved", "failed", "bytes", "duration")
+            }
+        if self.error:
+            data["error"] = self.error
+        if progress:
+            data["progress"] = self.progress()
+        return data
+
+
+class JobServer:
+    def __init__(
+        self,
+        handler_args: dict,
+        auto_save_args: dict,
+        host: str = "127.0.0.1",
+        port: int = 8680,
+        workers: int = 2,
+        queue_size: int = 16,
+        keep: int = 1000,
+    ):
+        r"""Initializes this `class`
+        :param handler_args: Keyword arguments for `Handler` shared by every job
+        :type handler_args: dict
+        :param auto_save_args: Keyword arguments for `Handler.auto_save`, jobs override `job_fields`
+        :type auto_save_args: dict
+        :param host: (Optional) Interface to listen on
+        :type host: str
+        :param port: (Optional) Port to listen on, 0 picks a free one
+        :type port: int
+        :param workers: (Optional) Jobs running at once
+        :type workers: int
+        :param queue_size: (Optional) Jobs waiting for a worker, more are refused with 429
+        :type queue_size: int
+        :param keep: (Optional) Finished jobs kept for status queries
+        :type keep: int
+        """
+        self.handler_args = handler_args
+        self.auto_save_args = auto_save_args
+        self.workers = max(workers, 1)
+        self.queue = Queue(maxsize=max(queue_size, 1))
+        self.keep = keep
+        self.lock = Lock()
+        self.jobs = OrderedDict()
+        self.busy = 0
+        self.counts = {"accepted": 0, "rejected": 0, "done": 0, "failed": 0}
+        self.threads = []
+        self.started_at = monotonic()
+        self.httpd = ThreadingHTTPServer(
+            (host, port), type("BoundJobRequestHandler", (JobRequestHandler,), {"server_ref": self})
+        )
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args, **kwargs):
+        self.stop()
+
+    def start(self):
+        r"""Spawns the workers and the listener"""
+        for x in range(self.workers):
+            thread = Thread(target=self.__work, name=f"y2mate-job-{x}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        thread = Thread(target=self.httpd.serve_forever, name="y2mate-serve", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        r"""Stops listening, running jobs are abandoned"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve_forever(self) -> None:
+        r"""Runs until interrupted"""
+        self.start()
+        logging.info(
+            f"Serving jobs on {self.url} - ({self.workers}) workers, ({self.queue.maxsize}) queued at most"
+        )
+        try:
+            self.threads[-1].join()
+        except KeyboardInterrupt:
+            logging.info("Shutting down")
+        finally:
+            self.stop()
+
+    @staticmethod
+    def validate(data: dict) -> tuple:
+        r"""Query and options of a job request, raises ValueError when invalid
+        :param data: Decoded request body
+        :type data: dict
+        :rtype: tuple(str, dict)
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Job must be a json object")
+        query = data.get("query")
+        if not query or not isinstance(query, str):
+            raise ValueError("Field 'query' is required")
+        options = {}
+        for key, value in data.items():
+            if key == "query":
+                continue
+            if key not in job_fields:
+                raise ValueError(f"Unknown field '{key}' - {list(job_fields)}")
+            if value is None:
+                continue
+            if not isinstance(value, job_fields[key]) or (
+                job_fields[key] is int and isinstance(value, bool)
+            ):
+                raise ValueError(f"Field '{key}' must be {job_fields[key].__name__}")
+            options[key] = value
+        if options.get("format", "mp4") not in ("mp4", "mp3"):
+            raise ValueError("Field 'format' must be mp4 or mp3")
+        if options.get("dedupe", "off") not in dedupe_modes:
+            raise ValueError(f"Field 'dedupe' must be one of {dedupe_modes}")
+        if options.get("limit", 1) < 1:
+            raise ValueError("Field 'limit' must be at least 1")
+        if options.get("select"):
+            try:
+                FormatIndex.parse(options["select"])
+            except AssertionError as e:
+                raise ValueError(str(e))
+        return query, options
+
+    def submit(self, query: str, options: dict) -> Job:
+        r"""Queues a job, None when the queue is full
+        :param query: Video name or youtube link
+        :param options: Validated `job_fields`
+        :type query: str
+        :type options: dict
+        :rtype: Job
+        """
+        job = Job(query, options)
+        try:
+            self.queue.put_nowait(job)
+        except Full:
+            with self.lock:
+                self.counts["rejected"] += 1
+            return
+        with self.lock:
+            self.jobs[job.id] = job
+            self.counts["accepted"] += 1
+            self.__evict()
+        logging.info(f"Queued job {job.id} - {query}")
+        return job
+
+    def __evict(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status in ("done", "failed", "cancelled")
+        ]
+        for job_id in finished[: max(len(finished) - self.keep, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        r"""Cancels a job still waiting for a worker"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job.status != "queued":
+                return False
+            job.status = "cancelled"
+            job.finished_at = time()
+            return True
+
+    def status(self) -> dict:
+        with self.lock:
+            jobs = list(self.jobs.values())
+            counts = dict(self.counts)
+            busy = self.busy
+        return {
+            "version": __version__,
+            "uptime": round(monotonic() - self.started_at, 3),
+            "workers": self.workers,
+            "busy": busy,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "jobs": counts,
+            "running": [job.id for job in jobs if job.status == "running"],
+            "sessions": sessions.stats(),
+            "credentials": credentials.stats(),
+        }
+
+    def __work(self) -> None:
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                if job.status == "cancelled":
+                    continue
+                job.status = "running"
+                job.started_at = time()
+                self.busy += 1
+            try:
+                handler = Handler(**dict(self.handler_args, query=job.query))
+                job.summary = handler.auto_save(
+                    **dict(self.auto_save_args, **job.options),
+                    dashboard=job.dashboard,
+                )
+                # Items skipped through history, dedupe or the limit aren't failures
+                status = "failed" if job.summary["failed"] else "done"
+            except BaseException as e:
+                # `Handler` reports some failures through `exit`, the worker must survive them
+                job.error = str(get_excep(e)) or e.__class__.__name__
+                status = "failed"
+            with self.lock:
+                job.status = status
+                job.finished_at = time()
+                self.busy -= 1
+                self.counts[status] += 1
+            logging.info(f"Job {job.id} {status} - {job.query}")
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_ref = None
+    max_body = 64 * 1024
+    job_path = re.compile(r"^/jobs/([0-9a-f]+)(/progress)?/?$")
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+    def send_json(self, data: dict, status: int = 200, headers: dict = {}):
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str, headers: dict = {}):
+        self.send_json({"error": message}, status, headers)
+
+    def do_GET(self):
+        jobs = self.server_ref
+        path = self.path.split("?")[0]
+        if path == "/status":
+            return self.send_json(jobs.status())
+        if path == "/metrics":
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if path.rstrip("/") == "/jobs":
+            with jobs.lock:
+                listed = list(jobs.jobs.values())
+            return self.send_json({"jobs": [job.to_dict() for job in listed]})
+        match = self.job_path.match(path)
+        job = match and jobs.get(match.group(1))
+        if not job:
+            return self.send_error_json(404, "No such job")
+        if match.group(2):
+            return self.send_json({"id": job.id, "status": job.status, **job.progress()})
+        return self.send_json(job.to_dict(progress=job.status == "running"))
+
+    def do_POST(self):
+        jobs = self.server_ref
+        if self.path.split("?")[0].rstrip("/") != "/jobs":
+            return self.send_error_json(404, "Not found")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            assert length >= 0
+        except (ValueError, AssertionError):
+            self.close_connection = True
+            return self.send_error_json(400, "Malformed Content-Length")
+        if length > self.max_body:
+            self.close_connection = True
+            return self.send_error_json(413, "Job too large")
+        try:
+            query, options = jobs.validate(json.loads(self.rfile.read(length) or b"null"))
+        except ValueError as e:
+            return self.send_error_json(400, str(e))
+        job = jobs.submit(query, options)
+        if not job:
+            return self.send_error_json(
+                429, "Job queue is full, retry later", {"Retry-After": "5"}
+            )
+        self.send_json(job.to_dict(), 202, {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        jobs = self.server_ref
+        match = self.job_path.match(self.path.split("?")[0])
+        if not match or match.group(2):
+            return self.send_error_json(404, "Not found")
+        job = jobs.get(match.group(1))
+        if not job:
+            return self.send_error_json(404, "No such job")
+        if not jobs.cancel(job.id):
+            return self.send_error_json(409, f"Job is {job.status}")
+        self.send_json(job.to_dict())
@@ -0,0 +1,145 @@
+import threading
+from urllib.parse import urlsplit
+from collections import OrderedDict
+
+"""
+Per-worker API sessions and keep-alive download connection pools
+"""
+
+
+class SessionPool:
+    def __init__(
+        self,
+        factory: object,
+        impersonate: str = "chrome",
+        pool_size: int = 10,
+        max_hosts: int = 32,
+    ):
+        r"""Initializes this `class`
+        :param factory: Callable building the session whose headers and cookies every API session mirrors
+        :type factory: object
+        :param impersonate: (Optional) Browser to impersonate on API calls
+        :type impersonate: str
+        :param pool_size: (Optional) Keep-alive connections per download host
+        :type pool_size: int
+        :param max_hosts: (Optional) Download hosts to keep pools for
+        :type max_hosts: int
+        """
+        self.factory = factory
+        self.impersonate = impersonate
+        self.pool_size = pool_size
+        self.max_hosts = max_hosts
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.api_sessions = []
+        self.api_requests = 0
+        self.hosts = OrderedDict()
+        self.__master = None
+
+    @property
+    def master(self):
+        r"""Session of the main thread, built on first use
+        :rtype: curl_cffi.requests.Session
+        """
+        if self.__master is None:
+            with self.lock:
+                if self.__master is None:
+                    self.__master = self.factory()
+        return self.__master
+
+    def api(self):
+        r"""Returns the curl_cffi session of the calling thread
+        :rtype: curl_cffi.requests.Session
+        """
+        current = threading.current_thread()
+        if current is threading.main_thread():
+            api_session = self.master
+        else:
+            api_session = getattr(self.local, "session", None)
+            if api_session is None:
+                api_session = self.__checkout(current)
+                self.local.session = api_session
+            api_session.cookies.update(dict(self.master.cookies))
+        with self.lock:
+            self.api_requests += 1
+        return api_session
+
+    def __checkout(self, owner: threading.Thread):
+        r"""Hands over session of a finished worker or creates a new one"""
+        from curl_cffi import requests
+
+        master_headers = self.master.headers
+        with self.lock:
+            for x, (previous_owner, api_session) in enumerate(self.api_sessions):
+                if not previous_owner.is_alive():
+                    self.api_sessions[x] = (owner, api_session)
+                    return api_session
+            api_session = requests.Session(impersonate=self.impersonate)
+            api_session.headers.update(master_headers)
+            self.api_sessions.append((owner, api_session))
+            return api_session
+
+    def download(self, url: str):
+        r"""Returns keep-alive session dedicated to host of `url`
+        :param url: Download link
+        :type url: str
+        :rtype: requests.Session
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            download_session = self.hosts.get(host)
+            if download_session is None:
+                download_session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size, pool_block=False
+                )
+                download_session.mount("http://", adapter)
+                download_session.mount("https://", adapter)
+                self.hosts[host] = download_session
+                while len(self.hosts) > self.max_hosts:
+                    self.hosts.popitem(last=False)[1].close()
+            else:
+                self.hosts.move_to_end(host)
+        return download_session
+
+    def stats(self) -> dict:
+        r"""Requests and connections made per download host
+        :rtype: dict
+        """
+        with self.lock:
+            hosts = list(self.hosts.items())
+            resp = {
+                "api": {
+                    "sessions": len(self.api_sessions) + 1,
+                    "requests": self.api_requests,
+                },
+                "download": {},
+            }
+        for host, download_session in hosts:
+            requests_made = connections = 0
+            for adapter in set(download_session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool:
+                        requests_made += pool.num_requests
+                        connections += pool.num_connections
+            resp["download"][host] = {
+                "requests": requests_made,
+                "connections": connections,
+                "reused": max(requests_made - connections, 0),
+            }
+        return resp
+
+    def close(self) -> None:
+        r"""Closes every pooled session"""
+        with self.lock:
+            for _, api_session in self.api_sessions:
+                api_session.close()
+            self.api_sessions.clear()
+            for download_session in self.hosts.values():
+                download_session.close()
+            self.hosts.clear()
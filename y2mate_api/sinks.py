@@ -0,0 +1,85 @@
+import sys
+
+"""
+Destinations media can be streamed into instead of a file of its own
+"""
+
+
+class Sink:
+    # Stands in for the path in logs and history
+    name = "<sink>"
+
+    def write(self, data: memoryview) -> None:
+        r"""Consumes `data`, blocking for as long as the consumer needs
+        :param data: Bytes only valid until this returns
+        :type data: memoryview
+        """
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        r"""Flushes and releases what the sink opened itself"""
+        self.flush()
+
+
+class FileSink(Sink):
+    def __init__(self, fh, name: str = None, owned: bool = False):
+        r"""Initializes this `class`
+        :param fh: Binary file-like object, stdout or a named pipe
+        :param name: (Optional) Label of the destination
+        :type name: str
+        :param owned: (Optional) Close `fh` along with the sink
+        :type owned: bool
+        """
+        self.fh = fh
+        self.name = name or str(getattr(fh, "name", self.name))
+        self.owned = owned
+
+    def write(self, data: memoryview) -> None:
+        self.fh.write(data)
+
+    def flush(self) -> None:
+        if hasattr(self.fh, "flush"):
+            self.fh.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self.owned:
+            self.fh.close()
+
+
+class CallableSink(Sink):
+    def __init__(self, consumer: object, name: str = None):
+        r"""Initializes this `class`
+        :param consumer: Callable receiving every chunk as bytes
+        :type consumer: object
+        :param name: (Optional) Label of the destination
+        :type name: str
+        """
+        self.consumer = consumer
+        self.name = name or f"<{getattr(consumer, '__name__', 'callable')}>"
+
+    def write(self, data: memoryview) -> None:
+        # Buffers are recycled once this returns, the consumer may keep its copy
+        self.consumer(bytes(data))
+
+
+def open_sink(target: object) -> Sink:
+    r"""Sink for `target`
+    :param target: `-` for stdout, path of a named pipe or file, file-like object, callable or `Sink`
+    :type target: object
+    :rtype: Sink
+    """
+    if isinstance(target, Sink):
+        return target
+    if target == "-":
+        return FileSink(sys.stdout.buffer, "<stdout>")
+    if isinstance(target, str):
+        # Opening a named pipe waits here until its reader shows up
+        return FileSink(open(target, "wb"), target, owned=True)
+    if hasattr(target, "write"):
+        return FileSink(target)
+    assert callable(target), f"Cannot stream media into {target!r}"
+    return CallableSink(target)
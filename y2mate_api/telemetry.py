@@ -0,0 +1,205 @@
+import json
+import random
+from functools import wraps
+from os import replace
+from threading import Lock
+from time import perf_counter
+
+"""
+Per-stage latency, counters and download throughput
+"""
+
+
+class Metrics:
+    # Samples kept per stage for the quantiles
+    reservoir_size = 10000
+    quantiles = (0.5, 0.95, 0.99)
+
+    def __init__(self, enabled: bool = False):
+        r"""Initializes this `class`
+        :param enabled: (Optional) Record anything at all
+        :type enabled: bool
+        """
+        self.enabled = enabled
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        r"""Drops everything recorded so far"""
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+            self.downloads = {"count": 0, "bytes": 0, "seconds": 0.0, "rates": []}
+
+    def timed(self, stage: str):
+        r"""Decorator recording duration of every call under `stage`"""
+
+        def decorator(func):
+            @wraps(func)
+            def main(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started_at = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(stage, perf_counter() - started_at)
+
+            return main
+
+        return decorator
+
+    @staticmethod
+    def __sample(samples: list, seen: int, value: float, size: int) -> None:
+        if len(samples) < size:
+            samples.append(value)
+        else:
+            x = random.randrange(seen)
+            if x < size:
+                samples[x] = value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        r"""Records one duration of `stage`
+        :param stage: Stage name
+        :param seconds: Duration
+        :type stage: str
+        :type seconds: float
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            entry = self.stages.setdefault(
+                stage, {"count": 0, "sum": 0.0, "max": 0.0, "samples": []}
+            )
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            self.__sample(entry["samples"], entry["count"], seconds, self.reservoir_size)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        r"""Increments counter `name` - retries, conversion rounds etc"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def download(self, size: int, seconds: float) -> None:
+        r"""Records bytes transferred by one download and how long it took
+        :param size: Bytes transferred
+        :param seconds: Transfer duration
+        :type size: int
+        :type seconds: float
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.downloads["count"] += 1
+            self.downloads["bytes"] += size
+            self.downloads["seconds"] += seconds
+            if seconds > 0:
+                self.__sample(
+                    self.downloads["rates"],
+                    self.downloads["count"],
+                    size / seconds,
+                    self.reservoir_size,
+                )
+
+    def __quantiles(self, samples: list) -> dict:
+        samples = sorted(samples)
+        if not samples:
+            return {}
+        return {
+            q: samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+            for q in self.quantiles
+        }
+
+    def summary(self) -> dict:
+        r"""Json-friendly snapshot of everything recorded
+        :rtype: dict
+        """
+        with self.lock:
+            stages = {
+                stage: dict(entry, samples=list(entry["samples"]))
+                for stage, entry in self.stages.items()
+            }
+            counters = dict(self.counters)
+            downloads = dict(self.downloads, rates=list(self.downloads["rates"]))
+        resp = {"stages": {}, "counters": counters, "downloads": {}}
+        for stage, entry in stages.items():
+            resp["stages"][stage] = {
+                "count": entry["count"],
+                "sum": round(entry["sum"], 6),
+                "mean": round(entry["sum"] / entry["count"], 6),
+                "max": round(entry["max"], 6),
+            }
+            for q, value in self.__quantiles(entry["samples"]).items():
+                resp["stages"][stage][f"p{int(q * 100)}"] = round(value, 6)
+        resp["downloads"] = {
+            "count": downloads["count"],
+            "bytes": downloads["bytes"],
+            "seconds": round(downloads["seconds"], 6),
+        }
+        for q, value in self.__quantiles(downloads["rates"]).items():
+            resp["downloads"][f"bytes_per_second_p{int(q * 100)}"] = round(value, 2)
+        return resp
+
+    def prometheus(self) -> str:
+        r"""Renders the snapshot in Prometheus text exposition format
+        :rtype: str
+        """
+        summary = self.summary()
+        lines = [
+            "# HELP y2mate_stage_duration_seconds Duration of each pipeline stage",
+            "# TYPE y2mate_stage_duration_seconds summary",
+        ]
+        for stage, entry in summary["stages"].items():
+            for q in self.quantiles:
+                value = entry.get(f"p{int(q * 100)}")
+                if value is not None:
+                    lines.append(
+                        f'y2mate_stage_duration_seconds{{stage="{stage}",quantile="{q}"}} {value}'
+                    )
+            lines.append(f'y2mate_stage_duration_seconds_sum{{stage="{stage}"}} {entry["sum"]}')
+            lines.append(
+                f'y2mate_stage_duration_seconds_count{{stage="{stage}"}} {entry["count"]}'
+            )
+        lines += [
+            "# HELP y2mate_events_total Retries, conversion rounds and other events",
+            "# TYPE y2mate_events_total counter",
+        ]
+        for name, value in summary["counters"].items():
+            lines.append(f'y2mate_events_total{{event="{name}"}} {value}')
+        downloads = summary["downloads"]
+        lines += [
+            "# HELP y2mate_downloads_total Completed downloads",
+            "# TYPE y2mate_downloads_total counter",
+            f"y2mate_downloads_total {downloads['count']}",
+            "# HELP y2mate_downloaded_bytes_total Bytes transferred by downloads",
+            "# TYPE y2mate_downloaded_bytes_total counter",
+            f"y2mate_downloaded_bytes_total {downloads['bytes']}",
+            "# HELP y2mate_download_seconds_total Time spent transferring bytes",
+            "# TYPE y2mate_download_seconds_total counter",
+            f"y2mate_download_seconds_total {downloads['seconds']}",
+            "# HELP y2mate_download_throughput_bytes Per-download throughput in bytes/s",
+            "# TYPE y2mate_download_throughput_bytes summary",
+        ]
+        for q in self.quantiles:
+            value = downloads.get(f"bytes_per_second_p{int(q * 100)}")
+            if value is not None:
+                lines.append(f'y2mate_download_throughput_bytes{{quantile="{q}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __write(file_path: str, content: str) -> None:
+        # textfile collectors must never read a half-written file
+        with open(file_path + ".tmp", "w") as fh:
+            fh.write(content)
+        replace(file_path + ".tmp", file_path)
+
+    def write_prometheus(self, file_path: str) -> None:
+        r"""Writes Prometheus textfile to `file_path`"""
+        self.__write(file_path, self.prometheus())
+
+    def write_json(self, file_path: str) -> None:
+        r"""Writes json summary to `file_path`"""
+        self.__write(file_path, json.dumps(self.summary(), indent=4))
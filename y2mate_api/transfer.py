@@ -0,0 +1,806 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+from os import path, remove, replace
+from queue import Queue
+from threading import Thread, Lock, Event
+from time import monotonic
+from .main import sessions, limiter, metrics, third_query, get_excep
+from .library import hash_file
+from .sinks import Sink
+
+"""
+Byte-transfer helpers used by `Handler.save`
+"""
+
+
+def probe(dlink: str, headers: dict = {}, timeout: int = 30) -> tuple:
+    r"""Checks content-length and range support of a download link
+    :param dlink: Download link
+    :param headers: (Optional) Http request headers
+    :param timeout: (Optional) Http request timeout
+    :type dlink: str
+    :type headers: dict
+    :type timeout: int
+    :rtype: tuple(int, bool)
+    """
+    mod_headers = dict(headers)
+    mod_headers["Range"] = "bytes=0-0"
+    limiter.acquire(dlink)
+    resp = sessions.download(dlink).get(
+        dlink, stream=True, headers=mod_headers, timeout=timeout
+    )
+    try:
+        if resp.status_code in (401, 403, 404, 410):
+            raise PermissionError(f"Download link rejected ({resp.status_code})")
+        if resp.status_code == 206:
+            # Content-Range : bytes 0-0/12345
+            total = resp.headers.get("content-range", "").rpartition("/")[2]
+            return (int(total) if total.isdigit() else 0), True
+        size = int(resp.headers.get("content-length", 0))
+        return size, resp.headers.get("accept-ranges", "").lower() == "bytes"
+    finally:
+        resp.close()
+
+
+def split_ranges(size: int, segments: int) -> list:
+    r"""Splits `size` bytes into `segments` inclusive byte ranges
+    :param size: Total bytes
+    :param segments: Number of ranges
+    :type size: int
+    :type segments: int
+    :rtype: list
+    """
+    segments = max(1, min(segments, size))
+    step = size // segments
+    ranges = []
+    for x in range(segments):
+        start = x * step
+        end = size - 1 if x == segments - 1 else start + step - 1
+        ranges.append((start, end))
+    return ranges
+
+
+def preallocate(fh, size: int) -> None:
+    r"""Reserves `size` bytes for `fh` on disk, growing the file to that length
+    :param fh: File opened for writing
+    :param size: Final length of the file
+    :type size: int
+    """
+    if not size:
+        return
+    posix_fallocate = getattr(os, "posix_fallocate", None)
+    if posix_fallocate:
+        try:
+            posix_fallocate(fh.fileno(), 0, size)
+            return
+        except OSError as e:
+            logging.debug(f"posix_fallocate unsupported - {e}")
+    if os.fstat(fh.fileno()).st_size < size:
+        fh.truncate(size)
+
+
+class TransferInterrupted(Exception):
+    r"""Connection lost, stalled or dropped by the watchdog before its last byte"""
+
+
+class Watchdog:
+    # Seconds between throughput checks
+    interval = 1
+
+    def __init__(self, resp, min_rate: int = 0, window: float = 10):
+        r"""Initializes this `class`
+        :param resp: Streamed `requests` response to abort
+        :param min_rate: (Optional) Bytes per second the connection must sustain, 0 to never abort
+        :type min_rate: int
+        :param window: (Optional) Seconds throughput is averaged over
+        :type window: float
+        """
+        self.resp = resp
+        self.min_rate = min_rate
+        self.window = window
+        self.received = 0
+        self.reason = None
+        self.stopped = Event()
+        self.thread = None
+
+    def __enter__(self):
+        if self.min_rate:
+            self.thread = Thread(target=self.__watch, name="y2mate-watchdog", daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def feed(self, length: int) -> None:
+        r"""Counts `length` bytes read - the only per-read work"""
+        self.received += length
+
+    def __watch(self) -> None:
+        checked_at, checked = monotonic(), 0
+        while not self.stopped.wait(self.interval):
+            now = monotonic()
+            if now - checked_at < self.window:
+                continue
+            rate = (self.received - checked) / (now - checked_at)
+            if rate < self.min_rate:
+                self.reason = f"Throughput {int(rate)}B/s fell below {self.min_rate}B/s"
+                self.abort()
+                return
+            checked_at, checked = now, self.received
+
+    def abort(self) -> None:
+        r"""Unblocks the reader by shutting the socket down under it"""
+        sock = getattr(getattr(self.resp.raw, "_connection", None), "sock", None)
+        try:
+            if sock:
+                sock.shutdown(socket.SHUT_RDWR)
+            else:
+                self.resp.close()
+        except OSError as e:
+            logging.debug(f"Failed to abort connection - {e}")
+
+
+class RingWriter:
+    def __init__(
+        self,
+        fh,
+        buffers: int = 4,
+        buffer_size: int = 262144,
+        on_write: object = None,
+        hasher: object = None,
+    ):
+        r"""Initializes this `class`
+        :param fh: Unbuffered file positioned where writing starts
+        :param buffers: (Optional) Buffers in the ring, bounds memory to `buffers * buffer_size`
+        :type buffers: int
+        :param buffer_size: (Optional) Bytes per buffer
+        :type buffer_size: int
+        :param on_write: (Optional) Callable receiving amount of bytes once on disk
+        :type on_write: object
+        :param hasher: (Optional) `hashlib` object fed every byte written, in order
+        :type hasher: object
+        """
+        self.fh = fh
+        self.on_write = on_write
+        self.hasher = hasher
+        self.free = Queue()
+        self.filled = Queue()
+        for _ in range(max(buffers, 2)):
+            self.free.put(bytearray(buffer_size))
+        self.error = None
+        self.thread = Thread(target=self.__drain, daemon=True)
+        self.thread.start()
+
+    def __drain(self) -> None:
+        while True:
+            item = self.filled.get()
+            if item is None:
+                return
+            buffer, length = item
+            if self.error is None:
+                try:
+                    self.fh.write(memoryview(buffer)[:length])
+                    if self.hasher:
+                        self.hasher.update(memoryview(buffer)[:length])
+                    if self.on_write:
+                        self.on_write(length)
+                except Exception as e:
+                    self.error = e
+            # Keeps recycling after a failure so the reader never blocks
+            self.free.put(buffer)
+
+    def buffer(self) -> bytearray:
+        r"""Waits for a free buffer to fill
+        :rtype: bytearray
+        """
+        if self.error:
+            raise self.error
+        return self.free.get()
+
+    def commit(self, buffer: bytearray, length: int) -> None:
+        r"""Queues the first `length` bytes of `buffer` for writing"""
+        self.filled.put((buffer, length))
+
+    def release(self, buffer: bytearray) -> None:
+        r"""Returns an unused buffer to the ring"""
+        self.free.put(buffer)
+
+    def close(self) -> None:
+        r"""Writes everything committed then stops the writer thread"""
+        self.filled.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+
+class PartJournal:
+    def __init__(self, part_path: str):
+        r"""Initializes this `class`
+        :param part_path: Path to the `.part` file the journal describes
+        :type part_path: str
+        """
+        self.part_path = part_path
+        self.path = part_path + ".json"
+
+    def load(self, third_dict: dict) -> dict:
+        r"""Returns journaled state if it describes the same media as `third_dict`
+        :param third_dict: Response of `third_query`
+        :type third_dict: dict
+        :rtype: dict
+        """
+        if not (path.isfile(self.path) and path.isfile(self.part_path)):
+            return {}
+        try:
+            with open(self.path) as fh:
+                state = json.load(fh)
+        except Exception as e:
+            logging.debug(f"Ignoring unreadable journal {self.path} - {e}")
+            return {}
+        for key in ("vid", "ftype", "fquality"):
+            if state.get(key) != third_dict.get(key):
+                return {}
+        return state
+
+    def save(self, state: dict) -> None:
+        r"""Atomically persists `state`"""
+        with open(self.path + ".tmp", "w") as fh:
+            json.dump(state, fh)
+        replace(self.path + ".tmp", self.path)
+
+    def remove(self) -> None:
+        r"""Deletes the journal"""
+        if path.isfile(self.path):
+            remove(self.path)
+
+
+class Download:
+    # Seconds between journal checkpoints
+    checkpoint_interval = 1
+    # Bytes asked of the socket per read, urllib3 drops a read cut short
+    read_size = 65536
+    # Seconds without a byte before a connection is dropped
+    stall_timeout = 30
+    # Bytes per second a connection must sustain over `rate_window`, 0 disables the floor
+    min_rate = 0
+    rate_window = 10
+    # Range re-connects from the last committed byte before giving up
+    reconnects = 3
+    identity = ("vid", "ftype", "fquality", "k")
+
+    def __init__(
+        self,
+        third_dict: dict,
+        save_to: str,
+        segments: int = 1,
+        chunk_size: int = 262144,
+        headers: dict = {},
+        timeout: int = 30,
+        resume: bool = False,
+        buffers: int = 4,
+        fsync: bool = False,
+        on_checkpoint: object = None,
+    ):
+        r"""Initializes this `class`
+        :param third_dict: Response of `third_query`
+        :type third_dict: dict
+        :param save_to: Final path of the media
+        :type save_to: str
+        :param segments: (Optional) Parallel range connections
+        :type segments: int
+        :param chunk_size: (Optional) Chunk-size in bytes
+        :type chunk_size: int
+        :param headers: (Optional) Http request headers
+        :type headers: dict
+        :param timeout: (Optional) Http request timeout
+        :type timeout: int
+        :param resume: (Optional) Adopt a partial file already at `save_to`
+        :type resume: bool
+        :param buffers: (Optional) Chunk-sized buffers between each connection and its writer thread
+        :type buffers: int
+        :param fsync: (Optional) Flush the file to disk before renaming it
+        :type fsync: bool
+        :param on_checkpoint: (Optional) Callable receiving bytes committed whenever the journal is saved
+        :type on_checkpoint: object
+        """
+        self.third_dict = third_dict
+        self.save_to = save_to
+        self.part_path = save_to + ".part"
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.headers = headers
+        self.timeout = timeout
+        self.buffers = buffers
+        self.fsync = fsync
+        self.on_checkpoint = on_checkpoint
+        self.journal = PartJournal(self.part_path)
+        self.bandwidth = limiter.new_download()
+        self.lock = Lock()
+        self.checkpointed_at = monotonic()
+        self.resp = None
+        self.size = 0
+        self.offset = 0
+        # Fed while single streams are written, segments are hashed once complete
+        self.hasher = None
+        self.hashed = 0
+        self.sha256 = None
+        # File left at the final name by versions that wrote there directly
+        self.adopting = False
+        self.state = self.journal.load(third_dict)
+        if self.state:
+            logging.info(f"Resuming {path.basename(save_to)} from its journal")
+        elif resume:
+            assert path.exists(save_to), f"File not found in path - '{save_to}'"
+            self.adopting = True
+            self.state = {"committed": path.getsize(save_to)}
+        for key in self.identity:
+            self.state[key] = third_dict.get(key)
+
+    @property
+    def dlink(self) -> str:
+        return self.third_dict["dlink"]
+
+    def __refresh(self) -> None:
+        r"""Re-resolves an expired dlink through `third_query`"""
+        logging.info(f"Re-resolving expired link of {path.basename(self.save_to)}")
+        refreshed = third_query.refresh(self.third_dict, timeout=self.timeout)
+        assert refreshed.get("dlink"), "Failed to re-resolve expired download link"
+        self.third_dict["dlink"] = refreshed["dlink"]
+
+    @property
+    def timeouts(self) -> tuple:
+        r"""Connect and read timeouts of download requests"""
+        return (self.timeout, self.stall_timeout)
+
+    def open(self) -> int:
+        r"""Connects to the download host and returns total size in bytes
+        :rtype: int
+        """
+        return self.__connect(self.segments > 1)
+
+    def __connect(self, segmented: bool) -> int:
+        for attempt in range(2):
+            try:
+                if not (segmented and self.__open_segments()):
+                    self.__open_stream()
+                break
+            except PermissionError:
+                if attempt:
+                    raise
+                self.__refresh()
+        self.state["dlink"] = self.dlink
+        self.state["length"] = self.size
+        if self.adopting and self.committed < self.size:
+            # Only moved aside once the host confirmed there are bytes missing
+            replace(self.save_to, self.part_path)
+            self.adopting = False
+        if not self.adopting:
+            self.checkpoint(force=True)
+        return self.size
+
+    def __open_segments(self) -> bool:
+        if self.state.get("committed") and not self.state.get("segments"):
+            # Keep resuming a single-stream `.part` as a single stream
+            return False
+        size, ranges_supported = probe(self.dlink, self.headers, self.timeout)
+        if not (size and ranges_supported):
+            logging.debug("Range requests not supported - falling back to single stream")
+            return False
+        self.size = size
+        if not (self.state.get("segments") and self.state.get("length") == size):
+            self.state["segments"] = [
+                [start, end, start] for start, end in split_ranges(size, self.segments)
+            ]
+            with open(self.part_path, "wb") as fh:
+                preallocate(fh, size)
+        self.state.pop("committed", None)
+        self.offset = sum(seg[2] - seg[0] for seg in self.state["segments"])
+        return True
+
+    def __open_stream(self) -> None:
+        committed = self.state.get("committed", 0)
+        if not self.kept:
+            committed = 0
+        mod_headers = dict(self.headers)
+        if committed:
+            mod_headers["Range"] = f"bytes={committed}-"
+            validator = self.state.get("etag") or self.state.get("last-modified")
+            # Validators of another host (re-resolved dlink) would void the range
+            if validator and self.state.get("dlink") == self.dlink:
+                mod_headers["If-Range"] = validator
+        limiter.acquire(self.dlink)
+        resp = sessions.download(self.dlink).get(
+            self.dlink, stream=True, headers=mod_headers, timeout=self.timeouts
+        )
+        if resp.status_code in (401, 403, 404, 410):
+            resp.close()
+            raise PermissionError(f"Download link rejected ({resp.status_code})")
+        # Content-Range : bytes */12345
+        remote = resp.headers.get("content-range", "").rpartition("/")[2]
+        if resp.status_code == 416 and committed == (
+            self.state.get("length") or (int(remote) if remote.isdigit() else None)
+        ):
+            # Every byte is already on disk
+            resp.close()
+            self.size = self.offset = committed
+            return
+        size_in_bytes = int(resp.headers.get("content-length", 0))
+        if not size_in_bytes:
+            raise Exception(
+                f"Cannot download file of content-length {size_in_bytes} bytes "
+                f"-  {resp.headers.get('content-type')} ({resp.status_code}, {resp.reason})"
+                f" - {resp.url}"
+            )
+        total = committed + size_in_bytes
+        if resp.status_code == 206:
+            content_range = resp.headers.get("content-range", "").rpartition("/")[2]
+            if content_range.isdigit():
+                total = int(content_range)
+            if self.state.get("length") and total != self.state.get("length"):
+                logging.warning("Remote media changed - restarting the download")
+                resp.close()
+                self.state = {key: self.state.get(key) for key in self.identity}
+                return self.__open_stream()
+        else:
+            if committed:
+                logging.debug("Range ignored by the host - restarting the download")
+            committed, total = 0, size_in_bytes
+        for key in ("etag", "last-modified"):
+            if resp.headers.get(key):
+                self.state[key] = resp.headers.get(key)
+        self.state.pop("segments", None)
+        self.state["committed"] = committed
+        self.resp = resp
+        self.size = total
+        self.offset = committed
+
+    @property
+    def kept(self) -> bool:
+        r"""Whether bytes committed before are still there to append to"""
+        return self.adopting or path.isfile(self.part_path)
+
+    def reconnect(self, error: str) -> None:
+        r"""Asks for the bytes after the last committed one on a new connection
+        :param error: Why the previous connection was given up
+        :type error: str
+        """
+        metrics.count("download_reconnects")
+        logging.warning(
+            f"Reconnecting {path.basename(self.save_to)} at byte {self.committed} - {error}"
+        )
+        offset = self.offset
+        self.__connect(False)
+        # Bytes before the resume point only, unless the host made us start over
+        self.offset = min(offset, self.committed)
+
+    def transfer(self, pump: object) -> None:
+        r"""Runs `pump` on `resp` and reconnects from the last committed byte until every byte arrived
+        :param pump: Callable writing the body of `resp` and committing what it wrote
+        :type pump: object
+        """
+        error = None
+        for attempt in range(self.reconnects + 1):
+            if attempt:
+                self.reconnect(error)
+            if self.committed == self.size:
+                return
+            try:
+                pump()
+                error = f"Connection closed at byte {self.committed} of {self.size}"
+            except TransferInterrupted as e:
+                error = get_excep(e)
+            finally:
+                self.resp.close()
+            if self.committed == self.size:
+                return
+            self.checkpoint(force=True)
+        raise TransferInterrupted(f"Gave up after ({self.reconnects}) reconnects - {error}")
+
+    def checkpoint(self, force: bool = False) -> None:
+        r"""Persists the journal at most once per `checkpoint_interval`"""
+        if force or monotonic() - self.checkpointed_at >= self.checkpoint_interval:
+            self.journal.save(self.state)
+            self.checkpointed_at = monotonic()
+            if self.on_checkpoint:
+                self.on_checkpoint(self.committed)
+
+    @property
+    def committed(self) -> int:
+        r"""Bytes of the `.part` file known to be written"""
+        if self.state.get("segments"):
+            return sum(seg[2] - seg[0] for seg in self.state["segments"])
+        return self.state.get("committed", 0)
+
+    def fetch(self, on_progress: object = None) -> None:
+        r"""Writes the remaining bytes into the `.part` file
+        :param on_progress: (Optional) Callable receiving amount of bytes written
+        :type on_progress: object
+        """
+        if not self.state.get("segments") and not self.resp:
+            return
+        started_at = monotonic()
+        try:
+            if self.state.get("segments"):
+                self.__fetch_segments(on_progress)
+            else:
+                self.__fetch_stream(on_progress)
+        except Exception:
+            metrics.count("download_failures")
+            raise
+        metrics.download(self.committed - self.offset, monotonic() - started_at)
+
+    def pump(self, resp, fh, on_write: object, hasher: object = None) -> None:
+        r"""Reads body of `resp` into ring buffers drained to `fh` by a writer thread
+        :param resp: Streamed `requests` response
+        :param fh: Unbuffered file positioned where the body belongs
+        :param on_write: Callable receiving amount of bytes once on disk
+        :param hasher: (Optional) `hashlib` object fed the body as it is written
+        :type on_write: object
+        :type hasher: object
+        """
+        resp.raw.decode_content = True
+        writer = RingWriter(fh, self.buffers, self.chunk_size, on_write, hasher)
+        # A read spans `read_size` bytes, the window must outlast one at the floor rate
+        watchdog = Watchdog(
+            resp,
+            self.min_rate,
+            max(self.rate_window, 2 * self.read_size / self.min_rate) if self.min_rate else 0,
+        )
+        try:
+            with watchdog:
+                while True:
+                    buffer = writer.buffer()
+                    view = memoryview(buffer)
+                    length = 0
+                    # Fills whole buffers so that slow disks see few large writes
+                    try:
+                        while length < len(buffer):
+                            read = resp.raw.readinto(
+                                view[length : length + self.read_size]
+                            )
+                            if not read:
+                                break
+                            length += read
+                            watchdog.feed(read)
+                    except Exception as e:
+                        # Keep what arrived before the connection broke
+                        if length:
+                            writer.commit(buffer, length)
+                        raise TransferInterrupted(watchdog.reason or get_excep(e)) from e
+                    if not length:
+                        writer.release(buffer)
+                        break
+                    writer.commit(buffer, length)
+                    limiter.throttle(length, self.bandwidth)
+        finally:
+            writer.close()
+        if watchdog.reason:
+            raise TransferInterrupted(watchdog.reason)
+
+    def __fetch_stream(self, on_progress: object = None) -> None:
+        def on_write(length: int):
+            self.state["committed"] += length
+            self.hashed += length
+            self.checkpoint()
+            if on_progress:
+                on_progress(length)
+
+        def pump():
+            committed = self.state["committed"]
+            if self.hasher is None or self.hashed != committed:
+                # A resumed `.part` is read once so the digest covers the whole file
+                self.hasher = (
+                    hash_file(self.part_path, end=committed)
+                    if committed
+                    else hashlib.sha256()
+                )
+                self.hashed = committed
+            # Unbuffered so that journaled offsets never run ahead of the file
+            with open(self.part_path, "r+b" if committed else "wb", buffering=0) as fh:
+                preallocate(fh, self.size)
+                fh.seek(committed)
+                self.pump(self.resp, fh, on_write, self.hasher)
+
+        self.transfer(pump)
+        self.checkpoint(force=True)
+        assert (
+            self.state["committed"] == self.size
+        ), f"Download ended early at byte {self.state['committed']} of {self.size}"
+
+    def __fetch_segments(self, on_progress: object = None) -> None:
+        errors = []
+
+        def on_write(segment: list, length: int):
+            with self.lock:
+                segment[2] += length
+                self.checkpoint()
+                if on_progress:
+                    on_progress(length)
+
+        refreshing = Lock()
+
+        def refresh(dlink: str) -> None:
+            with refreshing:
+                # Segments rejected together re-resolve the link once
+                if self.dlink == dlink:
+                    self.__refresh()
+                    self.state["dlink"] = self.dlink
+
+        def fetch(segment: list):
+            start, end = segment[:2]
+            error = None
+            refreshed = False
+            attempt = 0
+            try:
+                while attempt <= self.reconnects:
+                    committed = segment[2]
+                    if committed > end:
+                        return
+                    if attempt:
+                        metrics.count("download_reconnects")
+                        logging.warning(
+                            f"Reconnecting segment {start}-{end} at byte {committed} - {error}"
+                        )
+                    mod_headers = dict(self.headers)
+                    mod_headers["Range"] = f"bytes={committed}-{end}"
+                    dlink = self.dlink
+                    limiter.acquire(dlink)
+                    resp = sessions.download(dlink).get(
+                        dlink, stream=True, headers=mod_headers, timeout=self.timeouts
+                    )
+                    try:
+                        if resp.status_code in (401, 403, 404, 410) and not refreshed:
+                            # Expired mid-transfer - the same bytes are asked of the new link, not counted as a reconnect
+                            error = f"Download link rejected ({resp.status_code})"
+                            refreshed = True
+                            refresh(dlink)
+                            continue
+                        if resp.status_code != 206:
+                            raise Exception(
+                                f"Range request rejected - ({resp.status_code}, {resp.reason})"
+                            )
+                        with open(self.part_path, "r+b", buffering=0) as fh:
+                            fh.seek(committed)
+                            self.pump(
+                                resp, fh, lambda length: on_write(segment, length)
+                            )
+                        error = f"Segment {start}-{end} ended early at byte {segment[2]}"
+                    except TransferInterrupted as e:
+                        error = get_excep(e)
+                    finally:
+                        resp.close()
+                    attempt += 1
+                if segment[2] <= end:
+                    raise TransferInterrupted(
+                        f"Gave up after ({self.reconnects}) reconnects - {error}"
+                    )
+            except Exception as e:
+                errors.append(e)
+
+        workers = [
+            Thread(target=fetch, args=(segment,)) for segment in self.state["segments"]
+        ]
+        logging.debug(
+            f"Downloading {path.basename(self.save_to)} in {len(workers)} segments"
+        )
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        with self.lock:
+            self.checkpoint(force=True)
+        if errors:
+            raise errors[0]
+
+    def finish(self) -> str:
+        r"""Moves the complete `.part` file to its final name, setting `sha256`
+        :rtype: str
+        """
+        source = self.save_to if self.adopting else self.part_path
+        # Content-length is the only proof nothing went missing
+        assert (
+            self.committed == self.size and path.getsize(source) == self.size
+        ), f"Download incomplete - ({self.committed}) of ({self.size}) bytes"
+        if not (self.hasher and self.hashed == self.size):
+            self.hasher = hash_file(source, end=self.size)
+        self.sha256 = self.hasher.hexdigest()
+        if self.adopting:
+            # Already complete under its final name
+            return self.save_to
+        if self.fsync:
+            with open(self.part_path, "rb+") as fh:
+                os.fsync(fh.fileno())
+        replace(self.part_path, self.save_to)
+        self.journal.remove()
+        return self.save_to
+
+
+class StreamDownload(Download):
+    def __init__(
+        self,
+        third_dict: dict,
+        sink: Sink,
+        chunk_size: int = 262144,
+        headers: dict = {},
+        timeout: int = 30,
+        buffers: int = 4,
+    ):
+        r"""`Download` written in order into `sink`, nothing is kept on disk
+        :param third_dict: Response of `third_query`
+        :type third_dict: dict
+        :param sink: Destination of the media, a full ring waits on it
+        :type sink: Sink
+        :param chunk_size: (Optional) Chunk-size in bytes
+        :type chunk_size: int
+        :param headers: (Optional) Http request headers
+        :type headers: dict
+        :param timeout: (Optional) Http request timeout
+        :type timeout: int
+        :param buffers: (Optional) Chunk-sized buffers between the connection and the sink
+        :type buffers: int
+        """
+        self.sink = sink
+        super().__init__(
+            third_dict,
+            sink.name,
+            chunk_size=chunk_size,
+            headers=headers,
+            timeout=timeout,
+            buffers=buffers,
+        )
+        # Bytes handed to a consumer can't be taken back, so there is nothing to resume
+        self.state = {key: third_dict.get(key) for key in self.identity}
+
+    @property
+    def kept(self) -> bool:
+        # What the sink consumed stays consumed
+        return True
+
+    def checkpoint(self, force: bool = False) -> None:
+        pass
+
+    def fetch(self, on_progress: object = None) -> None:
+        r"""Writes the body into the sink
+        :param on_progress: (Optional) Callable receiving amount of bytes written
+        :type on_progress: object
+        """
+        if not self.resp:
+            return
+        self.hasher = hashlib.sha256()
+
+        def on_write(length: int):
+            self.state["committed"] += length
+            self.hashed += length
+            if on_progress:
+                on_progress(length)
+
+        def pump():
+            # A host ignoring the range would repeat bytes the sink already has
+            assert (
+                self.committed == self.hashed
+            ), "Host restarted the media while streaming, it can't be resumed"
+            self.pump(self.resp, self.sink, on_write, self.hasher)
+
+        started_at = monotonic()
+        try:
+            self.transfer(pump)
+        except Exception:
+            metrics.count("download_failures")
+            raise
+        metrics.download(self.committed, monotonic() - started_at)
+        assert (
+            self.committed == self.size
+        ), f"Download ended early at byte {self.committed} of {self.size}"
+
+    def finish(self) -> str:
+        r"""Flushes the sink, setting `sha256`
+        :rtype: str
+        """
+        self.sink.flush()
+        self.sha256 = self.hasher.hexdigest() if self.hasher else None
+        return self.sink.name